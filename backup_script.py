@@ -1,27 +1,65 @@
 #!/usr/bin/env python3
 
 import os
-import shutil
+import argparse
 import logging
 import json
+import sqlite3
+import time
+from datetime import datetime
+
+import db_schema
+import log_stats
 
 ## Configuration
 LOG_FILE = '/home/pi/timer_project/backup_log.log'  # Update path if necessary
+STATS_FILE = '/home/pi/timer_project/backup_stats.jsonl'  # One JSON line per backup run
 DB_FILE = '/home/pi/timer_project/logs.db'          # Path to the SQLite database
 USB_LABEL = 'USB_BACKUP'                            # Label of your USB drive
 BACKUP_FILENAME = 'logs_backup.db'                  # Name of the backup file on USB
 
-# Setup logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+BACKUP_PAGES_PER_STEP = 256   # Pages copied per online backup step
+BACKUP_STEP_SLEEP = 0.05      # Seconds between steps, so the app can keep writing
+INCREMENTAL_CHUNK_ROWS = 5000 # Rows copied per transaction in incremental mode
+
+# Columns copied in incremental mode; after the id they follow log_writer.INSERT_LOG_SQL
+_LOG_COLUMNS = "id, name, start_time, stop_time, duration, start_ts, stop_ts, duration_s, press"
+
+# Last lsblk result, reused while the mount table is unchanged
+_mount_cache = {"mounts": None, "label": None, "mount_point": None}
+
+def setup_logging():
+    """
+    Sends log messages to LOG_FILE. Only done when run as a script, so that
+    importing copy_db (e.g. from main.py) keeps the caller's logging setup.
+    """
+    logging.basicConfig(
+        filename=LOG_FILE,
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+def read_mount_table():
+    """
+    Returns the kernel's mount table, which changes whenever a drive is
+    mounted or unmounted. Reading it is far cheaper than running lsblk.
+    """
+    try:
+        with open('/proc/self/mounts', 'r') as file:
+            return file.read()
+    except OSError:
+        return None
 
 def get_usb_mount_point(label):
     """
     Searches for the USB drive by its label and returns its mount point.
+    The lsblk lookup is cached until the mount table changes.
     """
+    mounts_table = read_mount_table()
+    if (mounts_table is not None and mounts_table == _mount_cache["mounts"]
+            and label == _mount_cache["label"]):
+        return _mount_cache["mount_point"]
+    mount_point = None
     try:
         mounts = os.popen("lsblk -o NAME,LABEL,MOUNTPOINT -J").read()
         mounts_json = json.loads(mounts)
@@ -29,31 +67,129 @@ def get_usb_mount_point(label):
             if 'children' in device:
                 for child in device['children']:
                     if child.get('label') == label and child.get('mountpoint'):
-                        return child.get('mountpoint')
+                        mount_point = child.get('mountpoint')
+                        break
+            if mount_point:
+                break
     except json.JSONDecodeError:
         logging.error("Failed to parse lsblk output.")
+        return None
     except Exception as e:
         logging.error(f"An error occurred while searching for the USB drive: {e}")
-    return None
+        return None
+    _mount_cache.update(mounts=mounts_table, label=label, mount_point=mount_point)
+    return mount_point
 
-def copy_db():
+def check_integrity(conn):
     """
-    Copies logs.db to the USB drive if mounted.
+    Runs SQLite's quick_check on the backup and raises if it reports damage.
+    """
+    result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    if result != "ok":
+        raise sqlite3.DatabaseError(f"Integrity check failed: {result}")
+
+def backup_full(db_file, destination):
+    """
+    Copies the whole database with SQLite's online backup API. Pages are
+    copied in small steps with a pause between them, so main.py is never
+    blocked and the copy is always a consistent snapshot. Returns rows copied.
+    """
+    tmp_destination = destination + ".tmp"
+    source = sqlite3.connect(db_file)
+    target = sqlite3.connect(tmp_destination)
+    try:
+        source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+        check_integrity(target)
+        rows = target.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp_destination, destination)
+    return rows
+
+def backup_incremental(db_file, destination):
+    """
+    Appends only the rows newer than the last backed-up id to the backup
+    database (creating or migrating it first). Returns rows copied.
+    """
+    db_schema.init_db(destination)
+    source = sqlite3.connect(db_file)
+    target = sqlite3.connect(destination)
+    copied = 0
+    try:
+        last_id = target.execute("SELECT COALESCE(MAX(id), 0) FROM logs").fetchone()[0]
+        while True:
+            rows = source.execute(f'''
+                SELECT {_LOG_COLUMNS} FROM logs WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, INCREMENTAL_CHUNK_ROWS)).fetchall()
+            if not rows:
+                break
+            with target:
+                target.executemany(f'''
+                    INSERT INTO logs ({_LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                log_stats.update_rollups(target, [row[1:] for row in rows])
+            last_id = rows[-1][0]
+            copied += len(rows)
+        check_integrity(target)
+    finally:
+        target.close()
+        source.close()
+    return copied
+
+def record_run(stats):
+    """
+    Appends the statistics of one backup run to STATS_FILE.
+    """
+    try:
+        with open(STATS_FILE, 'a') as file:
+            file.write(json.dumps(stats) + "\n")
+    except OSError as e:
+        logging.warning(f"Could not record backup statistics: {e}")
+
+def copy_db(db_file=DB_FILE, incremental=False):
+    """
+    Backs up logs.db to the USB drive if mounted, either as a full online
+    copy or incrementally. Returns the run's statistics (destination, mode,
+    rows, bytes written, seconds), or None if no backup was made.
     """
     mount_point = get_usb_mount_point(USB_LABEL)
-    if mount_point:
-        destination = os.path.join(mount_point, BACKUP_FILENAME)
-        try:
-            shutil.copy2(DB_FILE, destination)
-            logging.info(f"Successfully backed up logs.db to {destination}")
-        except Exception as e:
-            logging.error(f"Failed to copy logs.db: {e}")
-    else:
+    if not mount_point:
         logging.warning(f"USB drive '{USB_LABEL}' not mounted. Skipping backup.")
+        return None
+    destination = os.path.join(mount_point, BACKUP_FILENAME)
+    mode = "incremental" if incremental else "full"
+    size_before = os.path.getsize(destination) if incremental and os.path.exists(destination) else 0
+    started = time.monotonic()
+    try:
+        if incremental:
+            rows = backup_incremental(db_file, destination)
+        else:
+            rows = backup_full(db_file, destination)
+    except Exception as e:
+        logging.error(f"Failed to back up logs.db ({mode}): {e}")
+        return None
+    stats = {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "destination": destination,
+        "mode": mode,
+        "rows": rows,
+        "bytes": max(0, os.path.getsize(destination) - size_before),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    record_run(stats)
+    logging.info(f"Successfully backed up logs.db to {destination}: {mode}, {rows} rows, "
+                 f"{stats['bytes']} bytes in {stats['seconds']} s")
+    return stats
 
 def main():
+    parser = argparse.ArgumentParser(description="Back up logs.db to a USB drive.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Append only rows newer than the last backup instead of copying the whole file")
+    args = parser.parse_args()
+    setup_logging()
     logging.info("Backup script started.")
-    copy_db()
+    copy_db(incremental=args.incremental)
     logging.info("Backup script finished.")
 
 if __name__ == '__main__':
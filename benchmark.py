@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""Deterministic benchmarks of the timer/logging pipeline and the log database.
+
+    python3 benchmark.py                       # pipeline + 10k and 1M row databases
+    python3 benchmark.py --sizes 10k,1m,10m    # include the 10M row database
+    python3 benchmark.py --compare old.json    # show changes against an earlier report
+
+The pipeline benchmark feeds a seeded stream of rapid button presses through
+the input queue, button_callback, start_timer/stop_timer and log_state_change
+in headless mode on a virtual clock, so hours of presses run in seconds.
+
+The database benchmarks build synthetic logs.db files (cached in --workdir)
+and time the log view, exports, settings save/load and backups on each.
+The fleet benchmark syncs --fleet-devices synthetic devices at once to a
+local collector (collector.py) on 127.0.0.1.
+Results are written as JSON so runs of different versions can be compared.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import main
+import backup_script
+import collector
+import db_schema
+import fleet_sync
+import log_stats
+import timeline
+from headless import VirtualClock
+from input_backends import ScriptedInput
+
+REPORT_VERSION = 1
+GENERATE_CHUNK_ROWS = 50000
+NEW_ROWS_PER_REFRESH = 100  # Rows added before timing the incremental paths
+
+SIZE_SUFFIXES = {"k": 1000, "m": 1000000}
+
+# === Helpers ===
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+def timed(func, *args, repeat=1):
+    """Run func repeat times; returns (best seconds, mean seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), sum(timings) / len(timings), result
+
+def summarize(samples):
+    """Mean, p50, p95 and max of a list of seconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[int(len(ordered) * 0.95)],
+        "max": ordered[-1],
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+def quiet():
+    """Swallow the application's console output while it is being timed."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+# === Pipeline Benchmark ===
+
+def generate_presses(count, seed):
+    """Rapid presses: random buttons 0.05-3 s apart, so timers both expire and get stopped."""
+    rng = random.Random(seed)
+    events = []
+    at = 1.0
+    for _ in range(count):
+        at += rng.uniform(0.05, 3.0)
+        events.append((at, rng.randint(1, len(main.TIMER_DURATIONS))))
+    return events
+
+def wrap_timed(name, samples):
+    """Replace main.<name> with a version that records its wall time per call."""
+    original = getattr(main, name)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    setattr(main, name, wrapper)
+
+def bench_pipeline(workdir, presses, seed):
+    db_path = os.path.join(workdir, "pipeline.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    main.LOGS_DB = db_path
+    main.TIMER_DURATIONS = [1, 2, 3, 4]
+    main.clock = VirtualClock()
+
+    callback_samples = []
+    log_samples = []
+    wrap_timed("button_callback", callback_samples)
+    wrap_timed("log_state_change", log_samples)
+
+    events = generate_presses(presses, seed)
+    with quiet():
+        main.init_db()
+        main.start_log_writer()
+        main.initialize_headless()
+        main.start_input_queue()
+        ScriptedInput(events).start(main.root, main.input_queue.push)
+        main.setup_stations()
+        started = time.perf_counter()
+        main.root.run_until(events[-1][0] + 10.0)
+        elapsed = time.perf_counter() - started
+        main.station_scheduler.shutdown()
+        main.log_writer.flush()
+        commit_stats = main.log_writer.commit_stats()
+        main.stop_log_writer()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+    conn.close()
+    return {
+        "presses": presses,
+        "virtual_seconds": round(events[-1][0] + 10.0, 1),
+        "wall_seconds": elapsed,
+        "presses_per_second": presses / elapsed if elapsed else None,
+        "rows_logged": rows,
+        "button_callback": summarize(callback_samples),
+        "log_state_change": summarize(log_samples),
+        "log_writer": commit_stats,
+    }
+
+# === Synthetic Databases ===
+
+def generate_db(path, rows, seed):
+    """Create a logs.db of `rows` alternating timer and idle intervals."""
+    db_schema.init_db(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    names = list(main.TIMER_TEXTS)
+    ts = int(time.time()) - rows * 400
+    written = 0
+    while written < rows:
+        batch = []
+        for i in range(min(GENERATE_CHUNK_ROWS, rows - written)):
+            if (written + i) % 2:
+                name, duration = "Idle", rng.randint(5, 900)
+            else:
+                index = rng.randrange(len(names))
+                name, duration = names[index], max(1, int(rng.gauss(main.TIMER_DURATIONS[index], 30)))
+            start = datetime.fromtimestamp(ts)
+            stop = datetime.fromtimestamp(ts + duration)
+            batch.append((name, start.strftime(db_schema.TIME_FORMAT), stop.strftime(db_schema.TIME_FORMAT),
+                          db_schema.format_duration(duration), ts, ts + duration, duration, None))
+            ts += duration
+        with conn:
+            conn.executemany('''
+                INSERT INTO logs (name, start_time, stop_time, duration, start_ts, stop_ts, duration_s, press)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+        written += len(batch)
+    log_stats.rebuild_rollups(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+
+def add_rows(path, count):
+    """Append `count` new rows, as if the presses had kept running."""
+    conn = sqlite3.connect(path)
+    last_ts = conn.execute("SELECT MAX(stop_ts) FROM logs").fetchone()[0] or int(time.time())
+    rows = []
+    for i in range(count):
+        start = last_ts + i * 60
+        rows.append(("Idle", db_schema.format_timestamp(start), db_schema.format_timestamp(start + 60),
+                     "0:01:00", start, start + 60, 60, None))
+    with conn:
+        conn.executemany('''
+            INSERT INTO logs (name, start_time, stop_time, duration, start_ts, stop_ts, duration_s, press)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        log_stats.update_rollups(conn, rows)
+    conn.close()
+
+def bench_database(workdir, rows, seed, max_full_export):
+    path = os.path.join(workdir, f"synthetic_{rows}_{seed}.db")
+    result = {"rows": rows}
+    if not os.path.exists(path):
+        result["generate_seconds"] = timed(generate_db, path, rows, seed)[0]
+    work_path = os.path.join(workdir, f"work_{rows}.db")
+    backup_full_path = os.path.join(workdir, f"backup_full_{rows}.db")
+    backup_incremental_path = os.path.join(workdir, f"backup_incremental_{rows}.db")
+    for stale in (work_path, backup_incremental_path):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(stale + suffix):
+                os.remove(stale + suffix)
+    # Work on a copy so the cached database stays pristine
+    backup_script.backup_full(path, work_path)
+    result["file_bytes"] = os.path.getsize(work_path)
+
+    main.LOGS_DB = work_path
+    main.EXPORT_DIR = os.path.join(workdir, f"exports_{rows}")
+    main.FULL_EXPORT_FILE = os.path.join(workdir, f"full_{rows}.xlsx")
+    main.REPORT_FILE = os.path.join(workdir, f"report_{rows}.xlsx")
+    main.log_writer = None
+    main.initialize_headless()
+    if os.path.isdir(main.EXPORT_DIR):
+        for name in os.listdir(main.EXPORT_DIR):
+            os.remove(os.path.join(main.EXPORT_DIR, name))
+
+    with quiet():
+        main.reset_log_view()
+        result["log_view_first"] = timed(main.refresh_log_view)[0]
+        result["log_view_older_page"] = timed(main.load_older_log_rows)[0]
+        add_rows(work_path, NEW_ROWS_PER_REFRESH)
+        result["log_view_refresh_new_rows"] = timed(main.refresh_log_view)[0]
+
+        for export_format in ("csv", "xlsx"):
+            main.EXPORT_FORMAT = export_format
+            main.EXPORT_PARTITION = "month"
+            result[f"export_{export_format}_first"] = timed(main.export_logs)[0]
+            add_rows(work_path, NEW_ROWS_PER_REFRESH)
+            result[f"export_{export_format}_new_rows"] = timed(main.export_logs)[0]
+        if rows <= max_full_export:
+            result["export_full_xlsx"] = timed(main.export_all_logs)[0]
+        result["report"] = timed(main.write_report)[0]
+        result.update(bench_timeline(work_path))
+
+        result["settings_save"] = timed(main.settings_store.save, repeat=20)[1]
+        result["settings_load"] = timed(main.load_settings, repeat=20)[1]
+
+        result["backup_full"] = timed(backup_script.backup_full, work_path, backup_full_path)[0]
+        result["backup_incremental_first"] = timed(
+            backup_script.backup_incremental, work_path, backup_incremental_path)[0]
+        add_rows(work_path, NEW_ROWS_PER_REFRESH)
+        result["backup_incremental_new_rows"] = timed(
+            backup_script.backup_incremental, work_path, backup_incremental_path)[0]
+    return result
+
+def bench_timeline(path, width=1800):
+    """Tiles for a day, week and month of the timeline ending at the last row, then one tile panned in."""
+    conn = sqlite3.connect(path)
+    end = conn.execute("SELECT MAX(stop_ts) FROM logs").fetchone()[0] or 0
+    conn.close()
+    data = timeline.TimelineData(lambda: sqlite3.connect(path, uri=True), main.archive_dir(), max(main.TIMER_DURATIONS))
+    result = {}
+    for label, seconds in (("day", 86400), ("week", 7 * 86400), ("month", 30 * 86400)):
+        spp = timeline.level_for(seconds, width)
+        span = timeline.tile_span(spp)
+        first = (end - spp * width) // span
+        result[f"timeline_{label}"] = timed(data.tiles, spp, range(first, end // span + 1))[0]
+        result[f"timeline_{label}_pan"] = timed(data.tiles, spp, [first - 1])[0]
+    return result
+
+# === Fleet Sync ===
+
+def bench_fleet(workdir, devices, rows, seed):
+    """Sync `devices` copies of a `rows` row logs.db to a local collector at once."""
+    path = os.path.join(workdir, f"synthetic_{rows}_{seed}.db")
+    if not os.path.exists(path):
+        generate_db(path, rows, seed)
+    fleet_dir = os.path.join(workdir, "fleet")
+    shutil.rmtree(fleet_dir, ignore_errors=True)
+    os.makedirs(fleet_dir)
+    server = collector.Collector(os.path.join(fleet_dir, "fleet.db"), host="127.0.0.1", port=0)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}/ingest"
+    # Every device reads the same database; only the device id and state file differ
+    agents = [fleet_sync.SyncAgent(path, url, f"device-{n:02d}", os.path.join(fleet_dir, f"sync_{n:02d}.json"))
+              for n in range(devices)]
+    sent = []
+    errors = []
+    def run(agent):
+        try:
+            sent.append(agent.sync())
+        except fleet_sync.SyncError as e:
+            errors.append(str(e))
+    threads = [threading.Thread(target=run, args=(agent,)) for agent in agents]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    total_rows = sum(batch["rows"] for batch in sent)
+    compressed = sum(batch["bytes"] for batch in sent)
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        all_rows = conn.execute(fleet_sync._SELECT, (0, rows)).fetchall()
+    raw = len(json.dumps(all_rows, separators=(",", ":"))) * len(sent)
+    stored = sum(device["rows"] for device in server.store.devices())
+    # Sending everything again must not add a row
+    os.remove(agents[0].state_file)
+    resync_seconds = timed(agents[0].sync)[0]
+    stored_after_resync = sum(device["rows"] for device in server.store.devices())
+    server.stop()
+    return {
+        "devices": devices,
+        "rows_per_device": rows,
+        "errors": errors,
+        "seconds": seconds,
+        "rows_per_second": total_rows / seconds if seconds else None,
+        "batches": sum(batch["batches"] for batch in sent),
+        "compressed_bytes": compressed,
+        "compression_ratio": raw / compressed if compressed else None,
+        "rows_stored": stored,
+        "resync_seconds": resync_seconds,
+        "resync_idempotent": stored_after_resync == stored,
+    }
+
+# === Reporting ===
+
+def flatten(report, prefix=""):
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+def compare(old_report, new_report):
+    """Print every numeric result next to the one in an older report."""
+    old = flatten(old_report.get("results", {}))
+    new = flatten(new_report.get("results", {}))
+    print(f"{'metric':60} {'old':>12} {'new':>12} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        change = f"{new[name] / old[name]:.2f}x" if old[name] else ""
+        print(f"{name:60} {old[name]:12.4g} {new[name]:12.4g} {change:>8}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the foam timer pipeline and log database.")
+    parser.add_argument("--sizes", default="10k,1m", help="Comma-separated database sizes, e.g. 10k,1m,10m")
+    parser.add_argument("--presses", type=int, default=5000, help="Presses in the pipeline benchmark")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for generated data")
+    parser.add_argument("--workdir", default="bench_data", help="Where synthetic databases are kept")
+    parser.add_argument("--max-full-export", type=parse_size, default=1000000,
+                        help="Skip the full xlsx export for databases larger than this")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Earlier report to compare the results with")
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--fleet-devices", type=int, default=50, help="Devices syncing at once in the fleet benchmark")
+    parser.add_argument("--fleet-rows", type=parse_size, default=10000, help="Rows each fleet device sends")
+    parser.add_argument("--skip-fleet", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    # Start from the application's settings, but only ever save the copy in workdir
+    settings_copy = os.path.join(args.workdir, "settings.json")
+    if os.path.exists(main.SETTINGS_FILE):
+        shutil.copyfile(main.SETTINGS_FILE, settings_copy)
+    main.SETTINGS_FILE = settings_copy
+    main.load_settings()
+    results = {}
+    if not args.skip_pipeline:
+        print(f"Pipeline: {args.presses} presses ...", file=sys.stderr)
+        results["pipeline"] = bench_pipeline(args.workdir, args.presses, args.seed)
+    results["databases"] = {}
+    for size in args.sizes.split(","):
+        rows = parse_size(size)
+        print(f"Database: {rows} rows ...", file=sys.stderr)
+        results["databases"][str(rows)] = bench_database(args.workdir, rows, args.seed, args.max_full_export)
+    if not args.skip_fleet:
+        print(f"Fleet sync: {args.fleet_devices} devices x {args.fleet_rows} rows ...", file=sys.stderr)
+        results["fleet"] = bench_fleet(args.workdir, args.fleet_devices, args.fleet_rows, args.seed)
+
+    report = {
+        "report_version": REPORT_VERSION,
+        "created": datetime.now().strftime(db_schema.TIME_FORMAT),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "arguments": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {args.output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, "r") as file:
+            compare(json.load(file), report)
+
+if __name__ == "__main__":
+    main_cli()
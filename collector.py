@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Minimal fleet collector: merges the log rows of many Pis into one database.
+
+    POST /ingest    a gzip'd JSON batch from fleet_sync.py; answers {"accepted", "last_row_id"}
+    GET /devices    every device with its highest row id, row count and when it was last heard from
+
+Rows are upserted keyed on (device_id, row_id), so batches can safely be
+sent again. Every batch is one transaction on a single connection; batches
+from different devices arriving together simply take turns.
+
+Run `python3 collector.py --port 8400 --db fleet.db`.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fleet_sync import SYNC_COLUMNS
+
+MAX_BODY_BYTES = 8 * 1024 * 1024    # Compressed
+MAX_BATCH_BYTES = 64 * 1024 * 1024  # Decompressed
+MAX_DEVICE_ID_LENGTH = 100
+
+COLLECTOR_SCHEMA_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS fleet_logs (
+        device_id TEXT NOT NULL,
+        row_id INTEGER NOT NULL,           -- id of the row in the device's logs.db
+        name TEXT,
+        start_ts INTEGER,
+        stop_ts INTEGER,
+        duration_s INTEGER,
+        press TEXT,
+        received_ts INTEGER NOT NULL,
+        PRIMARY KEY (device_id, row_id)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_fleet_logs_start_ts ON fleet_logs (start_ts)",
+    "CREATE INDEX IF NOT EXISTS idx_fleet_logs_name_start_ts ON fleet_logs (name, start_ts)",
+    '''
+    CREATE TABLE IF NOT EXISTS devices (
+        device_id TEXT PRIMARY KEY,
+        last_row_id INTEGER NOT NULL,
+        last_seen_ts INTEGER NOT NULL
+    )
+    ''',
+]
+
+_UPSERT_ROW_SQL = '''
+    INSERT INTO fleet_logs (device_id, row_id, name, start_ts, stop_ts, duration_s, press, received_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (device_id, row_id) DO UPDATE SET
+        name = excluded.name,
+        start_ts = excluded.start_ts,
+        stop_ts = excluded.stop_ts,
+        duration_s = excluded.duration_s,
+        press = excluded.press
+'''
+
+_UPSERT_DEVICE_SQL = '''
+    INSERT INTO devices (device_id, last_row_id, last_seen_ts) VALUES (?, ?, ?)
+    ON CONFLICT (device_id) DO UPDATE SET
+        last_row_id = MAX(last_row_id, excluded.last_row_id),
+        last_seen_ts = excluded.last_seen_ts
+'''
+
+
+class BatchError(ValueError):
+    """A batch that cannot be stored; answered with 400."""
+
+
+def parse_batch(body, content_encoding=None):
+    """Decode and check a batch; returns (device_id, rows)."""
+    if content_encoding == "gzip":
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(body)) as file:
+                body = file.read(MAX_BATCH_BYTES + 1)
+        except (OSError, EOFError) as e:
+            raise BatchError(f"bad gzip data: {e}")
+        if len(body) > MAX_BATCH_BYTES:
+            raise BatchError("batch too large")
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise BatchError(f"bad JSON: {e}")
+    if not isinstance(payload, dict):
+        raise BatchError("expected a JSON object")
+    device_id = payload.get("device_id")
+    if not isinstance(device_id, str) or not device_id or len(device_id) > MAX_DEVICE_ID_LENGTH:
+        raise BatchError("missing or bad device_id")
+    if payload.get("columns") != SYNC_COLUMNS:
+        raise BatchError(f"columns must be {SYNC_COLUMNS}")
+    rows = payload.get("rows")
+    if not isinstance(rows, list) or not all(_valid_row(row) for row in rows):
+        raise BatchError("rows must be lists of text and whole numbers, starting with an integer id")
+    return device_id, rows
+
+def _valid_row(row):
+    return (isinstance(row, list) and len(row) == len(SYNC_COLUMNS) and type(row[0]) is int
+            and all(value is None or type(value) in (int, str) for value in row))
+
+
+class CollectorStore:
+    """The merged database; safe to use from the server's request threads."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for sql in COLLECTOR_SCHEMA_SQL:
+                self._conn.execute(sql)
+
+    def ingest(self, device_id, rows):
+        """Upsert one device's rows; returns the device's highest row id."""
+        now = int(time.time())
+        last_row_id = max((row[0] for row in rows), default=0)
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT_ROW_SQL, [(device_id, *row, now) for row in rows])
+            self._conn.execute(_UPSERT_DEVICE_SQL, (device_id, last_row_id, now))
+            return self._conn.execute('SELECT last_row_id FROM devices WHERE device_id = ?',
+                                      (device_id,)).fetchone()[0]
+
+    def devices(self):
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT d.device_id, d.last_row_id, d.last_seen_ts,
+                       (SELECT COUNT(*) FROM fleet_logs l WHERE l.device_id = d.device_id)
+                FROM devices d ORDER BY d.device_id
+            ''').fetchall()
+        return [{"device_id": device_id, "last_row_id": last_row_id, "last_seen_ts": last_seen_ts, "rows": count}
+                for device_id, last_row_id, last_seen_ts, count in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Collector:
+    """Serves the ingest endpoint on a background thread."""
+
+    def __init__(self, db_path, host="0.0.0.0", port=8400):
+        self.host = host
+        self.port = port
+        self.store = CollectorStore(db_path)
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), CollectorRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.store = self.store
+        self.port = self._httpd.server_address[1]  # The real port when 0 was asked for
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="collector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        self.store.close()
+
+
+class CollectorRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FoamTimerCollector/1"
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/ingest":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self._send_json(411, {"error": "Content-Length required"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "batch too large"})
+            return
+        body = self.rfile.read(length)
+        try:
+            device_id, rows = parse_batch(body, self.headers.get("Content-Encoding"))
+        except BatchError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        try:
+            last_row_id = self.server.store.ingest(device_id, rows)
+        except sqlite3.Error as e:
+            self._send_json(503, {"error": f"store failed: {e}"})  # The device retries later
+            return
+        self._send_json(200, {"accepted": len(rows), "last_row_id": last_row_id})
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] == "/devices":
+            self._send_json(200, self.server.store.devices())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per batch from every press would drown the console
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect the log rows of every foam timer.")
+    parser.add_argument("--db", default="fleet.db", help="Merged database")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8400)
+    args = parser.parse_args()
+    collector = Collector(args.db, args.host, args.port)
+    collector.start()
+    print(f"Collecting into {args.db} on http://{args.host}:{collector.port}/ingest")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        collector.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Schema and migrations of the logs database."""
+
+import re
+import sqlite3
+from datetime import datetime
+
+import log_stats
+
+# Stored in PRAGMA user_version
+#   1: logs(name, start_time, stop_time, duration) as text
+#   2: adds start_ts/stop_ts (epoch seconds), duration_s and press, with indexes
+#   3: adds the rollup_hourly and rollup_daily tables (see log_stats.py)
+#   4: new files use auto_vacuum=INCREMENTAL, so retention.py can shrink them; older
+#      files are switched over by retention.py's background job, never at startup
+SCHEMA_VERSION = 4
+
+# Rows updated per transaction while backfilling new columns
+BACKFILL_BATCH_ROWS = 2000
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_DURATION_RE = re.compile(r"^(?:(-?\d+) days?, )?(\d+):(\d{2}):(\d{2})$")
+
+def init_db(db_path):
+    """Create the logs table if needed and migrate it to SCHEMA_VERSION."""
+    conn = sqlite3.connect(db_path)
+    try:
+        # Only takes effect on a new, empty file; see retention.enable_incremental_vacuum
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                start_time TEXT,
+                stop_time TEXT,
+                duration TEXT
+            )
+        ''')
+        conn.commit()
+        migrate(conn)
+    finally:
+        conn.close()
+
+def migrate(conn):
+    """Apply every migration newer than the database's user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 2:
+        migrate_v2(conn)
+    if version < 3:
+        migrate_v3(conn)
+    if version < 4:
+        migrate_v4(conn)
+
+def migrate_v2(conn):
+    """Add numeric time columns and a press identifier, then backfill them."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(logs)")}
+    with conn:
+        for column, column_type in (("start_ts", "INTEGER"), ("stop_ts", "INTEGER"),
+                                    ("duration_s", "INTEGER"), ("press", "TEXT")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE logs ADD COLUMN {column} {column_type}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_name_start_ts ON logs (name, start_ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_start_ts ON logs (start_ts)")
+    backfilled = backfill_v2(conn)
+    if backfilled:
+        print(f"Migrated {backfilled} log rows to schema v2.")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+
+def backfill_v2(conn, batch_rows=BACKFILL_BATCH_ROWS):
+    """Fill the v2 columns from the text columns, one short transaction per batch."""
+    last_id = 0
+    updated = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, start_time, stop_time, duration FROM logs
+            WHERE id > ? AND start_ts IS NULL ORDER BY id LIMIT ?
+        ''', (last_id, batch_rows)).fetchall()
+        if not rows:
+            return updated
+        values = []
+        for row_id, start_time, stop_time, duration in rows:
+            start_ts = parse_timestamp(start_time)
+            stop_ts = parse_timestamp(stop_time)
+            duration_s = parse_duration(duration)
+            if duration_s is None and start_ts is not None and stop_ts is not None:
+                duration_s = stop_ts - start_ts
+            values.append((start_ts, stop_ts, duration_s, row_id))
+        with conn:
+            conn.executemany('''
+                UPDATE logs SET start_ts = ?, stop_ts = ?, duration_s = ? WHERE id = ?
+            ''', values)
+        last_id = rows[-1][0]
+        updated += len(rows)
+
+def migrate_v3(conn):
+    """Create the rollup tables and fill them from the existing rows."""
+    log_stats.rebuild_rollups(conn)
+    conn.execute("PRAGMA user_version = 3")
+    conn.commit()
+
+def migrate_v4(conn):
+    """Nothing to change at startup: the VACUUM that switches an existing file to
+    incremental auto-vacuum rewrites all of it, so the retention job does it in the background."""
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+
+# === Value Conversion ===
+
+def parse_timestamp(text):
+    """Convert a stored "YYYY-MM-DD HH:MM:SS" local time to epoch seconds."""
+    try:
+        return int(datetime.strptime(text, TIME_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def parse_duration(text):
+    """Convert a str(timedelta) duration such as "1 day, 0:05:00" to seconds."""
+    match = _DURATION_RE.match(text or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0) * 86400 + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+def format_timestamp(ts):
+    """Format epoch seconds as a local "YYYY-MM-DD HH:MM:SS" string."""
+    if ts is None:
+        return ""
+    return datetime.fromtimestamp(ts).strftime(TIME_FORMAT)
+
+def format_duration(seconds):
+    """Format a duration in seconds as H:MM:SS, e.g. "0:05:00"."""
+    if seconds is None:
+        return ""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Ships new log rows from this Pi to the fleet collector (see collector.py).
+
+Rows above the id high-water mark kept in sync_state.json are sent oldest
+first, SYNC_BATCH_ROWS at a time, as gzip-compressed JSON:
+
+    {"device_id": "press-3", "columns": ["id", "name", ...], "rows": [[...], ...]}
+
+The collector upserts them keyed on (device_id, id), so a batch that
+arrives twice (its answer was lost, or the state file was reset) changes
+nothing, and the mark only moves once the collector has confirmed a batch.
+A failed post is retried with exponential backoff and jitter before the
+run gives up; the next run starts again from the mark.
+
+Run `python3 fleet_sync.py --url http://collector:8400/ingest [logs.db]`
+to sync by hand.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+
+SYNC_BATCH_ROWS = 500
+SYNC_TIMEOUT = 10.0      # Seconds to wait for the collector's answer
+SYNC_ATTEMPTS = 4        # Posts of one batch before the run gives up
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+SYNC_COLUMNS = ["id", "name", "start_ts", "stop_ts", "duration_s", "press"]
+_SELECT = f'SELECT {", ".join(SYNC_COLUMNS)} FROM logs WHERE id > ? ORDER BY id LIMIT ?'
+
+
+class SyncError(Exception):
+    """The collector could not be reached or did not accept a batch."""
+
+
+def default_device_id():
+    return socket.gethostname()
+
+def backoff_delay(failures, base=RETRY_BASE_SECONDS, maximum=RETRY_MAX_SECONDS, rng=random):
+    """Seconds to wait after `failures` failures in a row: doubling, capped, half of it random.
+
+    The random half keeps a fleet that lost the collector at the same
+    moment from retrying in lockstep.
+    """
+    delay = min(maximum, base * 2 ** failures)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+# === Sync State ===
+
+def load_sync_state(state_file):
+    try:
+        with open(state_file, "r") as file:
+            state = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault("last_id", 0)
+    return state
+
+def save_sync_state(state_file, state):
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as file:
+        json.dump(state, file)
+    os.replace(tmp_file, state_file)
+
+# === Transport ===
+
+def encode_batch(device_id, rows):
+    """Serialize and compress one batch of rows."""
+    payload = {"device_id": device_id, "columns": SYNC_COLUMNS, "rows": rows}
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), compresslevel=6)
+
+def post_batch(url, body, timeout=SYNC_TIMEOUT):
+    """POST a compressed batch; returns the collector's decoded answer."""
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise SyncError(f"collector answered {e.code} {e.reason}") from e
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise SyncError(f"collector unreachable: {e}") from e
+
+
+class SyncAgent:
+    """Sends the rows of one logs.db to a collector, remembering how far it got."""
+
+    def __init__(self, db_path, url, device_id, state_file, batch_rows=SYNC_BATCH_ROWS,
+                 attempts=SYNC_ATTEMPTS, timeout=SYNC_TIMEOUT, post=post_batch):
+        self.db_path = db_path
+        self.url = url
+        self.device_id = device_id
+        self.state_file = state_file
+        self.batch_rows = batch_rows
+        self.attempts = attempts
+        self.timeout = timeout
+        self.post = post
+        self.failures = 0  # Runs that failed in a row, see retry_delay()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Make a running sync give up at its next retry or batch, e.g. on shutdown."""
+        self._stopping.set()
+
+    def last_id(self):
+        """Highest row id the collector has confirmed."""
+        return load_sync_state(self.state_file)["last_id"]
+
+    def sync(self):
+        """Send every row above the mark; returns {"rows", "batches", "bytes"} sent.
+
+        Raises SyncError once a batch has failed every attempt; the batches
+        confirmed before it stay confirmed.
+        """
+        state = load_sync_state(self.state_file)
+        sent = {"rows": 0, "batches": 0, "bytes": 0}
+        conn = sqlite3.connect(self.db_path)
+        try:
+            while not self._stopping.is_set():
+                rows = conn.execute(_SELECT, (state["last_id"], self.batch_rows)).fetchall()
+                if not rows:
+                    break
+                body = encode_batch(self.device_id, rows)
+                self._post_with_retry(body, len(rows))
+                state["last_id"] = rows[-1][0]
+                save_sync_state(self.state_file, state)
+                sent["rows"] += len(rows)
+                sent["batches"] += 1
+                sent["bytes"] += len(body)
+        except SyncError:
+            self.failures += 1
+            raise
+        finally:
+            conn.close()
+        self.failures = 0
+        return sent
+
+    def retry_delay(self, base, maximum):
+        """Seconds until the next run after the failed ones."""
+        return backoff_delay(self.failures - 1, base, maximum)
+
+    def _post_with_retry(self, body, row_count):
+        for attempt in range(self.attempts):
+            try:
+                answer = self.post(self.url, body, self.timeout)
+                accepted = answer.get("accepted") if isinstance(answer, dict) else None
+                if accepted != row_count:
+                    raise SyncError(f"collector accepted {accepted} of {row_count} rows")
+                return answer
+            except SyncError:
+                if attempt + 1 == self.attempts:
+                    raise
+                if self._stopping.wait(backoff_delay(attempt)):
+                    raise SyncError("stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Send new log rows to the fleet collector.")
+    parser.add_argument("db", nargs="?", default="logs.db", help="Path to logs.db")
+    parser.add_argument("--url", required=True, help="Collector ingest URL, e.g. http://collector:8400/ingest")
+    parser.add_argument("--device-id", default=default_device_id(), help="Name of this Pi (default: hostname)")
+    parser.add_argument("--state-file", default="sync_state.json", help="Where the high-water mark is kept")
+    args = parser.parse_args()
+    sent = SyncAgent(args.db, args.url, args.device_id, args.state_file).sync()
+    print(f"Sent {sent['rows']} rows in {sent['batches']} batches ({sent['bytes']} bytes).")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Display-less stand-ins for the Tk root and widgets (--headless mode).
+
+The timer logic only needs root.after() scheduling and widgets that accept
+config(); these classes provide just that, so the application can run on a
+machine without a display, or be driven by a simulated clock.
+"""
+
+import heapq
+import itertools
+import time
+
+
+class VirtualClock:
+    """A clock that only moves when sleep() is called; for simulations."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class HeadlessRoot:
+    """Runs root.after() callbacks in time order without a window."""
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self._queue = []  # (due, sequence, after_id)
+        self._callbacks = {}
+        self._ids = itertools.count(1)
+        self._running = False
+
+    def after(self, ms, func, *args):
+        sequence = next(self._ids)
+        after_id = f"after#{sequence}"
+        self._callbacks[after_id] = (func, args)
+        heapq.heappush(self._queue, (self.clock() + ms / 1000.0, sequence, after_id))
+        return after_id
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id):
+        self._callbacks.pop(after_id, None)
+
+    def pending_callbacks(self):
+        """Number of after() callbacks waiting to run."""
+        return len(self._callbacks)
+
+    def run_next(self, until=None):
+        """Run the next due callback, sleeping until it is due.
+
+        Returns False when nothing is scheduled before `until`.
+        """
+        while self._queue:
+            due, _, after_id = self._queue[0]
+            if after_id not in self._callbacks:
+                heapq.heappop(self._queue)
+                continue
+            if until is not None and due > until:
+                return False
+            delay = due - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+            heapq.heappop(self._queue)
+            func, args = self._callbacks.pop(after_id)
+            func(*args)
+            return True
+        return False
+
+    def run_until(self, until):
+        """Run every callback due up to clock time `until`."""
+        while self.run_next(until):
+            pass
+        delay = until - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+
+    def mainloop(self):
+        self._running = True
+        while self._running and self.run_next():
+            pass
+
+    def destroy(self):
+        self._running = False
+        self._callbacks.clear()
+
+    def update_idletasks(self):
+        pass
+
+    def bind(self, sequence, func):
+        pass
+
+    def protocol(self, name, func):
+        pass
+
+
+class HeadlessWidget:
+    """Accepts the widget calls the timer screens make and remembers the options.
+
+    With echo=True text changes are printed, so a headless run still shows
+    what the screen would say.
+    """
+
+    def __init__(self, name="", echo=False, **options):
+        self.name = name
+        self.echo = echo
+        self.options = dict(options)
+
+    def config(self, **options):
+        if self.echo and options.get("text") and options["text"] != self.options.get("text"):
+            print(f"[{self.name}] {options['text']}")
+        self.options.update(options)
+
+    configure = config
+
+    def cget(self, option):
+        return self.options.get(option)
+
+    def pack(self, *args, **kwargs):
+        pass
+
+    def pack_forget(self):
+        pass
+
+    def focus_set(self):
+        pass
+
+
+class HeadlessTreeview(HeadlessWidget):
+    """Stand-in for ttk.Treeview that keeps the inserted rows in order."""
+
+    def __init__(self, name="", **options):
+        super().__init__(name, **options)
+        self._items = []
+        self._values = {}
+        self._ids = itertools.count(1)
+
+    def get_children(self, item=""):
+        return tuple(self._items)
+
+    def insert(self, parent, index, iid=None, values=()):
+        if iid is None:
+            iid = f"I{next(self._ids)}"
+        if index == "end":
+            self._items.append(iid)
+        else:
+            self._items.insert(index, iid)
+        self._values[iid] = tuple(values)
+        return iid
+
+    def delete(self, *items):
+        for iid in items:
+            self._items.remove(iid)
+            del self._values[iid]
+
+    def item(self, iid):
+        return {"values": list(self._values[iid])}
+
+
+class HeadlessVar:
+    """Stand-in for tk.StringVar."""
+
+    def __init__(self, value="", name="", echo=False):
+        self.name = name
+        self.echo = echo
+        self._value = value
+
+    def set(self, value):
+        if self.echo and value != self._value:
+            print(f"[{self.name}] {value}")
+        self._value = value
+
+    def get(self):
+        return self._value
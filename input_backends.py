@@ -0,0 +1,107 @@
+"""Sources of button presses: GPIO pins, the keyboard, or a scripted replay.
+
+Every backend is started with start(root, push) and reports a press by
+calling push(key) with the button key the application expects (a timer
+number, or a (station_id, button) pair in station mode).
+"""
+
+
+class GpioInput:
+    """Buttons wired to the Raspberry Pi's GPIO pins."""
+
+    def __init__(self, pins):
+        self.pins = dict(pins)  # GPIO pin -> button key
+        self.gpio = None
+
+    def start(self, root, push):
+        import RPi.GPIO as GPIO  # Only available (and only needed) on the Pi
+
+        self.gpio = GPIO
+        GPIO.setmode(GPIO.BCM)
+        for pin, key in self.pins.items():
+            GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_OFF)  # No internal pull-downs
+            # GPIO callbacks run on RPi.GPIO's own thread, so they only queue the press
+            GPIO.add_event_detect(
+                pin,
+                GPIO.RISING,  # Detect rising edge (LOW -> HIGH)
+                callback=lambda channel, key=key: push(key)
+            )
+
+    def stop(self):
+        if self.gpio is not None:
+            self.gpio.cleanup()
+            self.gpio = None
+
+
+class KeyboardInput:
+    """Number keys 1-9 act as the buttons, in the order they are given."""
+
+    def __init__(self, keys):
+        self.keys = list(keys)[:9]
+
+    def start(self, root, push):
+        for number, key in enumerate(self.keys, start=1):
+            root.bind(f"<KeyPress-{number}>", lambda event, key=key: self._press(event, key, push))
+
+    def _press(self, event, key, push):
+        # Digits typed into the settings screen's entries are not presses
+        if event.widget.winfo_class() != "Entry":
+            push(key)
+
+    def stop(self):
+        pass
+
+
+class ScriptedInput:
+    """Replays presses from a script, for demos, soak runs and benchmarks.
+
+    Each non-empty line is "<seconds> <button>", where seconds are counted
+    from start() and button is a timer number, or "<station>/<button>" with
+    both numbers starting at 1. Lines starting with # are ignored.
+    """
+
+    def __init__(self, events, repeat=False):
+        self.events = sorted(events)  # [(seconds, key), ...]
+        self.repeat = repeat
+        self.root = None
+        self._after_ids = []
+
+    @classmethod
+    def from_file(cls, path, repeat=False):
+        events = []
+        with open(path, "r") as file:
+            for line_number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    seconds, button = line.split()
+                    events.append((float(seconds), parse_button(button)))
+                except ValueError:
+                    raise ValueError(f"{path}:{line_number}: expected '<seconds> <button>', got {line!r}")
+        return cls(events, repeat=repeat)
+
+    def start(self, root, push):
+        self.root = root
+        self._schedule(push)
+
+    def stop(self):
+        for after_id in self._after_ids:
+            self.root.after_cancel(after_id)
+        self._after_ids = []
+
+    def _schedule(self, push):
+        self._after_ids = [self.root.after(int(seconds * 1000), push, key)
+                           for seconds, key in self.events]
+        if self.repeat and self.events:
+            # Start the next round one second after the last press
+            period = self.events[-1][0] + 1.0
+            self._after_ids.append(self.root.after(int(period * 1000), self._schedule, push))
+
+
+def parse_button(text):
+    """Parse "3" as timer button 3, or "2/3" as button 3 of the second station."""
+    if "/" in text:
+        station, button = text.split("/", 1)
+        return (int(station) - 1, int(button))
+    return int(text)
@@ -0,0 +1,106 @@
+"""Hands button presses from input threads to the Tk main loop."""
+
+import time
+import traceback
+from collections import deque
+
+# Recent press-to-screen latency samples kept for inspection
+LATENCY_HISTORY = 500
+
+# Press-to-screen latency target, in seconds
+LATENCY_TARGET = 0.050
+
+
+class InputQueue:
+    """Queue of timestamped button presses drained by the Tk loop.
+
+    push() is safe to call from any thread (e.g. RPi.GPIO's callback thread):
+    it only appends to a deque, which is atomic in CPython, so no lock is
+    taken. The Tk loop drains the deque every poll_ms milliseconds, drops
+    presses that arrive within `debounce` seconds of the last accepted press
+    of the same button, and calls handler(button) on the main thread. An
+    exception from the handler is printed and the remaining presses are
+    still handled, so one bad press never stops the polling.
+    """
+
+    def __init__(self, handler, poll_ms=10, debounce=0.3, clock=time.monotonic, on_latency=None):
+        self.handler = handler
+        self.on_latency = on_latency  # on_latency(seconds) for every accepted press
+        self.poll_ms = poll_ms
+        self.debounce = debounce
+        self.clock = clock
+        self.root = None
+        self._events = deque()
+        self._last_accepted = {}
+        self._after_id = None
+        self._stopped = False
+        self._latency = deque(maxlen=LATENCY_HISTORY)
+        self._latency_count = 0
+        self._latency_max = 0.0
+        self._over_target = 0
+
+    def push(self, button):
+        """Record a press of `button`; callable from any thread."""
+        self._events.append((button, self.clock()))
+
+    def start(self, root):
+        """Start draining the queue on root's event loop."""
+        self.root = root
+        self._stopped = False
+        if self._after_id is None:
+            self._after_id = root.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        """Stop draining the queue."""
+        self._stopped = True
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def latency_stats(self):
+        """Return press-to-screen latency (in seconds) measured so far."""
+        recent = sorted(self._latency)
+        return {
+            "presses": self._latency_count,
+            "median": recent[len(recent) // 2] if recent else 0.0,
+            "p95": recent[int(len(recent) * 0.95)] if recent else 0.0,
+            "max": self._latency_max,
+            "over_target": self._over_target,
+        }
+
+    def _poll(self):
+        self._after_id = None
+        try:
+            accepted = []
+            while self._events:
+                button, pressed_at = self._events.popleft()
+                if pressed_at - self._last_accepted.get(button, float("-inf")) < self.debounce:
+                    print(f"Button {button} press ignored due to debounce.")  # Debugging statement
+                    continue
+                self._last_accepted[button] = pressed_at
+                try:
+                    self.handler(button)
+                except Exception as error:
+                    print(f"Handling button {button} failed:")
+                    traceback.print_exception(type(error), error, error.__traceback__)
+                    continue
+                accepted.append(pressed_at)
+            if accepted:
+                # Push the widget changes to the screen before taking the time
+                self.root.update_idletasks()
+                shown_at = self.clock()
+                for pressed_at in accepted:
+                    self._record_latency(shown_at - pressed_at)
+        finally:
+            # The handler may have stopped the queue (e.g. a press that shuts down)
+            if not self._stopped:
+                self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _record_latency(self, latency):
+        self._latency.append(latency)
+        self._latency_count += 1
+        self._latency_max = max(self._latency_max, latency)
+        if latency > LATENCY_TARGET:
+            self._over_target += 1
+        if self.on_latency is not None:
+            self.on_latency(latency)
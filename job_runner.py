@@ -0,0 +1,86 @@
+"""Runs slow jobs (exports, backups) on worker threads instead of the Tk loop."""
+
+import queue
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobRunner:
+    """Thread pool whose completion callbacks are delivered on the Tk thread.
+
+    Tk widgets may only be touched from the main thread, so finished jobs are
+    put on a queue that the Tk loop drains with root.after() while any job is
+    outstanding. Jobs are named; a job is refused while another job with the
+    same name is still queued or running.
+    """
+
+    def __init__(self, root, max_workers=2, poll_ms=100, on_status=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_status = on_status  # Called on the Tk thread as on_status(name, text)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._done = queue.Queue()
+        self._active = {}
+        self._poll_after_id = None
+        self._status = {}
+
+    def submit(self, name, func, *args, on_done=None):
+        """Queue func(*args) as job `name`; returns False if it is already running.
+
+        on_done(result, error) runs on the Tk thread once the job finishes;
+        error is None on success.
+        """
+        if name in self._active:
+            return False
+        started = time.monotonic()
+        future = self._executor.submit(func, *args)
+        self._active[name] = (future, on_done, started)
+        self._set_status(name, "running")
+        future.add_done_callback(lambda f, n=name: self._done.put(n))
+        if self._poll_after_id is None:
+            self._poll_after_id = self.root.after(self.poll_ms, self._poll)
+        return True
+
+    def is_running(self, name):
+        """Return True while job `name` is queued or running."""
+        return name in self._active
+
+    def status(self):
+        """Return the latest status text of every job seen so far."""
+        return dict(self._status)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for running ones to finish."""
+        if self._poll_after_id is not None:
+            self.root.after_cancel(self._poll_after_id)
+            self._poll_after_id = None
+        self._executor.shutdown(wait=wait)
+
+    def _poll(self):
+        self._poll_after_id = None
+        while True:
+            try:
+                name = self._done.get_nowait()
+            except queue.Empty:
+                break
+            future, on_done, started = self._active.pop(name)
+            elapsed = time.monotonic() - started
+            error = future.exception()
+            result = None if error else future.result()
+            stamp = datetime.now().strftime("%H:%M:%S")
+            if error:
+                traceback.print_exception(type(error), error, error.__traceback__)
+                self._set_status(name, f"failed at {stamp}: {error}")
+            else:
+                self._set_status(name, f"done at {stamp} ({elapsed:.1f} s)")
+            if on_done is not None:
+                on_done(result, error)
+        if self._active:
+            self._poll_after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _set_status(self, name, text):
+        self._status[name] = text
+        if self.on_status is not None:
+            self.on_status(name, text)
@@ -0,0 +1,227 @@
+"""Crash-safe journal of the intervals that are currently open.
+
+Every state change (and a periodic heartbeat) appends one JSON line with
+the complete list of open intervals, so only the last line matters. A
+background thread writes and fdatasyncs the lines, always skipping to the
+newest record, so the Tk loop never waits for the SD card. On startup the
+last line is found by reading backwards from the end of the file, which
+takes the same time however large the journal has grown; the file is
+compacted to that single line once it passes max_bytes, or when it ends
+in a line torn by a crash.
+
+Only one process may run the timers, so open() takes an exclusive lock on
+a .lock file next to the journal (not the journal itself, which
+compaction replaces) and holds it until close().
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is not locked
+    fcntl = None
+
+from db_schema import format_timestamp
+
+JOURNAL_MAX_BYTES = 256 * 1024
+TAIL_READ_BYTES = 4096
+
+# An idle interval whose heartbeat is at most this old is resumed on startup;
+# after a longer outage it is closed at the last heartbeat instead.
+RESUME_GAP = 5 * 60
+
+
+def read_last_record(path):
+    """Return the last complete record of a journal file, or None."""
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with file:
+        end = file.seek(0, os.SEEK_END)
+        tail = b""
+        position = end
+        while position > 0:
+            step = min(TAIL_READ_BYTES, position)
+            position -= step
+            file.seek(position)
+            tail = file.read(step) + tail
+            lines = tail.split(b"\n")
+            # lines[0] may be cut off unless we reached the start of the file
+            candidates = lines if position == 0 else lines[1:]
+            for line in reversed(candidates):
+                if not line.strip():
+                    continue
+                try:
+                    return json.loads(line)
+                except ValueError:
+                    continue  # A line torn by a crash mid-write
+    return None
+
+def ends_with_newline(path):
+    """Whether a journal file is empty or its last line is complete."""
+    with open(path, "rb") as file:
+        if file.seek(0, os.SEEK_END) == 0:
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b"\n"
+
+def recovery_action(entry, now, alive_ts, resume_gap=RESUME_GAP):
+    """Decide what happens to an interval that was open when the journal was last written.
+
+    Returns ("resume", None) to carry on with it, or ("log", stop_ts) to log
+    it as ended at stop_ts. A countdown ends when it would have run out; an
+    idle period resumes after a short restart and otherwise ends at the
+    last heartbeat, the last moment the application is known to have run.
+    """
+    if entry["state"] == "running":
+        end_ts = entry["start_ts"] + entry["duration"]
+        return ("resume", None) if now < end_ts else ("log", end_ts)
+    if now - alive_ts <= resume_gap:
+        return "resume", None
+    return "log", max(entry["start_ts"], alive_ts)
+
+def already_logged(db_path, interval):
+    """Whether logs.db has a row for a journaled interval."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT 1 FROM logs WHERE start_ts = ? AND name = ? AND press IS ? LIMIT 1',
+                            (interval["start_ts"], interval["name"], interval["press"])).fetchone() is not None
+    finally:
+        conn.close()
+
+def recover_record(record, now, log_interval, is_logged, can_resume):
+    """Deal with the intervals a run left open when it ended (after a crash or power cut).
+
+    Rows that were logged but never committed are passed to
+    log_interval(name, start_ts, stop_ts, press) again unless is_logged()
+    finds them; open intervals that ended meanwhile are logged, the others
+    are returned keyed on station id (None for the single timer) to be
+    resumed if can_resume(entry) allows.
+    """
+    resume = {}
+    if not record:
+        return resume
+    for interval in record.get("logged", []):
+        if not is_logged(interval):
+            log_interval(interval["name"], interval["start_ts"], interval["stop_ts"], interval["press"])
+            print(f"Recovered uncommitted {interval['name']} interval from {format_timestamp(interval['start_ts'])}")
+    for entry in record.get("open", []):
+        action, stop_ts = recovery_action(entry, now, record["alive_ts"])
+        if action == "resume" and can_resume(entry):
+            resume[entry["station"]] = entry
+            print(f"Resuming {entry['name']} started at {format_timestamp(entry['start_ts'])}")
+            continue
+        if stop_ts is None:
+            stop_ts = now
+        log_interval(entry["name"], entry["start_ts"], stop_ts, entry["press"])
+        print(f"Recovered {entry['name']} interval from {format_timestamp(entry['start_ts'])} "
+              f"to {format_timestamp(stop_ts)}")
+    return resume
+
+
+class JournalLocked(RuntimeError):
+    """Another process holds the journal, i.e. is running the timers."""
+
+
+class Journal:
+    """Appends records to the journal file from a background thread."""
+
+    def __init__(self, path, max_bytes=JOURNAL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._fd = None
+        self._lock_fd = None
+        self._size = 0
+        self._changed = threading.Condition()
+        self._pending = None
+        self._closing = False
+        self._thread = None
+
+    def open(self):
+        """Lock and open the journal for appending and start the writer thread.
+
+        Raises JournalLocked if another process has it open.
+        """
+        self._lock_fd = self._lock()
+        last = read_last_record(self.path)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        # A line torn by a crash would otherwise be glued to the next record
+        if self._size > self.max_bytes or not ends_with_newline(self.path):
+            self._compact(last)
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+        return last
+
+    def append(self, record):
+        """Queue a record; only the newest queued record is written."""
+        with self._changed:
+            self._pending = record
+            self._changed.notify()
+
+    def close(self, record=None):
+        """Write a final record (if given) and any queued one, then stop."""
+        if record is not None:
+            self.append(record)
+        with self._changed:
+            self._closing = True
+            self._changed.notify()
+        if self._thread is not None:
+            self._thread.join(10.0)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # Releases the lock
+            self._lock_fd = None
+
+    def _lock(self):
+        if fcntl is None:
+            return None
+        fd = os.open(self.path + ".lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise JournalLocked(f"{self.path} is in use by another process running the timers")
+        return fd
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._pending is not None or self._closing)
+                record, self._pending = self._pending, None
+                closing = self._closing
+            if record is not None:
+                try:
+                    self._write(record)
+                except OSError as e:
+                    print(f"Failed to write the journal: {e}")
+            if closing and record is None:
+                return
+
+    def _write(self, record):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        os.write(self._fd, line)
+        getattr(os, "fdatasync", os.fsync)(self._fd)
+        self._size += len(line)
+        if self._size > self.max_bytes:
+            self._compact(record)
+
+    def _compact(self, record):
+        """Replace the journal with a file holding just `record`."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            if record is not None:
+                file.write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
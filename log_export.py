@@ -0,0 +1,245 @@
+"""Incremental export of the logs table to CSV or Excel files."""
+
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from db_schema import format_duration, format_timestamp
+
+EXPORT_COLUMNS = ["Name", "Start Time", "Stop Time", "Duration", "Press"]
+EXPORT_CHUNK_ROWS = 1000
+EXCEL_MAX_ROWS = 1000000  # Stay below Excel's 1,048,576 row sheet limit
+
+EXPORT_FORMATS = ("csv", "xlsx")
+EXPORT_PARTITIONS = ("none", "day", "month")
+
+# strftime format of a partition's name
+_PARTITION_KEY_FORMAT = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+# Partition for rows whose start time could not be parsed during migration
+UNDATED_PARTITION = "undated"
+
+# Columns read for export, in the order export_row() expects
+_EXPORT_SELECT = 'SELECT id, name, start_ts, stop_ts, duration_s, press FROM logs'
+
+# === Export State ===
+
+def load_export_state(state_file):
+    """Load the export high-water mark, starting from scratch if missing."""
+    try:
+        with open(state_file, "r") as file:
+            state = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault("last_id", 0)
+    state.setdefault("files", {})
+    return state
+
+def save_export_state(state_file, state):
+    """Write the export state next to the exported files."""
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as file:
+        json.dump(state, file)
+    os.replace(tmp_file, state_file)
+
+# === Row Streaming ===
+
+def iter_row_chunks(cursor, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the rows of an executed cursor in chunks of chunk_rows."""
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+def export_row(row):
+    """Format an (id, name, start_ts, stop_ts, duration_s, press) row for export."""
+    row_id, name, start_ts, stop_ts, duration_s, press = row
+    return [name, format_timestamp(start_ts), format_timestamp(stop_ts),
+            format_duration(duration_s), press or ""]
+
+def partition_key(start_ts, partition):
+    """Return the partition name for a start_ts epoch value."""
+    if partition == "none":
+        return None
+    if start_ts is None:
+        return UNDATED_PARTITION
+    return datetime.fromtimestamp(start_ts).strftime(_PARTITION_KEY_FORMAT[partition])
+
+def partition_bounds(key, partition):
+    """Return the [start, end) start_ts range covered by a partition."""
+    start = datetime.strptime(key, _PARTITION_KEY_FORMAT[partition])
+    if partition == "day":
+        end = datetime.fromordinal(start.toordinal() + 1)
+    elif start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return int(start.timestamp()), int(end.timestamp())
+
+def partition_path(export_dir, key, extension):
+    """Return the export file path for a partition (or the rolling file)."""
+    if key is None:
+        return os.path.join(export_dir, f"logs.{extension}")
+    return os.path.join(export_dir, f"logs_{key}.{extension}")
+
+# === CSV Export ===
+
+def export_csv(conn, export_dir, state, partition, chunk_rows=EXPORT_CHUNK_ROWS, save_state=None):
+    """Append rows above the high-water mark to the rolling/partitioned CSVs.
+
+    state["files"] keeps the size of every CSV exported to so far. Before a
+    run first appends to a file, its starting size is recorded and
+    save_state(state) is called, so a run interrupted after that (also one
+    that created a new partition) is truncated away by the next run.
+    """
+    # Drop anything appended after the last recorded state, e.g. by a run
+    # that was interrupted before it could save, so rows are never doubled.
+    for path, size in state["files"].items():
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, "r+b") as file:
+                file.truncate(size)
+
+    cursor = conn.cursor()
+    cursor.execute(_EXPORT_SELECT + ' WHERE id > ? ORDER BY id', (state["last_id"],))
+    exported = 0
+    files = {}
+    try:
+        for rows in iter_row_chunks(cursor, chunk_rows):
+            for row in rows:
+                path = partition_path(export_dir, partition_key(row[2], partition), "csv")
+                if path not in files:
+                    size = os.path.getsize(path) if os.path.exists(path) else 0
+                    if state["files"].get(path) != size:
+                        state["files"][path] = size
+                        if save_state is not None:
+                            save_state(state)
+                    is_new = size == 0
+                    file = open(path, "a", newline="")
+                    writer = csv.writer(file)
+                    if is_new:
+                        writer.writerow(EXPORT_COLUMNS)
+                    files[path] = (file, writer)
+                files[path][1].writerow(export_row(row))
+            for path, (file, writer) in files.items():
+                file.flush()
+                state["files"][path] = file.tell()
+            state["last_id"] = rows[-1][0]
+            exported += len(rows)
+    finally:
+        for file, writer in files.values():
+            file.close()
+    return exported
+
+# === Excel Export ===
+
+def write_xlsx(path, row_chunks):
+    """Stream chunks of log rows into a new workbook using openpyxl's write-only mode."""
+    from openpyxl import Workbook  # Only needed when exporting to Excel
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = EXCEL_MAX_ROWS
+    written = 0
+    for rows in row_chunks:
+        for row in rows:
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Logs {len(workbook.worksheets) + 1}")
+                sheet.append(EXPORT_COLUMNS)
+                sheet_rows = 0
+            sheet.append(export_row(row))
+            sheet_rows += 1
+            written += 1
+    if sheet is None:
+        workbook.create_sheet("Logs 1").append(EXPORT_COLUMNS)
+    tmp_path = path + ".tmp"
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)  # Never leave a half-written workbook behind
+    return written
+
+def export_xlsx(conn, export_dir, state, partition, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Rewrite only the Excel partitions that received rows above the high-water mark.
+
+    Needs a "day" or "month" partition; a single workbook would be
+    rewritten whole on every run (see check_export_layout).
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(id) FROM logs')
+    max_id = cursor.fetchone()[0]
+    if max_id is None or max_id <= state["last_id"]:
+        return 0
+
+    cursor.execute('SELECT start_ts FROM logs WHERE id > ? AND id <= ?', (state["last_id"], max_id))
+    keys = set()
+    for rows in iter_row_chunks(cursor, chunk_rows):
+        keys.update(partition_key(row[0], partition) for row in rows)
+
+    for key in sorted(keys):
+        if key == UNDATED_PARTITION:
+            cursor.execute(_EXPORT_SELECT + ' WHERE start_ts IS NULL AND id <= ? ORDER BY id', (max_id,))
+        else:
+            # Range scan on idx_logs_start_ts instead of reading the whole table
+            start_ts, end_ts = partition_bounds(key, partition)
+            cursor.execute(_EXPORT_SELECT + '''
+                WHERE start_ts >= ? AND start_ts < ? AND id <= ? ORDER BY start_ts, id
+            ''', (start_ts, end_ts, max_id))
+        write_xlsx(partition_path(export_dir, key, "xlsx"), iter_row_chunks(cursor, chunk_rows))
+
+    cursor.execute('SELECT COUNT(*) FROM logs WHERE id > ? AND id <= ?', (state["last_id"], max_id))
+    exported = cursor.fetchone()[0]
+    state["last_id"] = max_id
+    return exported
+
+# === Export Entry Points ===
+
+def check_export_layout(export_format, partition):
+    """Raise ValueError for a format and partition the scheduled export does not support."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if partition not in EXPORT_PARTITIONS:
+        raise ValueError(f"Unknown export partition: {partition}")
+    if export_format == "xlsx" and partition == "none":
+        # A workbook cannot be appended to, so every run would rewrite the whole table
+        raise ValueError('"xlsx" needs a "day" or "month" partition; use "csv" for a single file')
+
+def export_logs(db_path, export_dir, export_format="xlsx", partition="month", state_file=None):
+    """Export rows logged since the previous run; returns the number of new rows."""
+    check_export_layout(export_format, partition)
+    os.makedirs(export_dir, exist_ok=True)
+    if state_file is None:
+        state_file = os.path.join(export_dir, "export_state.json")
+    state = load_export_state(state_file)
+    # Switching format or partitioning starts the new layout from the beginning
+    if state.get("format") != export_format or state.get("partition") != partition:
+        state = {"last_id": 0, "files": {}, "format": export_format, "partition": partition}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if export_format == "csv":
+            exported = export_csv(conn, export_dir, state, partition,
+                                  save_state=lambda state: save_export_state(state_file, state))
+        else:
+            exported = export_xlsx(conn, export_dir, state, partition)
+    finally:
+        conn.close()
+    save_export_state(state_file, state)
+    return exported
+
+def export_all_logs(db_path, xlsx_path, chunk_rows=EXPORT_CHUNK_ROWS, archive_paths=()):
+    """Re-export the whole logs table to a single workbook.
+
+    Rows of the archive databases in archive_paths (oldest first, see
+    retention.py) are written before the rows still in db_path.
+    """
+    def all_chunks():
+        for path in list(archive_paths) + [db_path]:
+            conn = sqlite3.connect(path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(_EXPORT_SELECT + ' ORDER BY id')
+                yield from iter_row_chunks(cursor, chunk_rows)
+            finally:
+                conn.close()
+    return write_xlsx(xlsx_path, all_chunks())
@@ -0,0 +1,193 @@
+"""Filtered, paged queries over the logs table for the log screen.
+
+A LogFilter becomes one parameterized WHERE clause that the existing
+indexes serve: idx_logs_name_start_ts for a timer name (with or without a
+date range) and idx_logs_start_ts otherwise. Pages are keyed on
+(start_ts, id), newest first, so every page is an index range scan however
+far the user scrolls, and they continue into the monthly archives (see
+retention.py) once logs.db runs out. Counts come from the hourly rollups,
+which also cover archived rows; only the partial hours at the ends of the
+range, or a minimum duration, which the rollups cannot answer, need the
+rows themselves.
+"""
+
+import math
+import os
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+import log_export
+import log_stats
+import retention
+
+QUERY_CACHE_ENTRIES = 32
+
+FILTER_TIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+# Any field may be None; start_ts/end_ts bound the start time as [start_ts, end_ts)
+LogFilter = namedtuple("LogFilter", "name start_ts end_ts min_duration", defaults=(None, None, None, None))
+
+_SELECT = 'SELECT id, name, start_ts, stop_ts, duration_s, press FROM {table} WHERE {where}'
+
+# === Filters ===
+
+def parse_filter_time(text, end=False):
+    """Parse "YYYY-MM-DD [HH:MM]" to epoch seconds; a bare date as the end includes that day."""
+    text = text.strip()
+    if not text:
+        return None
+    for time_format in FILTER_TIME_FORMATS:
+        try:
+            moment = datetime.strptime(text, time_format)
+        except ValueError:
+            continue
+        if end and time_format == "%Y-%m-%d":
+            moment += timedelta(days=1)
+        return int(moment.timestamp())
+    raise ValueError(f"Expected YYYY-MM-DD or YYYY-MM-DD HH:MM, got {text!r}")
+
+def parse_filter(name="", since="", until="", min_minutes=""):
+    """Build a LogFilter from the log screen's fields; returns None if they are all empty."""
+    min_duration = None
+    if min_minutes.strip():
+        min_duration = int(float(min_minutes) * 60)
+        if min_duration < 0:
+            raise ValueError("The minimum duration cannot be negative")
+    log_filter = LogFilter(name.strip() or None, parse_filter_time(since), parse_filter_time(until, end=True),
+                           min_duration)
+    return log_filter if log_filter != LogFilter() else None
+
+def filter_clause(log_filter, start_ts=None, end_ts=None):
+    """WHERE clause and parameters for a filter, optionally narrowed to [start_ts, end_ts)."""
+    # Undated rows have no place in the (start_ts, id) order and are never counted by the rollups
+    conditions = ["start_ts IS NOT NULL", "duration_s IS NOT NULL"]
+    params = []
+    if log_filter.name is not None:
+        conditions.append("name = ?")
+        params.append(log_filter.name)
+    for bound, operator in ((log_filter.start_ts, ">="), (start_ts, ">="),
+                            (log_filter.end_ts, "<"), (end_ts, "<")):
+        if bound is not None:
+            conditions.append(f"start_ts {operator} ?")
+            params.append(bound)
+    if log_filter.min_duration is not None:
+        conditions.append("duration_s >= ?")
+        params.append(log_filter.min_duration)
+    return " AND ".join(conditions), params
+
+def archives_in_range(archive_dir, log_filter):
+    """Archive files (newest first) holding months that overlap the filter's range."""
+    paths = []
+    for path in retention.archive_paths(archive_dir):
+        month_start, month_end = log_export.partition_bounds(retention.archive_month(path), "month")
+        if log_filter.start_ts is not None and month_end <= log_filter.start_ts:
+            continue
+        if log_filter.end_ts is not None and month_start >= log_filter.end_ts:
+            continue
+        paths.append(path)
+    return paths
+
+def _attached(conn, path):
+    """Attach an archive read-only as "archive"; the caller detaches it."""
+    conn.execute("ATTACH DATABASE ? AS archive", (retention.read_only_uri(path),))
+
+# === Queries ===
+
+def fetch_page(conn, log_filter, archive_dir, after_key=None, limit=100):
+    """Fetch up to `limit` matching (id, name, start_ts, stop_ts, duration_s, press) rows,
+    newest first, that come after the (start_ts, id) key of the previous page.
+
+    conn must have been opened with uri=True so archives can be attached.
+    Archives only hold months older than any row in logs.db, so continuing
+    into them keeps the order.
+    """
+    where, params = filter_clause(log_filter)
+    if after_key is not None:
+        where += " AND (start_ts, id) < (?, ?)"
+        params += list(after_key)
+    query = _SELECT + " ORDER BY start_ts DESC, id DESC LIMIT ?"
+    rows = conn.execute(query.format(table="logs", where=where), params + [limit]).fetchall()
+    if len(rows) >= limit or not os.path.isdir(archive_dir):
+        return rows
+    for path in archives_in_range(archive_dir, log_filter):
+        _attached(conn, path)
+        try:
+            rows += conn.execute(query.format(table="archive.logs", where=where),
+                                 params + [limit - len(rows)]).fetchall()
+        finally:
+            conn.execute("DETACH DATABASE archive")
+        if len(rows) >= limit:
+            break
+    return rows
+
+def count_rows(conn, log_filter, archive_dir):
+    """Count the rows matching a filter, archives included.
+
+    Whole hours of the range are summed from rollup_hourly; with a minimum
+    duration every matching row has to be counted.
+    """
+    if log_filter.min_duration is not None:
+        return _count_raw(conn, log_filter, archive_dir)
+    first_hour = None if log_filter.start_ts is None else math.ceil(log_filter.start_ts / 3600) * 3600
+    last_hour = None if log_filter.end_ts is None else log_filter.end_ts // 3600 * 3600
+    if first_hour is not None and last_hour is not None and first_hour >= last_hour:
+        return _count_raw(conn, log_filter, archive_dir)
+    count = log_stats.cycle_count(conn, first_hour, last_hour, log_filter.name)
+    if first_hour is not None and log_filter.start_ts < first_hour:
+        count += _count_raw(conn, log_filter, archive_dir, end_ts=first_hour)
+    if last_hour is not None and last_hour < log_filter.end_ts:
+        count += _count_raw(conn, log_filter, archive_dir, start_ts=last_hour)
+    return count
+
+def _count_raw(conn, log_filter, archive_dir, start_ts=None, end_ts=None):
+    where, params = filter_clause(log_filter, start_ts, end_ts)
+    query = "SELECT COUNT(*) FROM {table} WHERE " + where
+    count = conn.execute(query.format(table="logs"), params).fetchone()[0]
+    if not os.path.isdir(archive_dir):
+        return count
+    narrowed = log_filter._replace(start_ts=_tighter(max, log_filter.start_ts, start_ts),
+                                   end_ts=_tighter(min, log_filter.end_ts, end_ts))
+    for path in archives_in_range(archive_dir, narrowed):
+        _attached(conn, path)
+        try:
+            count += conn.execute(query.format(table="archive.logs"), params).fetchone()[0]
+        finally:
+            conn.execute("DETACH DATABASE archive")
+    return count
+
+def _tighter(pick, bound, other):
+    if bound is None or other is None:
+        return other if bound is None else bound
+    return pick(bound, other)
+
+# === Result Cache ===
+
+class QueryCache:
+    """A small LRU of query results; clear() it whenever rows are logged or removed."""
+
+    def __init__(self, max_entries=QUERY_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        """Return the cached result for key, computing and caching it if missing."""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Hourly and daily rollups of the logs table for utilization statistics.
+
+The rollup tables hold one row per (bucket, press, name) with the cycle
+count, total seconds and longest cycle. They are updated in the same
+transaction that inserts log rows, so summaries never need to scan logs.
+
+Run `python3 log_stats.py --rebuild [logs.db]` to recompute them from the
+raw rows, e.g. after editing logs by hand.
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+
+ROLLUP_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS rollup_hourly (
+        hour_ts INTEGER NOT NULL,          -- Epoch of the UTC hour a cycle started in (see hourly_summary)
+        press TEXT NOT NULL DEFAULT '',
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total_s INTEGER NOT NULL,
+        max_s INTEGER NOT NULL,
+        PRIMARY KEY (hour_ts, press, name)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS rollup_daily (
+        day TEXT NOT NULL,                 -- Local date a cycle started on, YYYY-MM-DD
+        press TEXT NOT NULL DEFAULT '',
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total_s INTEGER NOT NULL,
+        max_s INTEGER NOT NULL,
+        PRIMARY KEY (day, press, name)
+    )
+    ''',
+]
+
+_UPSERT_HOURLY_SQL = '''
+    INSERT INTO rollup_hourly (hour_ts, press, name, count, total_s, max_s)
+    VALUES (?, ?, ?, 1, ?, ?)
+    ON CONFLICT (hour_ts, press, name) DO UPDATE SET
+        count = count + 1,
+        total_s = total_s + excluded.total_s,
+        max_s = MAX(max_s, excluded.max_s)
+'''
+
+_UPSERT_DAILY_SQL = '''
+    INSERT INTO rollup_daily (day, press, name, count, total_s, max_s)
+    VALUES (?, ?, ?, 1, ?, ?)
+    ON CONFLICT (day, press, name) DO UPDATE SET
+        count = count + 1,
+        total_s = total_s + excluded.total_s,
+        max_s = MAX(max_s, excluded.max_s)
+'''
+
+DEFAULT_SHIFTS = [
+    {"name": "1st Shift", "start": 6, "end": 14},
+    {"name": "2nd Shift", "start": 14, "end": 22},
+    {"name": "3rd Shift", "start": 22, "end": 6},
+]
+
+# === Maintenance ===
+
+def create_rollup_tables(conn):
+    for sql in ROLLUP_TABLES_SQL:
+        conn.execute(sql)
+
+def update_rollups(conn, rows):
+    """Add freshly inserted log rows (in log_writer.INSERT_LOG_SQL order) to the rollups.
+
+    Called inside the log writer's insert transaction.
+    """
+    hourly = []
+    daily = []
+    for name, _, _, _, start_ts, _, duration_s, press in rows:
+        if start_ts is None or duration_s is None:
+            continue
+        hourly.append((start_ts - start_ts % 3600, press or "", name, duration_s, duration_s))
+        daily.append((datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d"), press or "", name,
+                      duration_s, duration_s))
+    conn.executemany(_UPSERT_HOURLY_SQL, hourly)
+    conn.executemany(_UPSERT_DAILY_SQL, daily)
+
+def rebuild_rollups(conn):
+    """Recompute both rollup tables from the logs table."""
+    with conn:
+        create_rollup_tables(conn)
+        clear_rollups(conn)
+        conn.execute('''
+            INSERT INTO rollup_hourly (hour_ts, press, name, count, total_s, max_s)
+            SELECT start_ts - start_ts % 3600, COALESCE(press, ''), name,
+                   COUNT(*), SUM(duration_s), MAX(duration_s)
+            FROM logs WHERE start_ts IS NOT NULL AND duration_s IS NOT NULL
+            GROUP BY 1, 2, 3
+        ''')
+        conn.execute('''
+            INSERT INTO rollup_daily (day, press, name, count, total_s, max_s)
+            SELECT date(start_ts, 'unixepoch', 'localtime'), COALESCE(press, ''), name,
+                   COUNT(*), SUM(duration_s), MAX(duration_s)
+            FROM logs WHERE start_ts IS NOT NULL AND duration_s IS NOT NULL
+            GROUP BY 1, 2, 3
+        ''')
+
+def clear_rollups(conn):
+    conn.execute('DELETE FROM rollup_hourly')
+    conn.execute('DELETE FROM rollup_daily')
+
+# === Summaries ===
+
+def daily_summary(conn, day):
+    """Return (name, count, total_s, max_s) per timer name for a local date."""
+    return conn.execute('''
+        SELECT name, SUM(count), SUM(total_s), MAX(max_s) FROM rollup_daily
+        WHERE day = ? GROUP BY name ORDER BY name
+    ''', (day.strftime("%Y-%m-%d"),)).fetchall()
+
+def hourly_summary(conn, start_ts, end_ts):
+    """Return (name, count, total_s, max_s) per timer name for cycles started in [start_ts, end_ts).
+
+    rollup_hourly buckets are whole UTC hours, so in a time zone with a
+    half- or quarter-hour offset (e.g. India, Nepal, Newfoundland) a shift
+    starts and ends inside a bucket. The whole hours of the range are read
+    from the rollup and the part of an hour at either end from the logs
+    rows, as log_query.count_rows does.
+    """
+    first_hour = -(-start_ts // 3600) * 3600
+    last_hour = end_ts // 3600 * 3600
+    if first_hour >= last_hour:
+        return _raw_summary(conn, start_ts, end_ts)
+    rows = conn.execute('''
+        SELECT name, SUM(count), SUM(total_s), MAX(max_s) FROM rollup_hourly
+        WHERE hour_ts >= ? AND hour_ts < ? GROUP BY name
+    ''', (first_hour, last_hour)).fetchall()
+    if start_ts < first_hour:
+        rows += _raw_summary(conn, start_ts, first_hour)
+    if last_hour < end_ts:
+        rows += _raw_summary(conn, last_hour, end_ts)
+    totals = {}
+    for name, count, total_s, max_s in rows:
+        if name in totals:
+            count_so_far, total_so_far, max_so_far = totals[name]
+            totals[name] = (count_so_far + count, total_so_far + total_s, max(max_so_far, max_s))
+        else:
+            totals[name] = (count, total_s, max_s)
+    return [(name,) + totals[name] for name in sorted(totals)]
+
+def _raw_summary(conn, start_ts, end_ts):
+    return conn.execute('''
+        SELECT name, COUNT(*), SUM(duration_s), MAX(duration_s) FROM logs
+        WHERE start_ts >= ? AND start_ts < ? AND duration_s IS NOT NULL GROUP BY name ORDER BY name
+    ''', (start_ts, end_ts)).fetchall()
+
+def cycle_count(conn, start_ts=None, end_ts=None, name=None):
+    """Count cycles started in [start_ts, end_ts), both whole hours or None for no limit."""
+    query = 'SELECT COALESCE(SUM(count), 0) FROM rollup_hourly WHERE 1'
+    params = []
+    if start_ts is not None:
+        query += ' AND hour_ts >= ?'
+        params.append(start_ts)
+    if end_ts is not None:
+        query += ' AND hour_ts < ?'
+        params.append(end_ts)
+    if name is not None:
+        query += ' AND name = ?'
+        params.append(name)
+    return conn.execute(query, params).fetchone()[0]
+
+def logged_names(conn):
+    """Every timer name that has been logged, from the daily rollups."""
+    return [row[0] for row in conn.execute('SELECT DISTINCT name FROM rollup_daily ORDER BY name')]
+
+def current_shift(shifts, now):
+    """Return (shift, start, end) for the shift that `now` falls in, or None."""
+    for shift in shifts:
+        start = now.replace(hour=shift["start"], minute=0, second=0, microsecond=0)
+        end = now.replace(hour=shift["end"], minute=0, second=0, microsecond=0)
+        if shift["end"] <= shift["start"]:  # Overnight shift
+            if now.hour >= shift["start"]:
+                end += timedelta(days=1)
+            else:
+                start -= timedelta(days=1)
+        if start <= now < end:
+            return shift, start, end
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the logs.db rollup tables.")
+    parser.add_argument("db", nargs="?", default="logs.db", help="Path to logs.db")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollups from the raw rows")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.rebuild:
+            rebuild_rollups(conn)
+            print("Rollups rebuilt.")
+        for name, count, total_s, max_s in daily_summary(conn, datetime.now()):
+            print(f"{name}: {count} cycles, {total_s} s total, longest {max_s} s")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
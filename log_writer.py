@@ -0,0 +1,214 @@
+"""Background writer that batches timer log rows into the SQLite database."""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+from db_schema import TIME_FORMAT
+
+INSERT_LOG_SQL = '''
+    INSERT INTO logs (name, start_time, stop_time, duration, start_ts, stop_ts, duration_s, press)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_STOP = object()  # Queue sentinel telling the writer thread to exit
+
+# A batch that fails to commit (e.g. the database is locked) stays pending
+# and is retried after a delay that doubles up to RETRY_MAX_DELAY
+RETRY_MIN_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+
+def log_row(name, start_time, stop_time, press=None):
+    """The INSERT_LOG_SQL values logging an interval between two datetimes."""
+    duration = int((stop_time - start_time).total_seconds())
+    return (
+        name,
+        start_time.strftime(TIME_FORMAT),
+        stop_time.strftime(TIME_FORMAT),
+        str(timedelta(seconds=duration)),
+        int(start_time.timestamp()),
+        int(stop_time.timestamp()),
+        duration,
+        press
+    )
+
+
+class LogWriter:
+    """Owns one long-lived connection to the logs database.
+
+    Rows handed to write() are queued and committed by a background thread in
+    groups: a batch is committed once it holds max_batch rows or once the
+    oldest queued row has waited max_delay seconds, whichever comes first.
+    Rows that fail to commit are kept, in order, and retried with backoff.
+    """
+
+    def __init__(self, db_path, max_batch=50, max_delay=2.0, after_insert=None, on_commit=None):
+        self.db_path = db_path
+        self.after_insert = after_insert  # after_insert(conn, rows), run in the insert transaction
+        self.on_commit = on_commit  # on_commit(latency) after each commit, on the writer thread
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._commit_count = 0
+        self._rows_committed = 0
+        self._rows_queued = 0
+        self._conn = None
+        self._last_latency = 0.0
+        self._max_latency = 0.0
+        self._total_latency = 0.0
+
+    def start(self):
+        """Start the writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, row):
+        """Queue one row, with values in INSERT_LOG_SQL's column order, for insertion."""
+        with self._stats_lock:
+            self._rows_queued += 1
+            self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Block until every row queued so far has been committed, or failed to; returns whether all were."""
+        if self._thread is None or not self._thread.is_alive():
+            return self.rows_unwritten() == 0
+        done = threading.Event()
+        with self._stats_lock:
+            queued = self._rows_queued
+            self._queue.put(done)
+        return done.wait(timeout) and self.rows_committed() >= queued
+
+    def close(self, timeout=10.0):
+        """Commit any pending rows and stop the writer thread; returns the rows left unwritten."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        return self.rows_unwritten()
+
+    def rows_committed(self):
+        """Number of rows written so far that have been committed.
+
+        Rows are committed in the order they were queued, so these are the
+        first rows_committed() of them; a row whose commit failed is not
+        counted until a retry commits it.
+        """
+        with self._stats_lock:
+            return self._rows_committed
+
+    def rows_unwritten(self):
+        """Number of rows queued but not committed (yet)."""
+        with self._stats_lock:
+            return self._rows_queued - self._rows_committed
+
+    def commit_stats(self):
+        """Return the commit latency (in seconds) measured so far."""
+        with self._stats_lock:
+            count = self._commit_count
+            return {
+                "commits": count,
+                "rows": self._rows_committed,
+                "last_latency": self._last_latency,
+                "max_latency": self._max_latency,
+                "avg_latency": self._total_latency / count if count else 0.0,
+            }
+
+    # === Writer Thread ===
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, which keeps each
+        # commit cheap on the SD card while staying safe against app crashes.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        pending = []
+        waiters = []
+        deadline = None
+        retry_at = None  # While set, pending rows wait for this retry
+        retry_delay = RETRY_MIN_DELAY
+        stopping = False
+        try:
+            while not stopping:
+                if pending:
+                    timeout = max(0.0, (retry_at or deadline) - time.monotonic())
+                else:
+                    timeout = None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    if not pending:
+                        deadline = time.monotonic() + self.max_delay
+                    pending.append(item)
+
+                now = time.monotonic()
+                if retry_at is not None:
+                    # A flush during the backoff returns at once rather than hold up the caller
+                    due = stopping or now >= retry_at
+                else:
+                    due = stopping or waiters or len(pending) >= self.max_batch or (pending and now >= deadline)
+                if pending and due:
+                    error = self._commit(pending)
+                    if error is None:
+                        pending = []
+                        retry_at = None
+                        retry_delay = RETRY_MIN_DELAY
+                    elif not stopping:
+                        print(f"Failed to write {len(pending)} log rows, retrying in {retry_delay:.1f} s: {error}")
+                        retry_at = now + retry_delay
+                        retry_delay = min(RETRY_MAX_DELAY, retry_delay * 2)
+                for event in waiters:
+                    event.set()
+                waiters = []
+        finally:
+            if pending:
+                error = self._commit(pending)
+                if error is not None:
+                    print(f"Failed to write {len(pending)} log rows: {error}")
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _commit(self, rows):
+        """Insert rows in one transaction; returns the error, or None once they are committed."""
+        started = time.monotonic()
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                # The same SQL text is reused for every batch, so sqlite3
+                # keeps the prepared statement in its statement cache.
+                self._conn.executemany(INSERT_LOG_SQL, rows)
+                if self.after_insert is not None:
+                    self.after_insert(self._conn, rows)
+        except Exception as e:
+            # Start from a new connection next time, in case this one is broken
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            return e
+        latency = time.monotonic() - started
+        with self._stats_lock:
+            self._commit_count += 1
+            self._rows_committed += len(rows)
+            self._last_latency = latency
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+        if self.on_commit is not None:
+            self.on_commit(latency)
+        return None
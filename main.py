@@ -1,306 +1,952 @@
+import time
+START_TIME = time.monotonic()  # For reporting how long startup took
+
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
-import pandas as pd
-import json
-from datetime import datetime, timedelta
-import RPi.GPIO as GPIO
-import time
+import argparse
+from datetime import datetime
 import sys
 import os
+import math
 import sqlite3  # For database support
-
-def resource_path(relative_path):
-    """ Get absolute path to resource, works for dev and PyInstaller """
-    try:
-        # When running in a PyInstaller bundle, _MEIPASS is set
-        base_path = sys._MEIPASS
-    except AttributeError:
-        # In development mode, use the current directory
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+from log_writer import LogWriter, log_row
+import log_export
+import db_schema
+import log_stats
+import backup_script
+import retention
+import log_query
+import fleet_sync
+import timing_daemon
+import stream_stats
+import timeline
+from job_runner import JobRunner
+from input_events import InputQueue
+from stations import Station, StationScheduler
+from input_backends import GpioInput, KeyboardInput, ScriptedInput
+from metrics import Metrics
+from render import Renderer, GlyphClock
+from status_api import StatusServer
+from settings_store import SettingsStore
+from journal import Journal, JournalLocked, already_logged, recover_record
+import headless
+import timing_common
+# Shared with timing_daemon.py, which runs the same timers without the screen
+from timing_common import (resource_path, SETTINGS_FILE, LOGS_DB, JOURNAL_FILE, STREAM_STATS_FILE, DAEMON_SOCKET,
+                           BUTTON_PINS, DEBOUNCE_TIME, INPUT_POLL_MS, LOG_COMMIT_BATCH_SIZE, LOG_COMMIT_INTERVAL,
+                           JOURNAL_HEARTBEAT_MS, SETTINGS_POLL_MS, METRICS_WRITE_INTERVAL_MS, STREAM_STATS_SAVE_MS,
+                           STATUS_API_RECENT_ROWS, TIMER_DURATIONS, TIMER_TEXTS, IDLE_YELLOW_DURATION,
+                           IDLE_RED_DURATION)
 
 # === Configuration ===
 
-# File paths for storing persistent data
-SETTINGS_FILE = resource_path("settings.json")
-LOGS_DB = resource_path("logs.db")  # Using SQLite database
+# File paths for storing persistent data (logs.db, settings.json and the
+# journal are in timing_common.py)
+EXPORT_DIR = resource_path("exports")  # Incremental exports and their high-water mark
+FULL_EXPORT_FILE = "logs.xlsx"  # Target of an explicit full re-export
+REPORT_FILE = "logs_report.xlsx"  # Analytics report made from the log screen
+
+# How often to check for rows older than RETENTION_DAYS (only while no timer runs)
+RETENTION_CHECK_MINUTES = 60
+
+# Log view paging: rows visible on screen and extra rows fetched ahead of scrolling
+LOG_VISIBLE_ROWS = 50
+LOG_PREFETCH_ROWS = 100
+LOG_MAX_SHOWN_ROWS = 1000  # New rows arriving while the view is kept open push the oldest out
+
+# Timeline screen: the range it opens with, and how often it picks up new rows while shown
+TIMELINE_RANGES = {"Day": 86400, "Week": 7 * 86400, "Month": 30 * 86400}
+TIMELINE_DEFAULT_RANGE = "Day"
+TIMELINE_REFRESH_MS = 5000
 
-# GPIO Pin Definitions
-BUTTON_PINS = {
-    1: 17,  # Timer 1
-    2: 27,  # Timer 2
-    3: 22,  # Timer 3
-    4: 23   # Timer 4
-}
+# Hot-path metrics: written to METRICS_FILE periodically, shown by the Alt-m overlay
+METRICS_FILE = resource_path("metrics.json")
+METRICS_OVERLAY_REFRESH_MS = 1000
 
-# Debounce time in seconds
-DEBOUNCE_TIME = 0.3  # 300 milliseconds
+# Optional HTTP status API for dashboards (see status_api.py); localhost only by default
+STATUS_API = {"enabled": False, "host": "127.0.0.1", "port": 8321}
+
+# Optional sync of new log rows to a fleet collector (see fleet_sync.py and collector.py);
+# an empty device_id means the hostname
+FLEET_SYNC = {"enabled": False, "url": "", "device_id": "", "interval_minutes": 5}
+SYNC_STATE_FILE = resource_path("sync_state.json")
+FLEET_SYNC_RETRY_SECONDS = 30  # First wait after a failed sync run; doubles up to the interval
+
+# With --daemon the timers run in timing_daemon.py, which publishes its state on DAEMON_SOCKET
+DAEMON_POLL_MS = 20
 
 # Password for clearing logs
 CLEAR_LOGS_PASSWORD = "your_password_here"  # Replace with a secure password
 
 # === Global Variables ===
 
-# Timer durations (in seconds) and texts
-TIMER_DURATIONS = [5 * 60, 10 * 60, 15 * 60, 20 * 60]  # 5, 10, 15, 20 minutes
-TIMER_TEXTS = ["First Timer", "Second Timer", "Third Timer", "Fourth Timer"]
-
-active_timer = None
-remaining_time = 0
-running = False
+# TIMER_DURATIONS, TIMER_TEXTS and the idle colour thresholds start out as
+# timing_common's defaults; apply_settings replaces them from settings.json
 current_screen = "idle"
 
-# Idle Timer Color Thresholds (in seconds)
-IDLE_YELLOW_DURATION = 5 * 60  # 5 minutes
-IDLE_RED_DURATION = 10 * 60    # 10 minutes
-
-# Variables for tracking times
-timer_start_time = None
-timer_stop_time = None
-idle_timer_running = False
-idle_start_time = None
+# Shifts for the log screen summary: start/end hours of the local day
+SHIFTS = log_stats.DEFAULT_SHIFTS
 
 # === Export Interval Variables ===
 EXPORT_INTERVAL_HOURS = 1  # Default export interval hours
 EXPORT_INTERVAL_MINUTES = 0  # Default export interval minutes
+EXPORT_FORMAT = "xlsx"  # "csv" (append-only) or "xlsx" (rewrites changed partitions)
+EXPORT_PARTITION = "month"  # "day", "month" or, with "csv", "none" for a single file
 export_after_id = None  # To store the after callback ID
 
-# Variables for debouncing
-last_press_time = {timer: 0 for timer in BUTTON_PINS.keys()}  # Track last press times
-
-# === GPIO Setup ===
+# === Retention Variables ===
+RETENTION_DAYS = 0  # Rows older than this move to monthly archives; 0 keeps them all in logs.db
+ARCHIVE_DIR = "archive"  # Relative to the application directory unless absolute
+retention_after_id = None
+
+# Fleet sync agent, created from FLEET_SYNC when a sync first runs
+sync_agent = None
+fleet_sync_after_id = None
+
+# Background writer that owns the logs.db connection
+log_writer = None
+
+# Worker pool for exports and backups
+job_runner = None
+JOB_WORKERS = 2
+
+# Log view window, keyed on the logs table id (newest rows are shown first)
+log_view_newest_id = None
+log_view_oldest_id = None
+log_view_exhausted = False  # True once the oldest row has been loaded
+log_view_loading = False
+
+# Log view filter (a log_query.LogFilter, or None for every row); filtered
+# pages are keyed on (start_ts, id) and cached until rows are logged
+log_view_filter = None
+log_view_oldest_key = None
+log_query_cache = log_query.QueryCache()
+
+# Timeline screen: tiles of the logs at each zoom level (see timeline.py), and the
+# rows logged while it is shown, whose tiles are dropped once they are committed
+timeline_frame = None
+timeline_data = None
+timeline_view = None
+timeline_after_id = None
+timeline_logged = []
+timeline_drag = None  # (x where the drag started, x it last moved to)
+
+# Button presses queued by the GPIO thread for the Tk loop (debounced there)
+input_queue = None
+
+# Where presses come from (GPIO, keyboard or a script), see input_backends.py
+input_backend = None
+
+# Tk root, or a headless.HeadlessRoot; created by initialize_gui/initialize_headless
+root = None
+
+# Validated settings.json; apply_settings copies its values into the globals above
+settings_store = None
+settings_after_id = None
+
+# Set by --headless: no window, widgets are replaced by headless.py stand-ins
+headless_mode = False
+
+# Monotonic clock used by the timers; a simulation can swap in a virtual one
+clock = time.monotonic
+
+# Latency histograms of the hot paths (tick lateness, DB commits, exports, presses)
+metrics = Metrics()
+metrics_after_id = None
+metrics_overlay = None  # Label shown over the current screen by Alt-m
+metrics_overlay_after_id = None
+
+# Only widget options that changed are sent to Tk; tick redraws are timed
+renderer = Renderer(on_frame=metrics.recorder("redraw"))
+
+# HTTP status API for dashboards
+status_server = None
+
+# Journal of the open intervals, and whether a state change is waiting to be recorded
+state_journal = None
+journal_after_id = None
+state_change_pending = False
+logged_intervals = timing_common.LoggedIntervals()
+log_rows_unwritten = 0  # Rows the stopped log writer could not commit
+
+# Running statistics of the logged intervals, and what the last one to close was unusual for
+interval_stats = None
+interval_stats_after_id = None
+closed_anomaly = ""
+
+# === Station Mode Variables ===
+# When settings.json has a "stations" list, one Pi serves several presses,
+# each shown as a tile with its own buttons, timers and idle tracking.
+# Without it, `stations` holds the single timer, a Station without a name.
+STATIONS_CONFIG = []
+stations = []
+station_scheduler = None  # One tick source for every station
+station_frame = None
+station_tiles = {}
+
+# === Timing Daemon Client Variables ===
+# With --daemon, `stations` holds mirrors of the daemon's presses that only draw
+daemon_client = None
+daemon_connected = False
+daemon_after_id = None
+
+# === Input Backends ===
+
+def input_keys():
+    """Return every button key in order, for backends without pin numbers."""
+    if STATIONS_CONFIG:
+        return [(station_id, button_index + 1)
+                for station_id, config in enumerate(STATIONS_CONFIG)
+                for button_index in range(len(config.get("durations", TIMER_DURATIONS)))]
+    return sorted(BUTTON_PINS)
+
+def create_input_backend(kind, script=None, repeat=False):
+    """Create the "gpio", "keyboard" or "script" input backend."""
+    global input_backend
+    if kind == "gpio":
+        input_backend = GpioInput(timing_common.input_pins(STATIONS_CONFIG))
+    elif kind == "keyboard":
+        input_backend = KeyboardInput(input_keys())
+    elif kind == "script":
+        input_backend = ScriptedInput.from_file(script, repeat=repeat)
+    else:
+        raise ValueError(f"Unknown input backend: {kind}")
 
-def setup_gpio():
-    GPIO.setmode(GPIO.BCM)
-    for pin in BUTTON_PINS.values():
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_OFF)  # No internal pull-downs
+def start_input_backend():
+    """Start feeding presses from the input backend into input_queue."""
+    input_backend.start(root, input_queue.push)
 
-def cleanup_gpio():
-    GPIO.cleanup()
+def stop_input_backend():
+    if input_backend is not None:
+        input_backend.stop()
 
 # === Settings Management ===
 
-def load_settings():
-    global TIMER_DURATIONS, TIMER_TEXTS, IDLE_YELLOW_DURATION, IDLE_RED_DURATION
-    global EXPORT_INTERVAL_HOURS, EXPORT_INTERVAL_MINUTES
-    try:
-        with open(SETTINGS_FILE, "r") as file:
-            data = json.load(file)
-            TIMER_DURATIONS = data.get("durations", TIMER_DURATIONS)
-            TIMER_TEXTS = data.get("texts", TIMER_TEXTS)
-            IDLE_YELLOW_DURATION = data.get("idle_yellow_duration", IDLE_YELLOW_DURATION)
-            IDLE_RED_DURATION = data.get("idle_red_duration", IDLE_RED_DURATION)
-            EXPORT_INTERVAL_HOURS = data.get("export_interval_hours", EXPORT_INTERVAL_HOURS)
-            EXPORT_INTERVAL_MINUTES = data.get("export_interval_minutes", EXPORT_INTERVAL_MINUTES)
-    except (FileNotFoundError, json.JSONDecodeError):
-        save_settings()  # Create settings file with defaults
-
-def save_settings():
-    data = {
+def current_settings():
+    """The settings globals as the settings.json keys they are stored under."""
+    return {
         "durations": TIMER_DURATIONS,
         "texts": TIMER_TEXTS,
         "idle_yellow_duration": IDLE_YELLOW_DURATION,
         "idle_red_duration": IDLE_RED_DURATION,
+        "shifts": SHIFTS,
         "export_interval_hours": EXPORT_INTERVAL_HOURS,
-        "export_interval_minutes": EXPORT_INTERVAL_MINUTES
+        "export_interval_minutes": EXPORT_INTERVAL_MINUTES,
+        "export_format": EXPORT_FORMAT,
+        "export_partition": EXPORT_PARTITION,
+        "retention_days": RETENTION_DAYS,
+        "archive_dir": ARCHIVE_DIR,
+        "status_api": STATUS_API,
+        "fleet_sync": FLEET_SYNC,
+        "stations": STATIONS_CONFIG
     }
-    with open(SETTINGS_FILE, "w") as file:
-        json.dump(data, file)
+
+def load_settings():
+    """Load settings.json, with the current globals as defaults for missing keys."""
+    global settings_store
+    settings_store = SettingsStore(SETTINGS_FILE, current_settings(), timer_count=len(BUTTON_PINS))
+    settings_store.subscribe(apply_settings)
+    settings_store.load()
+
+def save_settings():
+    """Save the settings globals to settings.json."""
+    settings_store.update(**current_settings())
+
+def apply_settings(values, changed):
+    """Settings subscriber: copy new values into the globals the timers and jobs read."""
+    global TIMER_DURATIONS, TIMER_TEXTS, IDLE_YELLOW_DURATION, IDLE_RED_DURATION
+    global EXPORT_INTERVAL_HOURS, EXPORT_INTERVAL_MINUTES, EXPORT_FORMAT, EXPORT_PARTITION
+    global STATIONS_CONFIG, SHIFTS, STATUS_API, RETENTION_DAYS, ARCHIVE_DIR, FLEET_SYNC
+    TIMER_DURATIONS = values["durations"]
+    TIMER_TEXTS = values["texts"]
+    IDLE_YELLOW_DURATION = values["idle_yellow_duration"]
+    IDLE_RED_DURATION = values["idle_red_duration"]
+    SHIFTS = values["shifts"]
+    EXPORT_INTERVAL_HOURS = values["export_interval_hours"]
+    EXPORT_INTERVAL_MINUTES = values["export_interval_minutes"]
+    EXPORT_FORMAT = values["export_format"]
+    EXPORT_PARTITION = values["export_partition"]
+    RETENTION_DAYS = values["retention_days"]
+    ARCHIVE_DIR = values["archive_dir"]
+    FLEET_SYNC = values["fleet_sync"]  # Read by every sync run
+    if root is None:
+        # Only read at startup: the screens and the status server are built from them
+        STATIONS_CONFIG = values["stations"]
+        STATUS_API = values["status_api"]
+        return
+    restart_keys = changed & {"stations", "status_api"}
+    if restart_keys:
+        print(f"Changes to {', '.join(sorted(restart_keys))} take effect after a restart.")
+    if changed & {"export_interval_hours", "export_interval_minutes"} and current_screen != "settings":
+        reschedule_export_logs()  # The settings screen schedules it when it closes
+    if not STATIONS_CONFIG and daemon_client is None and stations:
+        timing_common.configure_single_timer(stations[0], values)
+        station_scheduler.poke(stations[0])  # Redraw in the new idle colour now
+        state_changed()
+
+def poll_settings():
+    """Pick up edits of settings.json made while the application runs."""
+    global settings_after_id
+    changed = settings_store.poll()
+    if changed:
+        print(f"Reloaded {SETTINGS_FILE}: {', '.join(sorted(changed))} changed")
+    settings_after_id = root.after(SETTINGS_POLL_MS, poll_settings)
 
 # === Database Initialization ===
 
 def init_db():
-    """Initialize the SQLite database."""
-    conn = sqlite3.connect(LOGS_DB)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            start_time TEXT,
-            stop_time TEXT,
-            duration TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Initialize the SQLite database and migrate it to the current schema."""
+    db_schema.init_db(LOGS_DB)
+
+def start_log_writer():
+    """Start the background writer that commits log rows in batches."""
+    global log_writer
+    log_writer = LogWriter(LOGS_DB, max_batch=LOG_COMMIT_BATCH_SIZE, max_delay=LOG_COMMIT_INTERVAL,
+                           after_insert=log_stats.update_rollups, on_commit=metrics.recorder("db_commit"))
+    log_writer.start()
+
+def flush_log_writer():
+    """Wait until all queued log rows are committed to the database."""
+    if log_writer is not None:
+        log_writer.flush()
+
+def stop_log_writer():
+    """Commit any pending log rows and stop the writer."""
+    global log_writer, log_rows_unwritten
+    if log_writer is not None:
+        log_rows_unwritten = log_writer.close()
+        if log_rows_unwritten:
+            print(f"Log writer: {log_rows_unwritten} rows could not be written to {LOGS_DB}")
+        stats = log_writer.commit_stats()
+        print(f"Log writer: {stats['rows']} rows in {stats['commits']} commits, "
+              f"avg {stats['avg_latency'] * 1000:.1f} ms, max {stats['max_latency'] * 1000:.1f} ms")
+        log_writer = None
 
 # === Timer Functions ===
 
-def start_timer(timer_list_index):
-    global active_timer, remaining_time, running, timer_start_time
-    if not running:
-        if idle_timer_running:
-            stop_idle_timer()
-        active_timer = timer_list_index
-        remaining_time = TIMER_DURATIONS[timer_list_index]
-        running = True
-        timer_start_time = datetime.now()
-        timer_text_label.config(text=TIMER_TEXTS[timer_list_index])
-        idle_timer_label.config(text="")
-        update_timer()
-
-def stop_timer():
-    global active_timer, remaining_time, running, timer_stop_time
-    if active_timer is not None:
-        timer_stop_time = datetime.now()
-        log_state_change(TIMER_TEXTS[active_timer], timer_start_time, timer_stop_time)
-        active_timer = None
-        remaining_time = 0
-        running = False
-        timer_label.config(text="00:00")
-        timer_text_label.config(text="")
-        start_idle_timer()
-
-def update_timer():
-    global remaining_time, running
-    if running and remaining_time > 0:
-        minutes, seconds = divmod(remaining_time, 60)
-        timer_label.config(text=f"{int(minutes):02}:{int(seconds):02}")
-        remaining_time -= 1
-        root.after(1000, update_timer)
-    elif running and remaining_time <= 0:
-        stop_timer()
-
-# === Idle Timer Functions ===
-
-def start_idle_timer():
-    global idle_timer_running, idle_start_time
-    if not idle_timer_running:
-        idle_timer_running = True
-        idle_start_time = datetime.now()
-        timer_text_label.config(text="Idle")
-        update_idle_timer()
-
-def stop_idle_timer():
-    global idle_timer_running, idle_start_time
-    if idle_timer_running:
-        idle_stop_time = datetime.now()
-        log_state_change("Idle", idle_start_time, idle_stop_time)
-        idle_timer_running = False
-        idle_start_time = None
-        idle_timer_label.config(text="")
-        timer_text_label.config(text="")
-
-def update_idle_timer():
-    global idle_timer_running
-    if idle_timer_running:
-        now = datetime.now()
-        elapsed = now - idle_start_time
-        elapsed_seconds = elapsed.total_seconds()
-        hours, remainder = divmod(elapsed_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        idle_timer_label.config(text=f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}")
-        # Change color based on thresholds
-        if elapsed_seconds < IDLE_YELLOW_DURATION:
-            idle_timer_label.config(fg="green")
-        elif elapsed_seconds < IDLE_RED_DURATION:
-            idle_timer_label.config(fg="yellow")
-        else:
-            idle_timer_label.config(fg="red")
-        root.after(1000, update_idle_timer)
+def single_timer():
+    """The single timer's Station, or None in station mode and with --daemon."""
+    if STATIONS_CONFIG or daemon_client is not None or not stations:
+        return None
+    return stations[0]
+
+def pause_idle_timer():
+    """Log the single timer's idle period while a screen other than the timer is shown."""
+    station = single_timer()
+    if station is not None and station.idle_running:
+        station.stop_idle(station_scheduler.clock())
+        station_scheduler.poke(station)
+        state_changed()
+
+def resume_idle_timer():
+    """Start a new idle period when the timer screen is shown again, unless a timer runs."""
+    station = single_timer()
+    if station is not None and not station.running and not station.idle_running:
+        station.start_idle(station_scheduler.clock())
+        station_scheduler.poke(station)
+        state_changed()
+
+def draw_timer(station, now):
+    """Draw the single timer, or the daemon's, on the timer screen."""
+    state = station.display(now)
+    with renderer.frame(root):
+        renderer.update(timer_label, text=state["clock"])
+        renderer.update(timer_text_label, text=state["text"])
+        renderer.update(idle_timer_label, text=state["idle"], fg=state["idle_color"])
+        show_anomaly(state["name"], state["elapsed"])
+
+def report_tick_jitter():
+    """Print how late the timer ticks fired, for checking behaviour under load."""
+    if station_scheduler is None:
+        return
+    stats = station_scheduler.jitter_stats()
+    if stats["ticks"]:
+        print(f"Tick lateness: {stats['ticks']} ticks, "
+              f"avg {stats['avg'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms")
+
+# === Interval Statistics ===
+
+def load_interval_stats():
+    """Load what was learned before, ahead of logging the intervals left open by the last run."""
+    global interval_stats
+    interval_stats = stream_stats.StreamStats(STREAM_STATS_FILE)
+    interval_stats.load()
+
+def save_interval_stats():
+    if interval_stats is None or not interval_stats.changed:
+        return
+    try:
+        interval_stats.save()
+    except OSError as e:
+        print(f"Failed to write {STREAM_STATS_FILE}: {e}")  # Optional: Console logging for warnings
+
+def schedule_interval_stats():
+    """Save the statistics every STREAM_STATS_SAVE_MS; a GUI of the daemon reads its saves instead."""
+    global interval_stats_after_id
+    if daemon_client is not None:
+        interval_stats.reload_if_changed()
+    else:
+        save_interval_stats()
+    interval_stats_after_id = root.after(STREAM_STATS_SAVE_MS, schedule_interval_stats)
+
+def anomaly_text(name, kind, seconds=None):
+    """E.g. "Idle longer than usual: 0:42:10 (usually 0:03:05)"; without seconds for a running interval."""
+    text = f"{name} {stream_stats.ANOMALY_TEXT[kind]}"
+    if seconds is not None:
+        text += f": {db_schema.format_duration(seconds)}"
+    return f"{text} (usually {db_schema.format_duration(interval_stats.median(name))})"
+
+def learn_interval(name, duration, press=None):
+    """Update the statistics with a logged interval and note it if it was unusual."""
+    global closed_anomaly
+    if interval_stats is None:
+        return
+    kind = interval_stats.add(name, duration)
+    text = anomaly_text(name, kind, duration) if kind else ""
+    if text:
+        print(f"Unusual interval{f' on {press}' if press else ''}: {text}")
+    if press is None:
+        closed_anomaly = text
+
+def live_anomaly(name, elapsed):
+    """The alert for an interval that has been running for `elapsed` seconds, or ""."""
+    if interval_stats is None or interval_stats.classify(name, elapsed) != "long":
+        return ""  # Whether it ends too soon is only known once it ends
+    return anomaly_text(name, "long")  # Without the time, which the screen already shows
+
+def show_anomaly(name, elapsed):
+    """Show the running interval's alert, or else the last one to close."""
+    renderer.update(anomaly_label, text=live_anomaly(name, elapsed) or closed_anomaly)
 
 # === Logging Functions ===
 
-def log_state_change(name, start_time, stop_time):
+def log_state_change(name, start_time, stop_time, press=None):
     """Log state changes to the database."""
-    duration = (stop_time - start_time).total_seconds()
-    duration_str = str(timedelta(seconds=int(duration)))
-    conn = sqlite3.connect(LOGS_DB)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO logs (name, start_time, stop_time, duration)
-        VALUES (?, ?, ?, ?)
-    ''', (
-        name,
-        start_time.strftime("%Y-%m-%d %H:%M:%S"),
-        stop_time.strftime("%Y-%m-%d %H:%M:%S"),
-        duration_str
-    ))
-    conn.commit()
-    conn.close()
+    row = log_row(name, start_time, stop_time, press)
+    start_ts, stop_ts, duration = row[4:7]
+    learn_interval(name, duration, press)
+    note_timeline_rows(start_ts, stop_ts)
+    # Queued for the writer thread; the commit happens off the Tk main thread
+    log_writer.write(row)
+    logged_intervals.add(name, start_ts, stop_ts, press)
+    log_query_cache.clear()
+    if status_server is not None:
+        status_server.add_log_rows([timing_common.status_log_row(name, start_ts, stop_ts, duration, press)])
+    state_changed()
 
 def clear_logs():
     """Clear logs from the database."""
     password = simpledialog.askstring("Password Required", "Enter the password:", show='*')
     if password == CLEAR_LOGS_PASSWORD:
-        conn = sqlite3.connect(LOGS_DB)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM logs')
-        conn.commit()
-        conn.close()
+        delete_all_logs()
+        reset_log_view()
         refresh_log_view()
         messagebox.showinfo("Success", "Logs cleared successfully.")
     else:
         messagebox.showerror("Error", "Incorrect password.")
 
-def export_logs():
-    """Export logs from the database to logs.xlsx."""
+def delete_all_logs():
+    """Delete every row and rollup from logs.db and set the archives aside, so nothing old is shown or counted."""
+    flush_log_writer()
     conn = sqlite3.connect(LOGS_DB)
     cursor = conn.cursor()
-    cursor.execute('SELECT name, start_time, stop_time, duration FROM logs')
-    rows = cursor.fetchall()
+    cursor.execute('DELETE FROM logs')
+    log_stats.clear_rollups(conn)
+    conn.commit()
     conn.close()
-    if rows:
-        df = pd.DataFrame(rows, columns=["Name", "Start Time", "Stop Time", "Duration"])
-        try:
-            df.to_excel("logs.xlsx", index=False)
-            print("Logs exported to logs.xlsx.")  # Optional: Console logging for confirmation
-        except Exception as e:
-            print(f"Failed to export logs: {e}")  # Optional: Console logging for errors
+    folder = retention.set_aside_archives(archive_dir())
+    if folder is not None:
+        print(f"Archives moved to {folder}")  # Optional: Console logging for confirmation
+    log_query_cache.clear()
+    if timeline_data is not None:
+        timeline_data.clear()
+
+def export_logs():
+    """Export rows logged since the last export to the files in EXPORT_DIR."""
+    flush_log_writer()
+    started = time.monotonic()
+    exported = log_export.export_logs(LOGS_DB, EXPORT_DIR, EXPORT_FORMAT, EXPORT_PARTITION)
+    metrics.observe("export", time.monotonic() - started)
+    if exported:
+        print(f"Exported {exported} new log rows to {EXPORT_DIR}.")  # Optional: Console logging for confirmation
     else:
-        print("No logs to export.")  # Optional: Console logging for warnings
+        print("No new logs to export.")  # Optional: Console logging for warnings
+    return exported
+
+def export_all_logs():
+    """Re-export the whole logs table to logs.xlsx."""
+    flush_log_writer()
+    started = time.monotonic()
+    exported = log_export.export_all_logs(LOGS_DB, FULL_EXPORT_FILE,
+                                          archive_paths=retention.archive_paths(archive_dir(), newest_first=False))
+    metrics.observe("full_export", time.monotonic() - started)
+    print(f"Exported {exported} log rows to {FULL_EXPORT_FILE}.")  # Optional: Console logging for confirmation
+    return exported
+
+def write_report():
+    """Analyse every logged row, archives included, into REPORT_FILE."""
+    import reports  # Only needed when writing the report; it loads numpy
+
+    flush_log_writer()
+    started = time.monotonic()
+    analysed = reports.write_report(LOGS_DB, REPORT_FILE,
+                                    reports.configured_durations(TIMER_DURATIONS, TIMER_TEXTS, STATIONS_CONFIG),
+                                    archive_paths=retention.archive_paths(archive_dir(), newest_first=False))
+    metrics.observe("report", time.monotonic() - started)
+    print(f"Analysed {analysed} log rows into {REPORT_FILE}.")  # Optional: Console logging for confirmation
+    return analysed
+
+def fetch_log_rows(before_id=None, after_id=None, limit=None):
+    """Fetch a window of log rows keyed on id, newest first.
+
+    Paging towards older rows continues into the archives once logs.db runs out.
+    """
+    query = 'SELECT id, name, start_ts, stop_ts, duration_s, press FROM logs'
+    params = []
+    if before_id is not None:
+        query += ' WHERE id < ?'
+        params.append(before_id)
+    elif after_id is not None:
+        query += ' WHERE id > ?'
+        params.append(after_id)
+    query += ' ORDER BY id DESC'
+    if limit is not None:
+        query += ' LIMIT ?'
+        params.append(limit)
+    conn = sqlite3.connect(LOGS_DB, uri=True)  # uri=True lets archives be attached read-only
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if after_id is None and limit is not None and len(rows) < limit:
+        # logs.db ran out; continue with the archived rows older than the last one
+        oldest_id = rows[-1][0] if rows else before_id
+        rows += retention.fetch_archived_rows(conn, archive_dir(), oldest_id, limit - len(rows))
+    conn.close()
+    return rows
 
-def refresh_log_view():
-    """Refresh the log view by fetching logs from the database."""
+def log_row_values(row):
+    """Turn an (id, name, start_ts, stop_ts, duration_s, press) row into display values."""
+    row_id, name, start_ts, stop_ts, duration_s, press = row
+    return (name, db_schema.format_timestamp(start_ts), db_schema.format_timestamp(stop_ts),
+            db_schema.format_duration(duration_s), press or "")
+
+def reset_log_view():
+    """Forget the loaded window so the next refresh starts from the newest rows."""
+    global log_view_newest_id, log_view_oldest_id, log_view_exhausted
     for item in log_tree.get_children():
         log_tree.delete(item)
+    log_view_newest_id = None
+    log_view_oldest_id = None
+    log_view_exhausted = False
+
+def refresh_log_summary():
+    """Show today's and the current shift's totals, read from the rollup tables."""
+    for item in summary_tree.get_children():
+        summary_tree.delete(item)
+    now = datetime.now()
     conn = sqlite3.connect(LOGS_DB)
-    cursor = conn.cursor()
-    cursor.execute('SELECT name, start_time, stop_time, duration FROM logs')
-    rows = cursor.fetchall()
+    periods = [("Today", log_stats.daily_summary(conn, now))]
+    shift = log_stats.current_shift(SHIFTS, now)
+    if shift is not None:
+        shift_info, shift_start, shift_end = shift
+        periods.append((shift_info["name"], log_stats.hourly_summary(
+            conn, int(shift_start.timestamp()), int(shift_end.timestamp()))))
     conn.close()
+    for period, rows in periods:
+        for name, count, total_s, max_s in rows:
+            summary_tree.insert("", "end", values=(
+                period, name, count, db_schema.format_duration(total_s),
+                db_schema.format_duration(total_s / count), db_schema.format_duration(max_s)))
+
+def fetch_filtered_rows(after_key=None, limit=LOG_PREFETCH_ROWS):
+    """Fetch a page of the rows matching log_view_filter, cached until rows are logged."""
+    log_filter = log_view_filter
+    def query():
+        conn = sqlite3.connect(LOGS_DB, uri=True)  # uri=True lets archives be attached read-only
+        try:
+            return log_query.fetch_page(conn, log_filter, archive_dir(), after_key, limit)
+        finally:
+            conn.close()
+    return log_query_cache.get(("page", log_filter, after_key, limit), query)
+
+def count_filtered_rows():
+    """Count the rows matching log_view_filter, cached until rows are logged."""
+    log_filter = log_view_filter
+    def query():
+        conn = sqlite3.connect(LOGS_DB, uri=True)
+        try:
+            return log_query.count_rows(conn, log_filter, archive_dir())
+        finally:
+            conn.close()
+    return log_query_cache.get(("count", log_filter), query)
+
+def show_filtered_rows():
+    """Show the first rows matching log_view_filter and how many match."""
+    global log_view_oldest_key, log_view_exhausted
+    reset_log_view()
+    limit = LOG_VISIBLE_ROWS + LOG_PREFETCH_ROWS
+    rows = fetch_filtered_rows(limit=limit)
     for row in rows:
-        log_tree.insert("", "end", values=row)
+        log_tree.insert("", "end", iid=str(row[0]), values=log_row_values(row))
+    log_view_oldest_key = (rows[-1][2], rows[-1][0]) if rows else None
+    log_view_exhausted = len(rows) < limit
+    log_count_var.set(f"{count_filtered_rows()} matching rows")
+
+def set_log_filter(log_filter):
+    """Show only the rows matching log_filter (None shows every row)."""
+    global log_view_filter
+    log_view_filter = log_filter
+    reset_log_view()
+    if log_filter is None:
+        log_count_var.set("")
+    refresh_log_view()
+
+def apply_log_filter():
+    """Filter the log view by the name, time range and minimum duration fields."""
+    try:
+        log_filter = log_query.parse_filter(log_filter_name.get(), log_filter_since.get(),
+                                            log_filter_until.get(), log_filter_min.get())
+    except ValueError as e:
+        messagebox.showerror("Error", f"Invalid filter: {e}")
+        return
+    set_log_filter(log_filter)
+
+def clear_log_filter():
+    for entry in (log_filter_name, log_filter_since, log_filter_until, log_filter_min):
+        entry.delete(0, "end")
+    set_log_filter(None)
+
+def refresh_log_filter_names():
+    """Offer every logged timer name in the name filter."""
+    conn = sqlite3.connect(LOGS_DB)
+    try:
+        log_filter_name.config(values=log_stats.logged_names(conn))
+    finally:
+        conn.close()
+
+def refresh_log_view():
+    """Refresh the log view, only fetching rows newer than the ones shown."""
+    global log_view_newest_id, log_view_oldest_id, log_view_exhausted
+    flush_log_writer()
+    refresh_log_summary()
+    if log_view_filter is not None:
+        show_filtered_rows()
+        return
+    if log_view_newest_id is None:
+        # First load: the visible window plus the prefetch margin
+        limit = LOG_VISIBLE_ROWS + LOG_PREFETCH_ROWS
+        rows = fetch_log_rows(limit=limit)
+        for row in rows:
+            log_tree.insert("", "end", iid=str(row[0]), values=log_row_values(row))
+        if rows:
+            log_view_newest_id = rows[0][0]
+            log_view_oldest_id = rows[-1][0]
+        log_view_exhausted = len(rows) < limit
+    else:
+        rows = fetch_log_rows(after_id=log_view_newest_id)
+        # rows are newest first, so insert from the oldest to keep the order
+        for row in reversed(rows):
+            log_tree.insert("", 0, iid=str(row[0]), values=log_row_values(row))
+        if rows:
+            log_view_newest_id = rows[0][0]
+        trim_log_view()
+
+def trim_log_view():
+    """Drop the oldest shown rows past LOG_MAX_SHOWN_ROWS; scrolling down loads them again.
+
+    Rows scrolled in since the last refresh may pass the cap until the next one.
+    """
+    global log_view_oldest_id, log_view_exhausted
+    items = log_tree.get_children()
+    if len(items) <= LOG_MAX_SHOWN_ROWS:
+        return
+    log_tree.delete(*items[LOG_MAX_SHOWN_ROWS:])
+    log_view_oldest_id = int(items[LOG_MAX_SHOWN_ROWS - 1])
+    log_view_exhausted = False
+
+def load_older_log_rows():
+    """Append the next page of older rows below the ones already shown."""
+    global log_view_oldest_id, log_view_oldest_key, log_view_exhausted, log_view_loading
+    log_view_loading = False
+    if log_view_filter is not None:
+        if log_view_exhausted or log_view_oldest_key is None:
+            return
+        rows = fetch_filtered_rows(after_key=log_view_oldest_key)
+        for row in rows:
+            log_tree.insert("", "end", iid=str(row[0]), values=log_row_values(row))
+        if rows:
+            log_view_oldest_key = (rows[-1][2], rows[-1][0])
+        log_view_exhausted = len(rows) < LOG_PREFETCH_ROWS
+        return
+    if log_view_exhausted or log_view_oldest_id is None:
+        return
+    rows = fetch_log_rows(before_id=log_view_oldest_id, limit=LOG_PREFETCH_ROWS)
+    for row in rows:
+        log_tree.insert("", "end", iid=str(row[0]), values=log_row_values(row))
+    if rows:
+        log_view_oldest_id = rows[-1][0]
+    log_view_exhausted = len(rows) < LOG_PREFETCH_ROWS
+
+def on_log_scroll(first, last):
+    """Scrollbar hook that loads more rows as the view nears the bottom."""
+    global log_view_loading
+    log_scrollbar.set(first, last)
+    if float(last) > 0.9 and not log_view_exhausted and not log_view_loading:
+        log_view_loading = True
+        root.after_idle(load_older_log_rows)
+
+# === Timeline ===
+
+def timeline_lanes():
+    """One lane per station, or one for the single timer (whose rows have no press)."""
+    if STATIONS_CONFIG:
+        names = [config.get("name", f"Press {station_id + 1}") for station_id, config in enumerate(STATIONS_CONFIG)]
+        return [(name, name) for name in names]
+    return [("", "Timer")]
+
+def timeline_colors():
+    texts = list(TIMER_TEXTS)
+    for config in STATIONS_CONFIG:
+        texts += [text for text in config.get("texts", []) if text not in texts]
+    return {text: timeline.RUN_COLORS[i % len(timeline.RUN_COLORS)] for i, text in enumerate(texts)}
+
+def longest_run():
+    """The longest a timer can run, which bounds how far back a run can reach into the timeline."""
+    durations = list(TIMER_DURATIONS)
+    for config in STATIONS_CONFIG:
+        durations += config.get("durations", [])
+    return max(durations + [60])
+
+def build_timeline(canvas):
+    global timeline_data, timeline_view
+    timeline_data = timeline.TimelineData(lambda: sqlite3.connect(LOGS_DB, uri=True), archive_dir(), longest_run())
+    timeline_view = timeline.TimelineView(canvas, timeline_data, timeline_lanes(), timeline_colors(), open_intervals)
+
+def note_timeline_rows(start_ts, stop_ts):
+    """Drop the timeline tiles a logged row falls in (again after it is committed, if the timeline is shown)."""
+    if timeline_data is None or start_ts is None:
+        return
+    timeline_data.invalidate(start_ts, stop_ts)
+    if current_screen == "timeline":
+        timeline_logged.append((start_ts, stop_ts))
+
+def refresh_timeline():
+    """Redraw what was logged since the last refresh, and the running timers, while the timeline is shown."""
+    global timeline_after_id
+    if current_screen != "timeline":
+        timeline_after_id = None
+        return
+    flush_log_writer()
+    for start_ts, stop_ts in timeline_logged:
+        timeline_data.invalidate(start_ts, stop_ts)
+    timeline_logged.clear()
+    if daemon_client is not None:
+        # The daemon logs the runs; any that ended since the last refresh started at most a run ago
+        now = time.time()
+        timeline_data.invalidate(now - longest_run() - TIMELINE_REFRESH_MS / 1000, now)
+    timeline_view.refresh()
+    timeline_after_id = root.after(TIMELINE_REFRESH_MS, refresh_timeline)
+
+def timeline_range(name):
+    timeline_view.show(TIMELINE_RANGES[name])
+
+def timeline_press(event):
+    global timeline_drag
+    timeline_drag = (event.x, event.x)
+
+def timeline_motion(event):
+    global timeline_drag
+    if timeline_drag is not None:
+        timeline_view.pan(event.x - timeline_drag[1])
+        timeline_drag = (timeline_drag[0], event.x)
+
+def timeline_release(event):
+    """A tap without dragging shows what the tapped column holds."""
+    global timeline_drag
+    if timeline_drag is not None and abs(event.x - timeline_drag[0]) < 5:
+        timeline_info_var.set(timeline_view.describe(event.x, event.y))
+    timeline_drag = None
+
+def timeline_wheel(event):
+    zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+    timeline_view.zoom(-1 if zoom_in else 1, event.x)
+
+# === Background Jobs ===
+
+def start_job_runner():
+    """Create the worker pool that runs exports and backups off the Tk loop."""
+    global job_runner
+    job_runner = JobRunner(root, max_workers=JOB_WORKERS, on_status=show_job_status)
+
+def show_job_status(name, text):
+    """Show the latest job status on the timer and log screens."""
+    job_status_var.set(f"{name}: {text}")
+
+def run_export_job(full=False):
+    """Run an export in the background unless one is already running."""
+    def on_done(exported, error):
+        if error is None:
+            show_job_status("Export", f"{exported} rows at {datetime.now().strftime('%H:%M:%S')}")
+    func = export_all_logs if full else export_logs
+    if not job_runner.submit("Export", func, on_done=on_done):
+        print("Previous export still running; skipping.")  # Optional: Console logging for warnings
+
+def run_report_job():
+    """Write the analytics report in the background unless one is already being written."""
+    def on_done(analysed, error):
+        if error is None:
+            show_job_status("Report", f"{analysed} rows in {REPORT_FILE}")
+    if not job_runner.submit("Report", write_report, on_done=on_done):
+        print("Previous report still running; skipping.")  # Optional: Console logging for warnings
+
+def run_backup_job():
+    """Append new log rows to the backup on the USB drive in the background."""
+    def on_done(stats, error):
+        if error is None and stats is None:
+            show_job_status("Backup", f"not made, is USB drive '{backup_script.USB_LABEL}' plugged in?")
+        elif error is None:
+            metrics.observe("backup", stats["seconds"])
+            show_job_status("Backup", f"{stats['rows']} rows, {stats['bytes']} bytes in {stats['seconds']} s")
+    job_runner.submit("Backup", backup_script.copy_db, LOGS_DB, True, on_done=on_done)
+
+def archive_dir():
+    return resource_path(ARCHIVE_DIR)
+
+def archivable_max_id():
+    """The highest row id retention may archive, or None for any row."""
+    max_id = None
+    if EXPORT_INTERVAL_HOURS or EXPORT_INTERVAL_MINUTES:
+        # Only archive rows the scheduled exports have already picked up
+        state = log_export.load_export_state(os.path.join(EXPORT_DIR, "export_state.json"))
+        max_id = state["last_id"]
+    if FLEET_SYNC.get("enabled"):
+        # ... and only rows the fleet collector has confirmed
+        synced_id = fleet_sync.load_sync_state(SYNC_STATE_FILE)["last_id"]
+        max_id = synced_id if max_id is None else min(max_id, synced_id)
+    return max_id
+
+def run_retention_job():
+    """Archive rows older than RETENTION_DAYS and vacuum logs.db in the background."""
+    max_id = archivable_max_id()
+    started = time.monotonic()
+    def on_done(result, error):
+        if error is None:
+            metrics.observe("retention", time.monotonic() - started)
+            moved, freed = result
+            if moved:
+                log_query_cache.clear()  # Cached pages may hold ids that moved
+                if timeline_data is not None:
+                    timeline_data.clear()  # Archives opened in a tile's query may have changed
+            if moved or freed:
+                show_job_status("Retention", f"{moved} rows archived, {freed} pages freed")
+    job_runner.submit("Retention", retention.apply_retention, LOGS_DB, archive_dir(), RETENTION_DAYS, max_id,
+                      on_done=on_done)
+
+def schedule_retention():
+    """Check retention every RETENTION_CHECK_MINUTES, skipping checks while a cycle runs."""
+    global retention_after_id
+    retention_after_id = None
+    if RETENTION_DAYS <= 0:
+        return
+    if not any(station.running for station in stations):
+        run_retention_job()
+    retention_after_id = root.after(RETENTION_CHECK_MINUTES * 60 * 1000, schedule_retention)
+
+def fleet_sync_agent():
+    """The SyncAgent for the current FLEET_SYNC settings, recreated when they change."""
+    global sync_agent
+    url = FLEET_SYNC.get("url", "")
+    device_id = FLEET_SYNC.get("device_id") or fleet_sync.default_device_id()
+    if sync_agent is None or (sync_agent.url, sync_agent.device_id) != (url, device_id):
+        sync_agent = fleet_sync.SyncAgent(LOGS_DB, url, device_id, SYNC_STATE_FILE)
+    return sync_agent
+
+def sync_logs(agent):
+    """Send new rows to the collector; returns what was sent, or the SyncError.
+
+    An unreachable collector is expected (e.g. a network outage), so it is
+    reported in the job status rather than as a failed job with a traceback.
+    """
+    started = time.monotonic()
+    try:
+        sent = agent.sync()
+    except fleet_sync.SyncError as e:
+        return e
+    metrics.observe("fleet_sync", time.monotonic() - started)
+    return sent
+
+def run_fleet_sync():
+    """Sync with the fleet collector every interval_minutes, backing off after failures."""
+    global fleet_sync_after_id
+    fleet_sync_after_id = None
+    interval_seconds = FLEET_SYNC.get("interval_minutes", 5) * 60
+    if not FLEET_SYNC.get("enabled") or not FLEET_SYNC.get("url"):
+        fleet_sync_after_id = root.after(interval_seconds * 1000, run_fleet_sync)  # Check again for a hot reload
+        return
+    agent = fleet_sync_agent()
+    def on_done(result, error):
+        global fleet_sync_after_id
+        delay = interval_seconds
+        if isinstance(result, fleet_sync.SyncError):
+            delay = agent.retry_delay(FLEET_SYNC_RETRY_SECONDS, interval_seconds)
+            show_job_status("Sync", f"{result}; retrying in {delay:.0f} s")
+        elif error is None and result["rows"]:
+            show_job_status("Sync", f"{result['rows']} rows sent in {result['batches']} batches")
+        fleet_sync_after_id = root.after(int(delay * 1000), run_fleet_sync)
+    if not job_runner.submit("Sync", sync_logs, agent, on_done=on_done):
+        fleet_sync_after_id = root.after(interval_seconds * 1000, run_fleet_sync)
 
 # === Scheduling Export Logs ===
 
 def perform_export_logs():
-    """Perform the export logs action and reschedule."""
-    export_logs()
+    """Start the export logs job and reschedule."""
+    global export_after_id
+    export_after_id = None
+    run_export_job()
     schedule_export_logs()  # Schedule the next export
 
 def schedule_export_logs():
+    """Schedule the next export, unless one is already scheduled."""
     global export_after_id
+    if export_after_id is not None:
+        return  # Every return to the main screen would otherwise start another chain
     interval_seconds = EXPORT_INTERVAL_HOURS * 3600 + EXPORT_INTERVAL_MINUTES * 60
     if interval_seconds > 0:
         interval_ms = interval_seconds * 1000
         export_after_id = root.after(interval_ms, perform_export_logs)
 
-def reschedule_export_logs():
+def cancel_export_logs():
     global export_after_id
     if export_after_id is not None:
         root.after_cancel(export_after_id)
         export_after_id = None
+
+def reschedule_export_logs():
+    cancel_export_logs()
     schedule_export_logs()
 
 # === Screen Navigation ===
 
+def main_frame():
+    """Return the frame of the main screen: the station grid or the single timer."""
+    return station_frame if STATIONS_CONFIG else timer_frame
+
 def show_main_screen():
     global current_screen
     current_screen = "idle"
     log_frame.pack_forget()
     settings_frame.pack_forget()
-    timer_frame.pack(fill="both", expand=True)
-    timer_text_label.config(text="Idle")
-    start_idle_timer()
+    timeline_frame.pack_forget()
+    main_frame().pack(fill="both", expand=True)
+    resume_idle_timer()
     schedule_export_logs()  # Ensure export is scheduled when returning to main screen
 
 def show_settings_screen():
     global current_screen
     current_screen = "settings"
-    timer_frame.pack_forget()
+    main_frame().pack_forget()
     log_frame.pack_forget()
+    timeline_frame.pack_forget()
     # Update the settings entries with current settings
     for i, (min_entry, sec_entry) in enumerate(timer_entries):
         minutes, seconds = divmod(TIMER_DURATIONS[i], 60)
@@ -321,9 +967,8 @@ def show_settings_screen():
     export_minutes_entry.delete(0, tk.END)
     export_minutes_entry.insert(0, str(int(EXPORT_INTERVAL_MINUTES)))
     settings_frame.pack(fill="both", expand=True)
-    stop_idle_timer()
-    if export_after_id is not None:
-        root.after_cancel(export_after_id)  # Pause export while in settings
+    pause_idle_timer()
+    cancel_export_logs()  # Pause export while in settings
     # Set focus to the first Entry widget
     if timer_entries:
         timer_entries[0][0].focus_set()
@@ -331,12 +976,29 @@ def show_settings_screen():
 def show_log_page():
     global current_screen
     current_screen = "logs"
-    timer_frame.pack_forget()
+    main_frame().pack_forget()
     settings_frame.pack_forget()
+    timeline_frame.pack_forget()
     log_frame.pack(fill="both", expand=True)
-    stop_idle_timer()
+    pause_idle_timer()
+    refresh_log_filter_names()
     refresh_log_view()
 
+def show_timeline():
+    global current_screen, timeline_after_id
+    current_screen = "timeline"
+    main_frame().pack_forget()
+    settings_frame.pack_forget()
+    log_frame.pack_forget()
+    timeline_frame.pack(fill="both", expand=True)
+    pause_idle_timer()
+    flush_log_writer()
+    timeline_logged.clear()  # Committed now, and already dropped from the tiles
+    root.update_idletasks()  # So the canvas knows its size
+    timeline_view.show(TIMELINE_RANGES[TIMELINE_DEFAULT_RANGE])
+    if timeline_after_id is None:
+        timeline_after_id = root.after(TIMELINE_REFRESH_MS, refresh_timeline)
+
 # === Key Press Handlers ===
 
 def handle_alt_l(event):
@@ -345,101 +1007,407 @@ def handle_alt_l(event):
         show_log_page()
         return "break"
 
+def handle_alt_t(event):
+    print("Alt-t pressed")  # Debugging statement
+    if current_screen in ("idle", "logs"):
+        show_timeline()
+        return "break"
+
 def handle_alt_s(event):
     print("Alt-s pressed")  # Debugging statement
+    if STATIONS_CONFIG:
+        print("Stations are configured in settings.json")  # The settings screen edits the single-press timers
+        return "break"
     if current_screen == "idle":
         show_settings_screen()
         return "break"
 
+def handle_alt_m(event):
+    """Toggle the metrics overlay (not listed on any screen)."""
+    global metrics_overlay_after_id
+    if metrics_overlay_after_id is not None:
+        root.after_cancel(metrics_overlay_after_id)
+        metrics_overlay_after_id = None
+        metrics_overlay.place_forget()
+    else:
+        metrics_overlay.place(relx=1.0, rely=0.0, anchor="ne", x=-10, y=10)
+        refresh_metrics_overlay()
+    return "break"
+
+# === Metrics ===
+
+def refresh_metrics_overlay():
+    """Redraw the overlay with the latest figures while it is shown."""
+    global metrics_overlay_after_id
+    lines = metrics.summary_lines()
+    if log_writer is not None:
+        lines.append(f"log rows committed: {log_writer.commit_stats()['rows']}")
+    metrics_overlay.config(text="\n".join(lines))
+    metrics_overlay.lift()
+    metrics_overlay_after_id = root.after(METRICS_OVERLAY_REFRESH_MS, refresh_metrics_overlay)
+
+def write_metrics_file():
+    """Write the metrics to METRICS_FILE."""
+    try:
+        metrics.write(METRICS_FILE)
+    except OSError as e:
+        print(f"Failed to write {METRICS_FILE}: {e}")  # Optional: Console logging for warnings
+
+def schedule_metrics_file():
+    """Write the metrics file every METRICS_WRITE_INTERVAL_MS."""
+    global metrics_after_id
+    write_metrics_file()
+    metrics_after_id = root.after(METRICS_WRITE_INTERVAL_MS, schedule_metrics_file)
+
 # === Settings Update Function ===
 
 def update_settings():
-    global TIMER_DURATIONS, TIMER_TEXTS, IDLE_YELLOW_DURATION, IDLE_RED_DURATION
-    global EXPORT_INTERVAL_HOURS, EXPORT_INTERVAL_MINUTES
     try:
-        for i in range(4):
-            minutes = int(timer_entries[i][0].get())
-            seconds = int(timer_entries[i][1].get())
+        durations = list(TIMER_DURATIONS)
+        texts = list(TIMER_TEXTS)
+        for i, (min_entry, sec_entry) in enumerate(timer_entries):
+            minutes = int(min_entry.get())
+            seconds = int(sec_entry.get())
             if minutes < 0 or seconds < 0 or seconds >= 60:
                 raise ValueError
-            TIMER_DURATIONS[i] = minutes * 60 + seconds
-            TIMER_TEXTS[i] = text_entries[i].get()
-        # Read idle timer color thresholds
-        yellow_minutes = int(idle_yellow_entry.get())
-        red_minutes = int(idle_red_entry.get())
-        if yellow_minutes < 0 or red_minutes < 0:
-            raise ValueError
-        IDLE_YELLOW_DURATION = yellow_minutes * 60
-        IDLE_RED_DURATION = red_minutes * 60
-        # Read export interval settings
-        export_hours = int(export_hours_entry.get())
-        export_minutes = int(export_minutes_entry.get())
-        if export_hours < 0 or export_minutes < 0 or export_minutes >= 60:
-            raise ValueError
-        EXPORT_INTERVAL_HOURS = export_hours
-        EXPORT_INTERVAL_MINUTES = export_minutes
-        save_settings()
-        reschedule_export_logs()  # Reschedule export with new settings
-        show_main_screen()
-    except ValueError:
+            durations[i] = minutes * 60 + seconds
+            texts[i] = text_entries[i].get()
+        # The store checks the ranges and saves; apply_settings updates the globals
+        settings_store.update(
+            durations=durations,
+            texts=texts,
+            idle_yellow_duration=int(idle_yellow_entry.get()) * 60,
+            idle_red_duration=int(idle_red_entry.get()) * 60,
+            export_interval_hours=int(export_hours_entry.get()),
+            export_interval_minutes=int(export_minutes_entry.get()),
+        )
+    except ValueError:  # Also settings_store.SettingsError
         messagebox.showerror("Error", "Invalid input. Please enter valid positive numbers.")
+        return
+    show_main_screen()
 
 # === GPIO Button Callback ===
 
-def button_callback(timer_index):
-    # Map button index (1-4) to list index (0-3)
-    timer_list_index = timer_index - 1
-    
-    # Ensure the index is within the valid range
-    if timer_list_index < 0 or timer_list_index >= len(TIMER_DURATIONS):
-        print(f"Invalid timer index: {timer_index}")
+def button_callback(key):
+    """Handle a debounced press of the single timer or a station; runs on the Tk thread via input_queue."""
+    pressed = timing_common.pressed_station(stations, key)
+    if pressed is None:
         return
-    
-    current_time = time.time()
-    if current_time - last_press_time[timer_index] >= DEBOUNCE_TIME:
-        print(f"Button {timer_index} pressed")  # Debugging statement
-        if running and active_timer == timer_list_index:
-            stop_timer()
+    station, button_index = pressed
+    station.press(button_index, station_scheduler.clock())
+    station_scheduler.poke(station)  # Redraw now rather than on the next tick
+    state_changed()
+
+def start_input_queue():
+    """Start draining button presses on the Tk loop."""
+    global input_queue
+    input_queue = InputQueue(button_callback, poll_ms=INPUT_POLL_MS, debounce=DEBOUNCE_TIME, clock=clock,
+                             on_latency=metrics.recorder("press_to_screen"))
+    input_queue.start(root)
+
+def report_press_latency():
+    """Print the measured time from a button press to the screen update."""
+    stats = input_queue.latency_stats()
+    if stats["presses"]:
+        print(f"Press-to-screen latency: {stats['presses']} presses, "
+              f"median {stats['median'] * 1000:.1f} ms, p95 {stats['p95'] * 1000:.1f} ms, "
+              f"max {stats['max'] * 1000:.1f} ms, {stats['over_target']} over 50 ms")
+
+# === Station Mode ===
+
+def setup_stations(resume=None):
+    """Create the single timer, or a Station for each "stations" entry, and start them.
+
+    resume holds intervals recovered from the journal, keyed on station id;
+    the others start idle.
+    """
+    global stations, station_scheduler
+    station_scheduler = StationScheduler(root, clock=clock, on_lateness=metrics.recorder("tick_lateness"))
+    stations = timing_common.create_stations(STATIONS_CONFIG, TIMER_DURATIONS, TIMER_TEXTS,
+                                             IDLE_YELLOW_DURATION, IDLE_RED_DURATION)
+    timing_common.start_stations(stations, resume or {}, station_scheduler.clock())
+    for station in stations:
+        station.on_log = log_station_change
+        station.on_change = draw_station_tile if STATIONS_CONFIG else draw_timer
+        station_scheduler.add(station)
+    state_changed()
+
+def log_station_change(station, name, start_time, stop_time):
+    log_state_change(name, start_time, stop_time, press=station.name)
+
+def draw_station_tile(station, now):
+    """Update the labels of a station's tile that changed since the last draw."""
+    tile = station_tiles[station.station_id]
+    state = station.display(now)
+    alert = live_anomaly(state["name"], state["elapsed"])
+    with renderer.frame(root):
+        renderer.update(tile["clock"], text=state["clock"])
+        if alert:
+            renderer.update(tile["text"], text=f"{state['text']} - {stream_stats.ANOMALY_TEXT['long']}", fg="orange")
+        else:
+            renderer.update(tile["text"], text=state["text"], fg="gray")
+        renderer.update(tile["idle"], text=state["idle"], fg=state["idle_color"])
+
+def build_station_tiles():
+    """Lay the stations out as a grid of tiles scaled to fit the screen."""
+    global station_frame
+    station_frame = tk.Frame(root, bg="black")
+    count = len(STATIONS_CONFIG)
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    scale = 1 / max(columns, rows)
+    for station_id, config in enumerate(STATIONS_CONFIG):
+        tile = tk.Frame(station_frame, bg="black", highlightbackground="gray", highlightthickness=2)
+        tile.grid(row=station_id // columns, column=station_id % columns, sticky="nsew", padx=5, pady=5)
+        name_label = tk.Label(tile, text=config.get("name", f"Press {station_id + 1}"),
+                              font=("Helvetica", max(12, int(60 * scale))), fg="white", bg="black")
+        name_label.pack(pady=(10, 0))
+        clock_label = tk.Label(tile, text="00:00", font=("Helvetica", max(24, int(400 * scale)), "bold"),
+                               fg="white", bg="black")
+        clock_label.pack(expand=True)
+        text_label = tk.Label(tile, text="Idle", font=("Helvetica", max(12, int(60 * scale))), fg="gray", bg="black")
+        text_label.pack()
+        idle_label = tk.Label(tile, text="", font=("Helvetica", max(10, int(40 * scale))), fg="green", bg="black")
+        idle_label.pack(pady=(0, 10))
+        station_tiles[station_id] = {
+            "clock": clock_label, "text": text_label, "idle": idle_label,
+        }
+    for row in range(rows):
+        station_frame.grid_rowconfigure(row, weight=1, uniform="tile")
+    for column in range(columns):
+        station_frame.grid_columnconfigure(column, weight=1, uniform="tile")
+
+# === Timing Daemon Client ===
+
+def start_daemon_client():
+    """Show the presses timed by timing_daemon.py instead of timing them here."""
+    global station_scheduler, daemon_client, daemon_after_id
+    station_scheduler = StationScheduler(root, clock=clock, on_lateness=metrics.recorder("tick_lateness"))
+    daemon_client = timing_daemon.StateClient(DAEMON_SOCKET)
+    daemon_client.start()
+    show_job_status("Timing", "waiting for timing_daemon.py")
+    daemon_after_id = root.after(DAEMON_POLL_MS, poll_daemon_state)
+
+def poll_daemon_state():
+    """Mirror the newest state published by the daemon."""
+    global daemon_connected, daemon_after_id
+    state = daemon_client.take()
+    if state is not None:
+        mirror_presses(state["presses"])
+        log_query_cache.clear()  # The change may have logged a row
+    if daemon_client.connected != daemon_connected:
+        daemon_connected = daemon_client.connected
+        if daemon_connected:
+            show_job_status("Timing", "connected to timing_daemon.py")
         else:
-            start_timer(timer_list_index)
-        last_press_time[timer_index] = current_time
+            mirror_presses([{"station": station.station_id, "press": station.name, "state": "stopped",
+                             "idle_yellow": station.idle_yellow_duration, "idle_red": station.idle_red_duration}
+                            for station in stations])
+            show_job_status("Timing", "timing_daemon.py is not running; reconnecting")
+    daemon_after_id = root.after(DAEMON_POLL_MS, poll_daemon_state)
+
+def mirror_presses(presses):
+    """Replace the mirrored presses with the daemon's; mirrors tick and draw but never log."""
+    global stations
+    now = station_scheduler.clock()
+    mirrors = []
+    for press in presses:
+        # Both processes read the stations from settings.json, but only at startup
+        wanted = press["station"] in station_tiles if STATIONS_CONFIG else press["station"] is None
+        if not wanted:
+            continue
+        station = Station(press["station"], press["press"], [press.get("duration", 0)], [press.get("name", "")],
+                          [], press["idle_yellow"], press["idle_red"])
+        station.on_change = draw_station_tile if STATIONS_CONFIG else draw_timer
+        if press["state"] == "running":
+            station.start_timer(0, now, start_time=datetime.fromtimestamp(press["start_ts"]))
+        elif press["state"] == "idle":
+            station.start_idle(now, start_time=datetime.fromtimestamp(press["start_ts"]))
+        mirrors.append(station)
+        station_scheduler.add(station)
+    stations = mirrors
+
+def stop_daemon_client():
+    if daemon_client is not None:
+        daemon_client.stop()
+
+# === Status API ===
+
+def start_status_api():
+    """Start the HTTP status API if it is enabled in settings.json."""
+    global status_server
+    if not STATUS_API.get("enabled"):
+        return
+    status_server = StatusServer(STATUS_API.get("host", "127.0.0.1"), STATUS_API.get("port", 8321),
+                                 recent_rows=STATUS_API_RECENT_ROWS)
+    # Seed the recent rows once; afterwards they are added as they are logged
+    status_server.add_log_rows(timing_common.recent_status_rows(LOGS_DB, STATUS_API_RECENT_ROWS))
+    try:
+        status_server.start()
+    except OSError as e:
+        print(f"Status API not started: {e}")  # Optional: Console logging for warnings
+        status_server = None
+        return
+    print(f"Status API on http://{status_server.host}:{status_server.port}/status")
+    state_changed()
+
+def stop_status_api():
+    global status_server
+    if status_server is not None:
+        status_server.stop()
+        status_server = None
+
+def status_snapshot():
+    """The current state of the press, or of every station, for the status API."""
+    return {"screen": current_screen, "presses": timing_common.status_presses(stations)}
+
+# === State Journal ===
+
+def state_changed():
+    """Journal and publish the new state once the current Tk callback has finished.
+
+    A press usually changes the state several times (stop idle, start the
+    timer); coalescing them means the journal and dashboards only see the
+    final state.
+    """
+    global state_change_pending
+    if root is None or state_change_pending:
+        return
+    state_change_pending = True
+    root.after_idle(_record_state_change)
+
+def _record_state_change():
+    global state_change_pending
+    state_change_pending = False
+    if state_journal is not None:
+        state_journal.append(journal_record())
+    if status_server is not None:
+        status_server.publish(status_snapshot())
+
+def journal_record():
+    """The intervals open right now, and those logged but not yet committed."""
+    if log_writer is not None:
+        rows_committed = log_writer.rows_committed()
     else:
-        print(f"Button {timer_index} press ignored due to debounce.")  # Debugging statement
-        pass
-
-# === GPIO Event Detection Setup ===
-
-def setup_event_detection():
-    for timer_index, pin in BUTTON_PINS.items():
-        GPIO.add_event_detect(
-            pin,
-            GPIO.RISING,  # Detect rising edge (LOW -> HIGH)
-            callback=lambda channel, idx=timer_index: button_callback(idx),
-            bouncetime=int(DEBOUNCE_TIME * 1000)  # Convert to milliseconds
-        )
+        rows_committed = logged_intervals.rows_written - log_rows_unwritten
+    return timing_common.journal_record(stations, logged_intervals, rows_committed)
+
+def open_intervals():
+    """The running countdowns and idle periods, as journal entries (drawn on the timeline)."""
+    return timing_common.open_intervals(stations)
+
+def start_journal():
+    """Open the journal; returns the record it ended with (None on the first start)."""
+    global state_journal
+    state_journal = Journal(JOURNAL_FILE)
+    return state_journal.open()
+
+def stop_journal(clean=True):
+    """Stop the journal; after a clean shutdown it records that nothing is open."""
+    global state_journal
+    if state_journal is not None:
+        state_journal.close(journal_record() if clean else None)
+        state_journal = None
+
+def journal_heartbeat():
+    """Rewrite the current state now and then, so recovery knows when we were last alive."""
+    global journal_after_id
+    state_journal.append(journal_record())
+    journal_after_id = root.after(JOURNAL_HEARTBEAT_MS, journal_heartbeat)
+
+def can_resume(entry):
+    """Whether an interval from the journal fits the current timer configuration."""
+    return timing_common.can_resume(entry, STATIONS_CONFIG, TIMER_DURATIONS)
+
+def recover_intervals(record):
+    """Log what the last run left open (see journal.recover_record); returns the intervals to resume."""
+    def log_interval(name, start_ts, stop_ts, press):
+        log_state_change(name, datetime.fromtimestamp(start_ts), datetime.fromtimestamp(stop_ts), press=press)
+    return recover_record(record, time.time(), log_interval, lambda interval: already_logged(LOGS_DB, interval),
+                          can_resume)
 
 # === Application Exit Handler ===
 
 def on_closing():
     if messagebox.askokcancel("Quit", "Do you want to quit?"):
-        if running:
-            stop_timer()
-        elif idle_timer_running:
-            stop_idle_timer()
-        if export_after_id is not None:
-            root.after_cancel(export_after_id)
-        cleanup_gpio()
-        root.destroy()
+        shutdown_app()
+
+def shutdown_app():
+    """Log the open intervals, stop the background work and close the window."""
+    if station_scheduler is not None:
+        station_scheduler.shutdown()  # Log every station's open interval
+    cancel_export_logs()
+    if fleet_sync_after_id is not None:
+        root.after_cancel(fleet_sync_after_id)
+    if sync_agent is not None:
+        sync_agent.stop()  # Don't wait out retries of an unreachable collector
+    if job_runner is not None:
+        job_runner.shutdown(wait=True)  # Let a running export or backup finish
+    if metrics_after_id is not None:
+        root.after_cancel(metrics_after_id)
+    if retention_after_id is not None:
+        root.after_cancel(retention_after_id)
+    if settings_after_id is not None:
+        root.after_cancel(settings_after_id)
+    if journal_after_id is not None:
+        root.after_cancel(journal_after_id)
+    if daemon_after_id is not None:
+        root.after_cancel(daemon_after_id)
+    if interval_stats_after_id is not None:
+        root.after_cancel(interval_stats_after_id)
+    if timeline_after_id is not None:
+        root.after_cancel(timeline_after_id)
+    report_tick_jitter()
+    if input_queue is not None:
+        report_press_latency()
+        input_queue.stop()
+    stop_log_writer()  # Flush rows logged by the stops above
+    write_metrics_file()
+    if daemon_client is None:
+        save_interval_stats()
+    stop_input_backend()
+    stop_status_api()
+    stop_daemon_client()
+    stop_journal()  # Everything was logged above, so nothing is left open
+    root.destroy()
+
+# === Startup Time ===
+
+def process_age():
+    """Seconds since this process was started (Linux only), or None."""
+    try:
+        with open("/proc/self/stat", "r") as file:
+            # Field 22 is the start time in clock ticks after boot; the
+            # command name in field 2 may contain spaces, so split after it.
+            start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as file:
+            uptime = float(file.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def report_startup_time():
+    """Print how long it took until the first frame was drawn."""
+    root.update_idletasks()
+    since_import = time.monotonic() - START_TIME
+    age = process_age()
+    if age is not None:
+        print(f"First frame drawn {age:.2f} s after process start "
+              f"({since_import:.2f} s after main.py began loading).")
+    else:
+        print(f"First frame drawn {since_import:.2f} s after main.py began loading.")
 
 # === Initialize the GUI ===
 
 def initialize_gui():
-    global root, timer_frame, timer_label, timer_text_label, idle_timer_label
-    global log_frame, log_tree, log_buttons
+    global root, timer_frame, timer_label, timer_text_label, idle_timer_label, anomaly_label, job_status_var
+    global log_frame, log_tree, log_scrollbar, log_buttons, summary_tree
+    global log_filter_name, log_filter_since, log_filter_until, log_filter_min, log_count_var
     global settings_frame, timer_entries, text_entries
     global idle_yellow_entry, idle_red_entry
     global export_hours_entry, export_minutes_entry  # Added
-    global buttons_frame
+    global buttons_frame, metrics_overlay
+    global timeline_frame, timeline_info_var
 
     root = tk.Tk()
     root.title("Timer Application")
@@ -450,39 +1418,117 @@ def initialize_gui():
     # Bind keys for navigation only
     root.bind('<Alt-l>', handle_alt_l)
     root.bind('<Alt-s>', handle_alt_s)
+    root.bind('<Alt-m>', handle_alt_m)
+    root.bind('<Alt-t>', handle_alt_t)
 
     # Main timer screen
     timer_frame = tk.Frame(root, bg="black")
     central_frame = tk.Frame(timer_frame, bg="black")
     central_frame.pack(expand=True)
-    timer_label = tk.Label(central_frame, text="00:00", font=("Helvetica", 500, "bold"), fg="white", bg="black")
+    timer_label = GlyphClock(central_frame, text="00:00", font=("Helvetica", 500, "bold"), fg="white", bg="black")
     timer_label.pack()
     timer_text_label = tk.Label(central_frame, text="", font=("Helvetica", 60), fg="gray", bg="black")
     timer_text_label.pack(pady=(20, 20))
     idle_timer_label = tk.Label(timer_frame, text="", font=("Helvetica", 40), fg="green", bg="black")
     idle_timer_label.pack(side="bottom", pady=20)
+    anomaly_label = tk.Label(timer_frame, text="", font=("Helvetica", 30), fg="orange", bg="black")
+    anomaly_label.pack(side="bottom")
+    job_status_var = tk.StringVar(value="")
+    job_status_label = tk.Label(timer_frame, textvariable=job_status_var, font=("Helvetica", 14), fg="gray", bg="black")
+    job_status_label.place(relx=0.0, rely=1.0, anchor="sw", x=10, y=-10)
 
     # Log screen
     log_frame = tk.Frame(root, bg="white")
-    log_tree = ttk.Treeview(log_frame, columns=("Name", "Start Time", "Stop Time", "Duration"), show="headings")
+    summary_columns = ("Period", "Name", "Cycles", "Total", "Average", "Longest")
+    summary_tree = ttk.Treeview(log_frame, columns=summary_columns, show="headings", height=8)
+    for column in summary_columns:
+        summary_tree.heading(column, text=column)
+        summary_tree.column(column, width=150, anchor='center')
+    summary_tree.pack(fill="x", padx=20, pady=(20, 0))
+    log_filter_bar = tk.Frame(log_frame, bg="white")
+    log_filter_bar.pack(fill="x", padx=20, pady=(10, 0))
+    tk.Label(log_filter_bar, text="Name", font=("Helvetica", 14), bg="white").pack(side="left")
+    log_filter_name = ttk.Combobox(log_filter_bar, font=("Helvetica", 14), width=14)
+    log_filter_name.pack(side="left", padx=(5, 15))
+    tk.Label(log_filter_bar, text="From", font=("Helvetica", 14), bg="white").pack(side="left")
+    log_filter_since = tk.Entry(log_filter_bar, font=("Helvetica", 14), width=16)
+    log_filter_since.pack(side="left", padx=(5, 15))
+    tk.Label(log_filter_bar, text="To", font=("Helvetica", 14), bg="white").pack(side="left")
+    log_filter_until = tk.Entry(log_filter_bar, font=("Helvetica", 14), width=16)
+    log_filter_until.pack(side="left", padx=(5, 15))
+    tk.Label(log_filter_bar, text="Min. minutes", font=("Helvetica", 14), bg="white").pack(side="left")
+    log_filter_min = tk.Entry(log_filter_bar, font=("Helvetica", 14), width=5)
+    log_filter_min.pack(side="left", padx=(5, 15))
+    tk.Button(log_filter_bar, text="Filter", command=apply_log_filter, font=("Helvetica", 14)).pack(side="left", padx=5)
+    tk.Button(log_filter_bar, text="Clear", command=clear_log_filter, font=("Helvetica", 14)).pack(side="left", padx=5)
+    log_count_var = tk.StringVar(value="")
+    tk.Label(log_filter_bar, textvariable=log_count_var, font=("Helvetica", 14), fg="gray", bg="white").pack(side="left", padx=15)
+    log_table_frame = tk.Frame(log_frame, bg="white")
+    log_table_frame.pack(fill="both", expand=True, padx=20, pady=20)
+    log_tree = ttk.Treeview(log_table_frame, columns=("Name", "Start Time", "Stop Time", "Duration", "Press"), show="headings")
     log_tree.heading("Name", text="Name")
     log_tree.heading("Start Time", text="Start Time")
     log_tree.heading("Stop Time", text="Stop Time")
     log_tree.heading("Duration", text="Duration")
+    log_tree.heading("Press", text="Press")
     log_tree.column("Name", width=200, anchor='center')
     log_tree.column("Start Time", width=200, anchor='center')
     log_tree.column("Stop Time", width=200, anchor='center')
     log_tree.column("Duration", width=150, anchor='center')
-    log_tree.pack(fill="both", expand=True, padx=20, pady=20)
+    log_tree.column("Press", width=150, anchor='center')
+    log_scrollbar = ttk.Scrollbar(log_table_frame, orient="vertical", command=log_tree.yview)
+    log_tree.configure(yscrollcommand=on_log_scroll)
+    log_scrollbar.pack(side="right", fill="y")
+    log_tree.pack(side="left", fill="both", expand=True)
 
     log_buttons = tk.Frame(log_frame, bg="white")
     log_buttons.pack(fill="x", pady=10, padx=20)
     clear_logs_button = tk.Button(log_buttons, text="Clear Logs", command=clear_logs, font=("Helvetica", 16))
     clear_logs_button.pack(side="left", padx=10, pady=5)
-    export_logs_button = tk.Button(log_buttons, text="Export Logs", command=export_logs, font=("Helvetica", 16))
+    export_logs_button = tk.Button(log_buttons, text="Export Logs", command=run_export_job, font=("Helvetica", 16))
     export_logs_button.pack(side="left", padx=10, pady=5)
+    full_export_button = tk.Button(log_buttons, text="Full Export", command=lambda: run_export_job(full=True), font=("Helvetica", 16))
+    full_export_button.pack(side="left", padx=10, pady=5)
+    report_button = tk.Button(log_buttons, text="Report", command=run_report_job, font=("Helvetica", 16))
+    report_button.pack(side="left", padx=10, pady=5)
+    backup_button = tk.Button(log_buttons, text="Backup to USB", command=run_backup_job, font=("Helvetica", 16))
+    backup_button.pack(side="left", padx=10, pady=5)
+    log_job_status_label = tk.Label(log_buttons, textvariable=job_status_var, font=("Helvetica", 14), fg="gray", bg="white")
+    log_job_status_label.pack(side="left", padx=20, pady=5)
     back_log_button = tk.Button(log_buttons, text="Back", command=show_main_screen, font=("Helvetica", 16))
     back_log_button.pack(side="right", padx=10, pady=5)
+    timeline_button = tk.Button(log_buttons, text="Timeline", command=show_timeline, font=("Helvetica", 16))
+    timeline_button.pack(side="right", padx=10, pady=5)
+
+    # Timeline screen
+    timeline_frame = tk.Frame(root, bg="black")
+    timeline_buttons = tk.Frame(timeline_frame, bg="black")
+    timeline_buttons.pack(fill="x", pady=10, padx=20)
+    for range_name in TIMELINE_RANGES:
+        range_button = tk.Button(timeline_buttons, text=range_name, command=lambda name=range_name: timeline_range(name),
+                                 font=("Helvetica", 16))
+        range_button.pack(side="left", padx=10, pady=5)
+    for text, command in (("-", lambda: timeline_view.zoom(1)), ("+", lambda: timeline_view.zoom(-1)),
+                          ("<", lambda: timeline_view.pan(timeline_view.plot_width() // 2)),
+                          (">", lambda: timeline_view.pan(-(timeline_view.plot_width() // 2))),
+                          ("Now", lambda: timeline_view.show(timeline_view.spp * timeline_view.plot_width()))):
+        nav_button = tk.Button(timeline_buttons, text=text, command=command, font=("Helvetica", 16), width=4)
+        nav_button.pack(side="left", padx=5, pady=5)
+    back_timeline_button = tk.Button(timeline_buttons, text="Back", command=show_main_screen, font=("Helvetica", 16))
+    back_timeline_button.pack(side="right", padx=10, pady=5)
+    timeline_info_var = tk.StringVar(value="")
+    timeline_info_label = tk.Label(timeline_frame, textvariable=timeline_info_var, font=("Helvetica", 16),
+                                   fg="white", bg="black", anchor="w")
+    timeline_info_label.pack(side="bottom", fill="x", padx=20, pady=10)
+    timeline_canvas = tk.Canvas(timeline_frame, bg="black", highlightthickness=0)
+    timeline_canvas.pack(fill="both", expand=True, padx=20)
+    timeline_canvas.bind("<ButtonPress-1>", timeline_press)
+    timeline_canvas.bind("<B1-Motion>", timeline_motion)
+    timeline_canvas.bind("<ButtonRelease-1>", timeline_release)
+    timeline_canvas.bind("<MouseWheel>", timeline_wheel)
+    timeline_canvas.bind("<Button-4>", timeline_wheel)
+    timeline_canvas.bind("<Button-5>", timeline_wheel)
+    build_timeline(timeline_canvas)
 
     # Settings screen
     settings_frame = tk.Frame(root, bg="white")
@@ -549,25 +1595,121 @@ def initialize_gui():
     back_button = tk.Button(buttons_frame, text="Back", command=show_main_screen, font=("Helvetica", 16), bg="#555555", fg="white", width=12)
     back_button.grid(row=0, column=1, padx=10, pady=5)
 
+    if STATIONS_CONFIG:
+        build_station_tiles()
+
+    # Metrics overlay, placed over whichever screen is shown by Alt-m
+    metrics_overlay = tk.Label(root, text="", font=("Courier", 14), fg="lime", bg="black", justify="left")
+
     # Pack all frames but hide them initially
-    timer_frame.pack(fill="both", expand=True)
+    main_frame().pack(fill="both", expand=True)
     log_frame.pack_forget()
     settings_frame.pack_forget()
+    timeline_frame.pack_forget()
 
     # Initialize labels
-    timer_text_label.config(text="Idle")
+    renderer.update(timer_text_label, text="Idle")
+
+# === Initialize Headless Mode ===
+
+def initialize_headless():
+    """Stand-ins for the GUI when running without a display (--headless)."""
+    global root, timer_frame, timer_label, timer_text_label, idle_timer_label, anomaly_label, job_status_var
+    global log_frame, settings_frame, station_frame, log_tree, summary_tree
+    global log_filter_name, log_count_var, timeline_frame
+
+    root = headless.HeadlessRoot(clock=clock, sleep=getattr(clock, "sleep", time.sleep))
+    # Only state changes are echoed; the clock labels change every second
+    timer_frame = log_frame = settings_frame = timeline_frame = headless.HeadlessWidget("frame")
+    timer_label = headless.HeadlessWidget("timer", text="00:00")
+    timer_text_label = headless.HeadlessWidget("state", echo=True)
+    idle_timer_label = headless.HeadlessWidget("idle")
+    anomaly_label = headless.HeadlessWidget("unusual", echo=True)
+    job_status_var = headless.HeadlessVar(name="jobs", echo=True)
+    log_tree = headless.HeadlessTreeview("logs")
+    summary_tree = headless.HeadlessTreeview("summary")
+    log_filter_name = headless.HeadlessWidget("filter")  # Filters are set with set_log_filter
+    log_count_var = headless.HeadlessVar(name="matching")
+    if STATIONS_CONFIG:
+        station_frame = headless.HeadlessWidget("stations")
+        for station_id, config in enumerate(STATIONS_CONFIG):
+            name = config.get("name", f"Press {station_id + 1}")
+            station_tiles[station_id] = {
+                "clock": headless.HeadlessWidget(name),
+                "text": headless.HeadlessWidget(name, echo=True),
+                "idle": headless.HeadlessWidget(name),
+            }
+
+def show_fatal_error(e):
+    if headless_mode:
+        print(f"An unexpected error occurred: {e}")
+    else:
+        messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Foam press timer.")
+    parser.add_argument("--input", choices=("gpio", "keyboard", "script"), default="gpio",
+                        help="Where button presses come from (default: GPIO pins)")
+    parser.add_argument("--script", help="Press script for --input script (lines of '<seconds> <button>')")
+    parser.add_argument("--repeat", action="store_true", help="Replay the press script forever")
+    parser.add_argument("--headless", action="store_true", help="Run without a display")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Only show the timers run by timing_daemon.py, which reads the buttons")
+    args = parser.parse_args()
+    if args.daemon and (args.input != "gpio" or args.script):
+        parser.error("with --daemon, pass --input and --script to timing_daemon.py")
+    if args.input == "script" and not args.script:
+        parser.error("--input script needs --script FILE")
+    if args.headless and args.input == "keyboard":
+        parser.error("--input keyboard needs a display")
+    return args
 
 # === Main Application ===
 
 if __name__ == "__main__":
+    args = parse_args()
+    headless_mode = args.headless
     try:
-        setup_gpio()
-        setup_event_detection()
         load_settings()
         init_db()  # Initialize the database
-        initialize_gui()
+        load_interval_stats()
+        if not args.daemon:
+            if timing_daemon.daemon_running(DAEMON_SOCKET):
+                sys.exit("timing_daemon.py is running the timers; start with --daemon to show them")
+            try:
+                last_record = start_journal()
+            except JournalLocked as e:
+                sys.exit(f"{e}; is timing_daemon.py or another main.py running?")
+            start_log_writer()
+            resume = recover_intervals(last_record)
+        if headless_mode:
+            initialize_headless()
+        else:
+            initialize_gui()
+        start_job_runner()
+        if args.daemon:
+            start_daemon_client()  # The daemon also serves the status API
+        else:
+            setup_stations(resume)
+            start_input_queue()
+            create_input_backend(args.input, args.script, args.repeat)
+            start_input_backend()
+            start_status_api()
         show_main_screen()
+        root.after(0, report_startup_time)
+        metrics_after_id = root.after(METRICS_WRITE_INTERVAL_MS, schedule_metrics_file)
+        retention_after_id = root.after(RETENTION_CHECK_MINUTES * 60 * 1000, schedule_retention)
+        settings_after_id = root.after(SETTINGS_POLL_MS, poll_settings)
+        interval_stats_after_id = root.after(STREAM_STATS_SAVE_MS, schedule_interval_stats)
+        if state_journal is not None:
+            journal_after_id = root.after(JOURNAL_HEARTBEAT_MS, journal_heartbeat)
+        fleet_sync_after_id = root.after(0, run_fleet_sync)
         root.mainloop()
+    except KeyboardInterrupt:
+        shutdown_app()
     except Exception as e:
-        messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-        cleanup_gpio()
+        show_fatal_error(e)
+        stop_log_writer()
+        stop_input_backend()
+        stop_status_api()
+        stop_journal(clean=False)  # Keep the open intervals for the next start
@@ -0,0 +1,114 @@
+"""Fixed-memory latency histograms for the timer's hot paths.
+
+Each metric counts its samples in fixed buckets and keeps its most recent
+samples in a ring buffer, so memory stays constant however long the press
+runs. Samples may be recorded from any thread (the log writer records its
+commits from its own thread).
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bounds of the histogram buckets, in seconds; a last bucket holds the rest
+BUCKET_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# Recent samples kept per metric
+RECENT_SAMPLES = 120
+
+
+class Histogram:
+    """Bucketed counts, totals and recent samples of one latency metric."""
+
+    def __init__(self, bounds=BUCKET_BOUNDS, recent=RECENT_SAMPLES):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.recent = deque(maxlen=recent)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        seconds = max(0.0, seconds)
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.recent.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample (at most the maximum)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                break
+        return self.max
+
+    def snapshot(self):
+        buckets = {f"<={bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets[f">{self.bounds[-1]:g}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "last": self.recent[-1] if self.recent else 0.0,
+            "buckets": buckets,
+            "recent": list(self.recent),
+        }
+
+
+class Metrics:
+    """A set of named histograms, created on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.started = time.monotonic()
+
+    def observe(self, name, seconds):
+        """Record one sample (in seconds) of metric `name`; callable from any thread."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def recorder(self, name):
+        """Return a callback that records its argument as a sample of `name`."""
+        return lambda seconds: self.observe(name, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())}
+
+    def summary_lines(self):
+        """One line per metric with count, average, p95 and maximum in milliseconds."""
+        lines = [f"{'metric':16}{'count':>8}{'avg':>9}{'p95':>9}{'max':>9}"]
+        for name, stats in self.snapshot().items():
+            lines.append(f"{name:16}{stats['count']:>8}{stats['avg'] * 1000:>9.1f}"
+                         f"{stats['p95'] * 1000:>9.1f}{stats['max'] * 1000:>9.1f}")
+        return lines
+
+    def write(self, path):
+        """Write a snapshot to `path` as JSON, replacing the previous file atomically."""
+        data = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "uptime": round(time.monotonic() - self.started, 1),
+            "metrics": self.snapshot(),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
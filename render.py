@@ -0,0 +1,127 @@
+"""Dirty-checked drawing of the timer screen.
+
+Reconfiguring a Tk label makes it recompute its size and redraw, which for
+the 500pt clock is a noticeable share of a small Pi's CPU. Renderer only
+passes options that differ from what is already shown to a widget, and
+GlyphClock draws the clock on a Canvas so a changed digit only redraws that
+digit's cell.
+"""
+
+import time
+import tkinter.font as tkfont
+import tkinter as tk
+from contextlib import contextmanager
+
+
+class Renderer:
+    """Remembers the options last given to each widget and skips repeats.
+
+    Every widget change should go through update(), otherwise the remembered
+    state no longer matches the screen. Work done inside frame() is timed,
+    including Tk's redraw, and reported to on_frame(seconds).
+    """
+
+    def __init__(self, on_frame=None, timer=time.perf_counter):
+        self.on_frame = on_frame
+        self.timer = timer
+        self._shown = {}  # widget -> {option: value}
+        self._depth = 0
+        self._changed = False
+
+    def update(self, widget, **options):
+        """Apply the options that changed; returns True if the widget was touched."""
+        shown = self._shown.setdefault(widget, {})
+        changed = {option: value for option, value in options.items() if shown.get(option) != value}
+        if not changed:
+            return False
+        widget.config(**changed)
+        shown.update(changed)
+        self._changed = True
+        return True
+
+    @contextmanager
+    def frame(self, root):
+        """Group the updates of one tick and time them with the redraw they cause."""
+        self._depth += 1
+        if self._depth == 1:
+            self._changed = False
+            started = self.timer()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._changed:
+                root.update_idletasks()  # Draw now, so the redraw is part of the timing
+                if self.on_frame is not None:
+                    self.on_frame(self.timer() - started)
+
+
+class GlyphClock:
+    """A Canvas showing a short string such as "12:34" in fixed character cells.
+
+    Character widths are measured once, each character is its own canvas
+    text item, and only the items whose character changed are reconfigured.
+    The widget never asks for a new size, so a tick does not re-layout the
+    screen. Accepts the config(text=..., fg=...) and pack calls of a Label.
+    """
+
+    def __init__(self, parent, text="", font=None, fg="white", bg="black"):
+        self.font = tkfont.Font(root=parent, font=font)
+        self.fg = fg
+        self._widths = {}  # Glyph width cache
+        self._digit_width = max(self._glyph_width(digit) for digit in "0123456789")
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0,
+                                height=self.font.metrics("linespace"), width=0)
+        self._items = []
+        self._text = ""
+        self._layout = None
+        self.config(text=text)
+
+    def _glyph_width(self, char):
+        if char not in self._widths:
+            self._widths[char] = self.font.measure(char)
+        return self._widths[char]
+
+    def _cell_width(self, char):
+        # Digits share one width so the clock does not shift as they change
+        return self._digit_width if char.isdigit() else self._glyph_width(char)
+
+    def _relayout(self, text):
+        """Create one text item per character; only needed when the pattern changes."""
+        for item in self._items:
+            self.canvas.delete(item)
+        self._items = []
+        x = 0
+        for char in text:
+            width = self._cell_width(char)
+            self._items.append(self.canvas.create_text(
+                x + width / 2, 0, text=char, anchor="n", font=self.font, fill=self.fg))
+            x += width
+        self.canvas.config(width=x)
+        self._layout = [char.isdigit() or char for char in text]
+
+    def config(self, text=None, fg=None):
+        if fg is not None and fg != self.fg:
+            self.fg = fg
+            for item in self._items:
+                self.canvas.itemconfig(item, fill=fg)
+        if text is None or text == self._text:
+            return
+        if [char.isdigit() or char for char in text] != self._layout:
+            self._relayout(text)
+        else:
+            for item, old, new in zip(self._items, self._text, text):
+                if old != new:
+                    self.canvas.itemconfig(item, text=new)
+        self._text = text
+
+    configure = config
+
+    def cget(self, option):
+        return {"text": self._text, "fg": self.fg}.get(option)
+
+    def pack(self, *args, **kwargs):
+        self.canvas.pack(*args, **kwargs)
+
+    def pack_forget(self):
+        self.canvas.pack_forget()
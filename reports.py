@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Analytics report over the logs table, computed with NumPy.
+
+Rows are read REPORT_CHUNK_ROWS at a time as integer columns (the name and
+press are turned into a small key code inside SQLite) and folded into
+fixed-size accumulators, so memory stays the same however many rows there
+are:
+
+- a histogram of durations per (press, name), in one-second bins for the
+  first FINE_BIN_SECONDS and DISTRIBUTION_BIN_SECONDS bins after that,
+  which gives the percentiles and the timers stopped before their
+  configured duration,
+- counts and time of idle gaps per press in IDLE_GAP_EDGES buckets,
+- timer and idle seconds per press and hour of the day.
+
+The result is written to a workbook with one sheet per view. Run
+`python3 reports.py [logs.db] --output logs_report.xlsx` to make one by hand.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+
+from db_schema import format_duration, format_timestamp
+
+REPORT_CHUNK_ROWS = 100000
+MAX_CYCLE_SECONDS = 24 * 3600   # Longer intervals are counted in the last histogram bin
+FINE_BIN_SECONDS = 3600         # Durations below this are binned to the second, longer ones to the minute
+DISTRIBUTION_BIN_SECONDS = 60   # Bin width of the "Cycle Times" sheet and of the coarse histogram bins
+PERCENTILES = (50, 90, 95, 99)
+EARLY_STOP_TOLERANCE = 1  # Seconds; logged durations are whole seconds
+
+# Lower edge of every histogram bin; the last one holds MAX_CYCLE_SECONDS and longer
+HISTOGRAM_EDGES = np.concatenate([np.arange(FINE_BIN_SECONDS, dtype=np.int64),
+                                  np.arange(FINE_BIN_SECONDS, MAX_CYCLE_SECONDS + 1, DISTRIBUTION_BIN_SECONDS)])
+IDLE_NAME = "Idle"
+IDLE_GAP_EDGES = (0, 60, 5 * 60, 10 * 60, 30 * 60, 3600, 4 * 3600, 8 * 3600)
+
+# Columns of the temporary key table and the chunked row query
+_KEY_TABLE_SQL = 'CREATE TEMP TABLE IF NOT EXISTS report_keys (code INTEGER PRIMARY KEY, press TEXT, name TEXT)'
+_ROWS_SQL = '''
+    SELECT k.code, l.start_ts, l.stop_ts, l.duration_s
+    FROM logs l JOIN temp.report_keys k ON k.name = l.name AND k.press IS l.press
+    WHERE l.start_ts IS NOT NULL AND l.stop_ts IS NOT NULL AND l.duration_s IS NOT NULL
+'''
+
+# === Configuration ===
+
+def configured_durations(durations, texts, stations=()):
+    """Map (press, timer text) to the timer's duration in seconds.
+
+    Rows of single-press mode have no press; station rows carry the
+    station's name, and stations default to the top-level timers.
+    """
+    configured = {(None, text): duration for text, duration in zip(texts, durations)}
+    for station_id, station in enumerate(stations):
+        press = station.get("name", f"Press {station_id + 1}")
+        station_texts = station.get("texts", texts)
+        station_durations = station.get("durations", durations)
+        configured.update({(press, text): duration for text, duration in zip(station_texts, station_durations)})
+    return configured
+
+# === Vectorized Helpers ===
+
+def local_seconds(ts):
+    """Shift epoch seconds to local wall-clock seconds (UTC offset looked up once per day)."""
+    days, inverse = np.unique(ts // 86400, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(day) * 86400 + 43200).astimezone().utcoffset().total_seconds()
+                        for day in days], dtype=np.int64)
+    return ts + offsets[inverse]
+
+def seconds_by_hour(start, stop):
+    """Seconds of the intervals [start, stop) (local seconds) in each hour of the day."""
+    stop = np.maximum(stop, start)
+    first_hour = start // 3600
+    last_hour = stop // 3600
+    seconds = np.zeros(24)
+    same = first_hour == last_hour
+    seconds += np.bincount(first_hour[same] % 24, weights=(stop - start)[same], minlength=24)
+    start, stop, first_hour, last_hour = start[~same], stop[~same], first_hour[~same], last_hour[~same]
+    if not len(start):
+        return seconds
+    # The partial first and last hours
+    seconds += np.bincount(first_hour % 24, weights=(first_hour + 1) * 3600 - start, minlength=24)
+    seconds += np.bincount(last_hour % 24, weights=stop - last_hour * 3600, minlength=24)
+    # Whole hours in between: full days cover every hour, the rest is a run of
+    # hours starting after the first, counted with a difference array
+    whole = last_hour - first_hour - 1
+    seconds += 3600 * (whole // 24).sum()
+    run_start = (first_hour + 1) % 24
+    steps = np.bincount(run_start, minlength=49) - np.bincount(run_start + whole % 24, minlength=49)
+    covered = np.cumsum(steps[:48])
+    seconds += 3600 * (covered[:24] + covered[24:])
+    return seconds
+
+def histogram_bins(durations):
+    """Index in HISTOGRAM_EDGES of the bin holding each duration (whole seconds, not negative)."""
+    durations = np.minimum(durations, MAX_CYCLE_SECONDS)
+    return np.where(durations < FINE_BIN_SECONDS, durations,
+                    FINE_BIN_SECONDS + (durations - FINE_BIN_SECONDS) // DISTRIBUTION_BIN_SECONDS)
+
+def histogram_percentile(counts, percentile):
+    """Nearest-rank percentile of the values counted in a histogram, as its bin's lower edge.
+
+    Exact to the second below FINE_BIN_SECONDS, to DISTRIBUTION_BIN_SECONDS above.
+    """
+    cumulative = np.cumsum(counts)
+    rank = max(1, int(np.ceil(percentile / 100 * cumulative[-1])))
+    return int(HISTOGRAM_EDGES[np.searchsorted(cumulative, rank)])
+
+# === Accumulation ===
+
+class ReportAccumulator:
+    """Folds chunks of (code, start_ts, stop_ts, duration_s) arrays into the report."""
+
+    def __init__(self):
+        self.keys = []          # code -> (press, name)
+        self._codes = {}        # (press, name) -> code
+        self.presses = []       # press index -> press
+        self._key_press = []    # code -> press index
+        self._histograms = []   # code -> counts of durations per HISTOGRAM_EDGES bin
+        self._totals = []       # code -> sum of durations (unclipped)
+        self._minima = []       # code -> shortest duration
+        self._maxima = []       # code -> longest duration (unclipped)
+        self.hourly = {}        # press -> (timer seconds, idle seconds) by hour of the day
+        self.idle_gaps = {}     # press -> (counts, seconds) per IDLE_GAP_EDGES bucket
+        self.rows = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def code(self, press, name):
+        """Return the code of a key, adding it the first time it is seen."""
+        key = (press, name)
+        if key not in self._codes:
+            self._codes[key] = len(self.keys)
+            self.keys.append(key)
+            if press not in self.presses:
+                self.presses.append(press)
+            self._key_press.append(self.presses.index(press))
+            self._histograms.append(np.zeros(len(HISTOGRAM_EDGES), dtype=np.int64))
+            self._totals.append(0)
+            self._minima.append(None)
+            self._maxima.append(0)
+        return self._codes[key]
+
+    def add(self, codes, start, stop, durations):
+        if not len(codes):
+            return
+        self.rows += len(codes)
+        first, last = int(start.min()), int(start.max())
+        self.first_ts = first if self.first_ts is None else min(self.first_ts, first)
+        self.last_ts = last if self.last_ts is None else max(self.last_ts, last)
+
+        durations = np.maximum(durations, 0)
+        bins = histogram_bins(durations)
+        # The number of keys is small, so looping over them keeps every row-level step in NumPy
+        for code in np.unique(codes):
+            selected = codes == code
+            self._histograms[code] += np.bincount(bins[selected], minlength=len(HISTOGRAM_EDGES))
+            self._totals[code] += int(durations[selected].sum())
+            shortest = int(durations[selected].min())
+            self._minima[code] = shortest if self._minima[code] is None else min(self._minima[code], shortest)
+            self._maxima[code] = max(self._maxima[code], int(durations[selected].max()))
+
+        is_idle = np.array([name == IDLE_NAME for press, name in self.keys], dtype=bool)[codes]
+        press_index = np.array(self._key_press, dtype=np.int64)[codes]
+        local_start = local_seconds(start)
+        local_stop = local_start + (stop - start)
+        edges = np.array(IDLE_GAP_EDGES, dtype=np.int64)
+        for index in np.unique(press_index):
+            press = self.presses[index]
+            in_press = press_index == index
+            timer_hours, idle_hours = self.hourly.setdefault(press, (np.zeros(24), np.zeros(24)))
+            timer_rows = in_press & ~is_idle
+            idle_rows = in_press & is_idle
+            timer_hours += seconds_by_hour(local_start[timer_rows], local_stop[timer_rows])
+            idle_hours += seconds_by_hour(local_start[idle_rows], local_stop[idle_rows])
+
+            gap_counts, gap_seconds = self.idle_gaps.setdefault(
+                press, (np.zeros(len(edges), dtype=np.int64), np.zeros(len(edges))))
+            gaps = durations[idle_rows]
+            buckets = np.searchsorted(edges, gaps, side="right") - 1
+            gap_counts += np.bincount(buckets, minlength=len(edges))
+            gap_seconds += np.bincount(buckets, weights=gaps, minlength=len(edges))
+
+    def summary(self, code, configured=None):
+        """Statistics of one key; early stops are counted against its configured duration.
+
+        There are no overruns to count: a countdown that runs out is logged
+        with exactly its configured duration.
+        """
+        counts = self._histograms[code]
+        count = int(counts.sum())
+        if not count:
+            return {"count": 0}
+        stats = {
+            "count": count,
+            "total": self._totals[code],
+            "mean": self._totals[code] / count,
+            "min": self._minima[code],
+            "max": self._maxima[code],
+            "percentiles": {percentile: histogram_percentile(counts, percentile) for percentile in PERCENTILES},
+            "configured": configured,
+            "stopped_early": None,
+        }
+        if configured is not None and configured < MAX_CYCLE_SECONDS:
+            # The bins that start below the limit; past FINE_BIN_SECONDS that is to the minute
+            early_bins = int(np.searchsorted(HISTOGRAM_EDGES, configured - EARLY_STOP_TOLERANCE))
+            stats["stopped_early"] = int(counts[:early_bins].sum())
+        return stats
+
+    def distribution(self, code):
+        """(from, to, count) for each non-empty DISTRIBUTION_BIN_SECONDS bin of a key."""
+        counts = self._histograms[code]
+        binned = np.concatenate([counts[:FINE_BIN_SECONDS].reshape(-1, DISTRIBUTION_BIN_SECONDS).sum(axis=1),
+                                 counts[FINE_BIN_SECONDS:-1]])
+        bins = [(int(index) * DISTRIBUTION_BIN_SECONDS, (int(index) + 1) * DISTRIBUTION_BIN_SECONDS, int(binned[index]))
+                for index in np.flatnonzero(binned)]
+        if counts[-1]:
+            bins.append((MAX_CYCLE_SECONDS, None, int(counts[-1])))
+        return bins
+
+def read_rows(conn, accumulator, chunk_rows=REPORT_CHUNK_ROWS):
+    """Feed every row of one database to the accumulator in chunks."""
+    conn.execute(_KEY_TABLE_SQL)
+    conn.execute('DELETE FROM temp.report_keys')
+    keys = conn.execute('SELECT DISTINCT press, name FROM logs').fetchall()
+    conn.executemany('INSERT INTO temp.report_keys (code, press, name) VALUES (?, ?, ?)',
+                     [(accumulator.code(press, name), press, name) for press, name in keys])
+    cursor = conn.execute(_ROWS_SQL)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        values = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 4)
+        columns = values.reshape(-1, 4)
+        accumulator.add(columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3])
+
+# === Workbook ===
+
+def _duration(seconds):
+    return "" if seconds is None else format_duration(seconds)
+
+def write_report_workbook(path, accumulator, configured):
+    from openpyxl import Workbook  # Only needed when writing the report
+
+    workbook = Workbook(write_only=True)
+    order = sorted(range(len(accumulator.keys)), key=lambda code: (str(accumulator.keys[code][0] or ""),
+                                                                     accumulator.keys[code][1] or ""))
+
+    sheet = workbook.create_sheet("Summary")
+    sheet.append(["Rows", accumulator.rows, "From", format_timestamp(accumulator.first_ts),
+                  "To", format_timestamp(accumulator.last_ts)])
+    sheet.append([])
+    sheet.append(["Press", "Name", "Count", "Total", "Mean", "Min"]
+                 + [f"P{percentile}" for percentile in PERCENTILES]
+                 + ["Max", "Configured", "Stopped Early"])
+    for code in order:
+        press, name = accumulator.keys[code]
+        stats = accumulator.summary(code, configured.get((press, name)))
+        if not stats["count"]:
+            continue
+        sheet.append([press or "", name, stats["count"], format_duration(stats["total"]),
+                      format_duration(stats["mean"]), format_duration(stats["min"])]
+                     + [format_duration(stats["percentiles"][percentile]) for percentile in PERCENTILES]
+                     + [format_duration(stats["max"]), _duration(stats["configured"]),
+                        "" if stats["stopped_early"] is None else stats["stopped_early"]])
+
+    sheet = workbook.create_sheet("Cycle Times")
+    sheet.append(["Press", "Name", "From", "To", "Count"])
+    for code in order:
+        press, name = accumulator.keys[code]
+        for start, end, count in accumulator.distribution(code):
+            sheet.append([press or "", name, format_duration(start), _duration(end), count])
+
+    sheet = workbook.create_sheet("Idle Gaps")
+    sheet.append(["Press", "From", "To", "Count", "Total"])
+    for press in accumulator.presses:
+        if press not in accumulator.idle_gaps:
+            continue
+        counts, seconds = accumulator.idle_gaps[press]
+        for index, start in enumerate(IDLE_GAP_EDGES):
+            end = IDLE_GAP_EDGES[index + 1] if index + 1 < len(IDLE_GAP_EDGES) else None
+            sheet.append([press or "", format_duration(start), _duration(end), int(counts[index]),
+                          format_duration(seconds[index])])
+
+    sheet = workbook.create_sheet("Utilization")
+    sheet.append(["Press", "Hour", "Timer Time", "Idle Time", "Utilization %"])
+    for press in accumulator.presses:
+        if press not in accumulator.hourly:
+            continue
+        timer_hours, idle_hours = accumulator.hourly[press]
+        for hour in range(24):
+            logged = timer_hours[hour] + idle_hours[hour]
+            sheet.append([press or "", f"{hour:02d}:00", format_duration(timer_hours[hour]),
+                          format_duration(idle_hours[hour]),
+                          round(100 * timer_hours[hour] / logged, 1) if logged else ""])
+
+    tmp_path = path + ".tmp"
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)  # Never leave a half-written workbook behind
+
+def write_report(db_path, xlsx_path, configured=None, archive_paths=(), chunk_rows=REPORT_CHUNK_ROWS):
+    """Analyse every row of db_path (and the archives in archive_paths) into a workbook.
+
+    configured maps (press, timer text) to seconds, see configured_durations().
+    Returns the number of rows analysed.
+    """
+    accumulator = ReportAccumulator()
+    for path in list(archive_paths) + [db_path]:
+        conn = sqlite3.connect(path)
+        try:
+            read_rows(conn, accumulator, chunk_rows)
+        finally:
+            conn.close()
+    write_report_workbook(xlsx_path, accumulator, configured or {})
+    return accumulator.rows
+
+def main():
+    import retention
+
+    parser = argparse.ArgumentParser(description="Write an analytics report of the timer logs.")
+    parser.add_argument("db", nargs="?", default="logs.db", help="Path to logs.db")
+    parser.add_argument("--output", default="logs_report.xlsx", help="Workbook to write")
+    parser.add_argument("--settings", default="settings.json", help="Timer durations to count early stops against")
+    parser.add_argument("--archive-dir", default="archive", help="Include the monthly archives kept here")
+    args = parser.parse_args()
+    configured = {}
+    if os.path.exists(args.settings):
+        with open(args.settings, "r") as file:
+            settings = json.load(file)
+        configured = configured_durations(settings.get("durations", []), settings.get("texts", []),
+                                          settings.get("stations", []))
+    rows = write_report(args.db, args.output, configured,
+                        archive_paths=retention.archive_paths(args.archive_dir, newest_first=False))
+    print(f"Analysed {rows} rows into {args.output}.")
+
+if __name__ == '__main__':
+    main()
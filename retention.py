@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Retention for logs.db: old rows move to monthly archive databases.
+
+Rows that started before the retention cutoff are copied to
+<archive_dir>/logs_YYYY-MM.db and then deleted from logs.db, in short
+batches so the log writer is never blocked for long. Only whole months
+are archived, so a month is never split between logs.db and its archive.
+Archives keep the row ids, which lets the log view page into them, and
+the rollup tables are left alone so the summaries still cover archived
+months. The freed pages are returned to the file system with incremental
+vacuum steps.
+
+Run `python3 retention.py --days 90 [logs.db]` to archive by hand.
+"""
+
+import argparse
+import glob
+import os
+import pathlib
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import db_schema
+
+ARCHIVE_BATCH_ROWS = 1000    # Rows moved per transaction
+VACUUM_PAGES_PER_STEP = 100  # Pages freed per incremental vacuum step
+VACUUM_STEP_SLEEP = 0.05     # Seconds between steps, so the app can keep writing
+
+# Columns copied to the archives; after the id they follow log_writer.INSERT_LOG_SQL
+_LOG_COLUMNS = "id, name, start_time, stop_time, duration, start_ts, stop_ts, duration_s, press"
+
+_ARCHIVE_NAME_RE = re.compile(r"^logs_(\d{4}-\d{2})\.db$")
+
+# === Archive Files ===
+
+def archive_path(archive_dir, month):
+    """Return the archive file for a "YYYY-MM" month."""
+    return os.path.join(archive_dir, f"logs_{month}.db")
+
+def archive_paths(archive_dir, newest_first=True):
+    """Return the archive files in archive_dir, ordered by month."""
+    paths = [path for path in glob.glob(os.path.join(archive_dir, "logs_*.db"))
+             if _ARCHIVE_NAME_RE.match(os.path.basename(path))]
+    return sorted(paths, reverse=newest_first)
+
+def archive_month(path):
+    """Return the "YYYY-MM" month an archive file holds."""
+    return _ARCHIVE_NAME_RE.match(os.path.basename(path)).group(1)
+
+def read_only_uri(path):
+    """SQLite URI that opens (or attaches) a database file read-only."""
+    return pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+
+def fetch_archived_rows(conn, archive_dir, before_id, limit):
+    """Fetch up to `limit` archived (id, name, start_ts, stop_ts, duration_s, press)
+    rows with ids below before_id (None for the newest), newest first.
+
+    Each archive is attached read-only to conn, which must have been opened
+    with uri=True, and detached again before the next one.
+    """
+    rows = []
+    if before_id is None:
+        before_id = float("inf")
+    for path in archive_paths(archive_dir):
+        conn.execute("ATTACH DATABASE ? AS archive", (read_only_uri(path),))
+        try:
+            rows += conn.execute('''
+                SELECT id, name, start_ts, stop_ts, duration_s, press FROM archive.logs
+                WHERE id < ? ORDER BY id DESC LIMIT ?
+            ''', (before_id, limit - len(rows))).fetchall()
+        finally:
+            conn.execute("DETACH DATABASE archive")
+        if len(rows) >= limit:
+            break
+        if rows:
+            before_id = rows[-1][0]
+    return rows
+
+def set_aside_archives(archive_dir, now=None):
+    """Move every archive into a cleared_YYYYmmdd-HHMMSS folder, out of the log view.
+
+    Used when the logs are cleared; the files are kept rather than deleted.
+    Returns the folder, or None if there were no archives.
+    """
+    paths = archive_paths(archive_dir)
+    if not paths:
+        return None
+    folder = os.path.join(archive_dir, (now or datetime.now()).strftime("cleared_%Y%m%d-%H%M%S"))
+    os.makedirs(folder, exist_ok=True)
+    for path in paths:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.replace(path + suffix, os.path.join(folder, os.path.basename(path) + suffix))
+    return folder
+
+# === Archiving ===
+
+def retention_cutoff(retention_days, now=None):
+    """Epoch start of the month that holds the day retention_days before now.
+
+    Rows starting before it are archived, which always leaves whole months.
+    """
+    now = now or datetime.now()
+    return month_start(now - timedelta(days=retention_days))
+
+def month_start(moment):
+    """Epoch start of the local month holding a datetime."""
+    return int(moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+def archive_old_rows(db_path, archive_dir, cutoff_ts, max_id=None, batch_rows=ARCHIVE_BATCH_ROWS):
+    """Move rows that started before cutoff_ts into the monthly archives.
+
+    With max_id only rows up to that id are moved (e.g. the export
+    high-water mark, so nothing is archived before it was exported), and
+    the cutoff moves back so the month of the first later row stays whole.
+    Rows are committed to their archive before they are deleted, and the
+    archive insert ignores ids it already has, so an interrupted run is
+    simply finished by the next one. Returns the number of rows moved.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    archives = {}
+    moved = 0
+    try:
+        query = f'SELECT {_LOG_COLUMNS} FROM logs WHERE start_ts < ?'
+        extra = []
+        if max_id is not None:
+            first_kept = conn.execute('SELECT MIN(start_ts) FROM logs WHERE id > ?', (max_id,)).fetchone()[0]
+            if first_kept is not None:
+                cutoff_ts = min(cutoff_ts, month_start(datetime.fromtimestamp(first_kept)))
+            query += ' AND id <= ?'
+            extra.append(max_id)
+        query += ' ORDER BY id LIMIT ?'
+        params = [cutoff_ts] + extra
+        while True:
+            rows = conn.execute(query, params + [batch_rows]).fetchall()
+            if not rows:
+                break
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(datetime.fromtimestamp(row[5]).strftime("%Y-%m"), []).append(row)
+            for month, month_rows in by_month.items():
+                archive = archives.get(month)
+                if archive is None:
+                    path = archive_path(archive_dir, month)
+                    db_schema.init_db(path)
+                    archive = archives[month] = sqlite3.connect(path)
+                with archive:
+                    archive.executemany(f'''
+                        INSERT OR IGNORE INTO logs ({_LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', month_rows)
+            with conn:
+                conn.executemany('DELETE FROM logs WHERE id = ?', [(row[0],) for row in rows])
+            moved += len(rows)
+    finally:
+        for archive in archives.values():
+            archive.close()
+        conn.close()
+    return moved
+
+def incremental_vacuum(db_path, pages_per_step=VACUUM_PAGES_PER_STEP, step_sleep=VACUUM_STEP_SLEEP):
+    """Return free pages to the file system in small steps; returns pages freed.
+
+    Needs auto_vacuum=INCREMENTAL (see enable_incremental_vacuum).
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    freed = 0
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:  # 2 = INCREMENTAL
+            return 0
+        while True:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free_pages:
+                break
+            conn.execute(f"PRAGMA incremental_vacuum({min(free_pages, pages_per_step)})").fetchall()
+            freed += min(free_pages, pages_per_step)
+            time.sleep(step_sleep)
+    finally:
+        conn.close()
+    return freed
+
+def enable_incremental_vacuum(db_path):
+    """Switch a logs.db created before schema v4 to auto_vacuum=INCREMENTAL; returns whether it did.
+
+    The VACUUM this takes rewrites the whole file and holds the database
+    locked meanwhile (the log writer retries until it is done), so it only
+    runs from the retention job, and only with room for a second copy of
+    the file. Once done, PRAGMA auto_vacuum records it.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:  # 2 = INCREMENTAL
+            return False
+        size = os.path.getsize(db_path)
+        free = shutil.disk_usage(os.path.dirname(os.path.abspath(db_path))).free
+        if free < 2 * size:
+            print(f"Not enough free space to vacuum {db_path} ({size} bytes, {free} free)")
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+def apply_retention(db_path, archive_dir, retention_days, max_id=None):
+    """Archive rows older than retention_days, then vacuum; returns (rows moved, pages freed)."""
+    moved = archive_old_rows(db_path, archive_dir, retention_cutoff(retention_days), max_id)
+    if enable_incremental_vacuum(db_path):
+        print(f"Switched {db_path} to incremental vacuum.")
+    return moved, incremental_vacuum(db_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old logs.db rows into monthly archives.")
+    parser.add_argument("db", nargs="?", default="logs.db", help="Path to logs.db")
+    parser.add_argument("--days", type=int, required=True, help="Keep rows newer than this many days")
+    parser.add_argument("--archive-dir", default="archive", help="Where the monthly archives are kept")
+    args = parser.parse_args()
+    db_schema.init_db(args.db)
+    moved, freed = apply_retention(args.db, args.archive_dir, args.days)
+    print(f"Archived {moved} rows, freed {freed} pages.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""Validated settings.json with atomic writes, a backup copy and hot reload.
+
+SettingsStore keeps the checked settings in memory. update() validates
+changes before anything is written; the file is written to a temporary
+file, fsync'd and renamed over settings.json, and the same is done for
+settings.json.bak, so a power cut never leaves a half-written file. A file
+that fails to parse or validate falls back to the .bak copy instead of
+being replaced by defaults. poll() notices edits made by other programs
+(e.g. settings pushed to a fleet) from the file's mtime and size. A
+read_only store (timing_daemon.py's) never writes either file; the
+application that owns them does.
+"""
+
+import copy
+import json
+import os
+
+import log_export
+
+
+class SettingsError(ValueError):
+    """A settings value has the wrong type or is out of range."""
+
+
+# === Validators ===
+
+def _integer(minimum=None, maximum=None):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+            raise SettingsError(f"expected a whole number, got {value!r}")
+        value = int(value)
+        if minimum is not None and value < minimum:
+            raise SettingsError(f"{value} is below {minimum}")
+        if maximum is not None and value > maximum:
+            raise SettingsError(f"{value} is above {maximum}")
+        return value
+    return check
+
+def _text(value):
+    if not isinstance(value, str):
+        raise SettingsError(f"expected text, got {value!r}")
+    return value
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise SettingsError(f"expected true or false, got {value!r}")
+    return value
+
+def _choice(*choices):
+    def check(value):
+        if value not in choices:
+            raise SettingsError(f"expected one of {', '.join(choices)}, got {value!r}")
+        return value
+    return check
+
+def _list_of(check_item, allow_empty=False):
+    def check(value):
+        if not isinstance(value, list) or (not value and not allow_empty):
+            raise SettingsError(f"expected a list, got {value!r}")
+        return [check_item(item) for item in value]
+    return check
+
+def _record(required, optional=None):
+    """A JSON object with required and optional keys; other keys are kept as they are."""
+    optional = optional or {}
+    def check(value):
+        if not isinstance(value, dict):
+            raise SettingsError(f"expected an object, got {value!r}")
+        checked = dict(value)
+        for key, check_value in list(required.items()) + list(optional.items()):
+            if key in value:
+                checked[key] = check_value(value[key])
+            elif key in required:
+                raise SettingsError(f"missing {key!r}")
+        return checked
+    return check
+
+_hour = _integer(0, 23)
+
+FIELDS = {
+    "durations": _list_of(_integer(0)),
+    "texts": _list_of(_text),
+    "idle_yellow_duration": _integer(0),
+    "idle_red_duration": _integer(0),
+    "shifts": _list_of(_record({"name": _text, "start": _hour, "end": _hour}), allow_empty=True),
+    "export_interval_hours": _integer(0),
+    "export_interval_minutes": _integer(0, 59),
+    "export_format": _choice(*log_export.EXPORT_FORMATS),
+    "export_partition": _choice(*log_export.EXPORT_PARTITIONS),
+    "retention_days": _integer(0),
+    "archive_dir": _text,
+    "status_api": _record({}, {"enabled": _flag, "host": _text, "port": _integer(0, 65535)}),
+    "fleet_sync": _record({}, {"enabled": _flag, "url": _text, "device_id": _text, "interval_minutes": _integer(1)}),
+    "stations": _list_of(_record({"pins": _list_of(_integer(0))}, {
+        "name": _text,
+        "durations": _list_of(_integer(0)),
+        "texts": _list_of(_text),
+        "idle_yellow_duration": _integer(0),
+        "idle_red_duration": _integer(0),
+    }), allow_empty=True),
+}
+
+def validate(values, timer_count=None):
+    """Return a checked copy of values; raises SettingsError naming the bad key.
+
+    With timer_count the top-level durations must have exactly that many
+    entries, one per button the screens were built for.
+    """
+    checked = {}
+    for key, value in values.items():
+        try:
+            checked[key] = FIELDS[key](value) if key in FIELDS else copy.deepcopy(value)
+        except SettingsError as e:
+            raise SettingsError(f"{key}: {e}")
+    if len(checked.get("texts", [])) != len(checked.get("durations", [])):
+        raise SettingsError("texts: need one text per duration")
+    try:
+        log_export.check_export_layout(checked.get("export_format", "csv"), checked.get("export_partition", "month"))
+    except ValueError as e:
+        raise SettingsError(f"export_partition: {e}")
+    if timer_count is not None and "durations" in checked and len(checked["durations"]) != timer_count:
+        raise SettingsError(f"durations: need {timer_count} timers, one per button, got {len(checked['durations'])}")
+    return checked
+
+# === Store ===
+
+def write_atomic(path, data):
+    """Write JSON to path via a fsync'd temporary file and a rename."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    try:
+        # Make the rename itself durable
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class SettingsStore:
+    """The application's settings, checked, cached and kept in sync with the file.
+
+    Subscribers are called as callback(values, changed_keys) after every
+    load, update or reload that changed something.
+    """
+
+    def __init__(self, path, defaults, read_only=False, timer_count=None):
+        self.path = path
+        self.backup_path = path + ".bak"
+        self.read_only = read_only
+        self.timer_count = timer_count
+        self.values = validate(defaults, timer_count)
+        self._subscribers = []
+        self._file_state = None  # (mtime_ns, size) of the file as last read or written
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def get(self, key):
+        return copy.deepcopy(self.values[key])
+
+    def snapshot(self):
+        return copy.deepcopy(self.values)
+
+    def load(self):
+        """Read the file (or its backup); creates it from the defaults if missing."""
+        try:
+            values = self._read(self.path)
+        except FileNotFoundError:
+            if not self.read_only:
+                self.save()
+            self._notify(set(self.values))
+            return
+        except (ValueError, OSError) as e:  # json.JSONDecodeError and SettingsError are ValueErrors
+            print(f"{self.path} is unusable ({e}); trying {self.backup_path}")
+            try:
+                values = self._read(self.backup_path)
+            except (ValueError, OSError) as e:
+                print(f"{self.backup_path} is unusable too ({e}); using the defaults")
+                values = self.values
+            self._apply(values)
+            if not self.read_only:
+                try:
+                    os.replace(self.path, self.path + ".corrupt")  # Keep it for inspection
+                except OSError:
+                    pass
+                self.save()
+            self._notify(set(self.values))
+            return
+        self._apply(values)
+        self._remember_file_state()
+        if not self.read_only and not os.path.exists(self.backup_path):
+            write_atomic(self.backup_path, self.values)
+        self._notify(set(self.values))
+
+    def update(self, **changes):
+        """Validate and apply changes, then save; returns the keys that changed."""
+        values = validate({**self.values, **changes}, self.timer_count)
+        changed = self._apply(values)
+        if changed:
+            self.save()
+            self._notify(changed)
+        return changed
+
+    def save(self):
+        if self.read_only:
+            raise SettingsError(f"{self.path} is read-only here")
+        write_atomic(self.path, self.values)
+        write_atomic(self.backup_path, self.values)
+        self._remember_file_state()
+
+    def poll(self):
+        """Reload the file if another program changed it; returns the keys that changed."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return set()
+        if (stat.st_mtime_ns, stat.st_size) == self._file_state:
+            return set()
+        self._file_state = (stat.st_mtime_ns, stat.st_size)
+        try:
+            values = self._read(self.path)
+        except (ValueError, OSError) as e:
+            # Possibly caught mid-copy; the next change of mtime retries
+            print(f"Ignoring edited {self.path}: {e}")
+            return set()
+        changed = self._apply(values)
+        if changed:
+            if not self.read_only:
+                write_atomic(self.backup_path, self.values)
+            self._notify(changed)
+        return changed
+
+    def _read(self, path):
+        with open(path, "r") as file:
+            data = json.load(file)
+        if not isinstance(data, dict):
+            raise SettingsError("expected a JSON object")
+        # Keys missing from the file keep their current values
+        return validate({**self.values, **data}, self.timer_count)
+
+    def _apply(self, values):
+        changed = {key for key in set(values) | set(self.values) if values.get(key) != self.values.get(key)}
+        self.values = values
+        return changed
+
+    def _remember_file_state(self):
+        stat = os.stat(self.path)
+        self._file_state = (stat.st_mtime_ns, stat.st_size)
+
+    def _notify(self, changed):
+        for callback in self._subscribers:
+            callback(self.snapshot(), changed)
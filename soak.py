@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Long-run soak test of the kiosk process on a simulated clock.
+
+    python3 soak.py                              # two simulated weeks
+    python3 soak.py --days 28 --output soak.json
+
+The application is started headless the way main.py starts it (journal,
+log writer, background jobs, scheduled exports, retention and settings
+polling included) and is fed random presses and regular visits to the log
+screen, on a VirtualClock so weeks pass in minutes. Every --sample-hours it
+records the process RSS, the memory traced by tracemalloc, the pending
+root.after callbacks, the rows held by the log view, open file descriptors
+and threads. After the warm-up every one of them must stay within its
+bound, or the run fails with exit status 1.
+
+A tracemalloc snapshot costs more memory than the traces it copies (about
+25 MB here), and the allocator keeps most of it, so the only snapshot
+taken during the run is the baseline, just before the first sample after
+the warm-up. The top allocating lines are listed from a final snapshot
+after the last sample.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import tracemalloc
+
+import main
+from headless import VirtualClock
+
+# Presses are drained twice a simulated second rather than every 10 ms,
+# which would otherwise be 8.6 million callbacks per simulated day
+SOAK_INPUT_POLL_MS = 500
+
+MB = 1024 * 1024
+
+# RSS growth allowed after the warm-up. Measured at about 0.2 MB per
+# simulated day with the defaults (the log view filling up to its cap,
+# the interval statistics), 2.4 MB over two weeks.
+MAX_RSS_GROWTH_MB = 20
+
+# === Simulated Use ===
+
+class RandomPresses:
+    """Presses random buttons at random gaps, keeping only the next press scheduled.
+
+    Started like the input backends, with start(root, push).
+    """
+
+    def __init__(self, keys, min_gap, max_gap, seed):
+        self.keys = list(keys)
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.rng = random.Random(seed)
+        self.presses = 0
+        self.root = None
+        self.push = None
+        self._after_id = None
+
+    def start(self, root, push):
+        self.root = root
+        self.push = push
+        self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule(self):
+        gap = self.rng.uniform(self.min_gap, self.max_gap)
+        self._after_id = self.root.after(int(gap * 1000), self._press)
+
+    def _press(self):
+        self.push(self.rng.choice(self.keys))
+        self.presses += 1
+        self._schedule()
+
+
+def visit_log_screen(every_ms, stay_ms, pages):
+    """Open the log screen every every_ms, scroll down `pages` pages and go back after stay_ms."""
+    def leave():
+        main.show_main_screen()
+        main.root.after(every_ms, visit)
+    def visit():
+        if main.current_screen != "idle":
+            main.root.after(every_ms, visit)
+            return
+        main.show_log_page()
+        for _ in range(pages):
+            main.load_older_log_rows()
+        main.root.after(stay_ms, leave)
+    main.root.after(every_ms, visit)
+
+# === Sampling ===
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux), or None."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+def top_allocators(snapshot, count, baseline=None):
+    """The lines holding the most traced memory, or that grew most since baseline."""
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline, "lineno")
+        return [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size_diff / 1024:+.1f} KiB "
+                f"({stat.count_diff:+d} blocks)" for stat in stats[:count]]
+    return [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size / 1024:.1f} KiB "
+            f"({stat.count} blocks)" for stat in snapshot.statistics("lineno")[:count]]
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+
+def take_sample(hours):
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    rss = current_rss()
+    return {
+        "hours": round(hours, 2),
+        "rss_mb": rss / MB if rss is not None else None,
+        "traced_mb": traced / MB,
+        "after_callbacks": main.root.pending_callbacks(),
+        "log_view_rows": len(main.log_tree.get_children()),
+        "open_fds": open_fds(),
+        "threads": threading.active_count(),
+        "rows_logged": main.logged_intervals.rows_written,
+    }
+
+def check_bounds(samples, args):
+    """Compare the samples after the warm-up with the bounds; returns the failures."""
+    settled = [sample for sample in samples if sample["hours"] >= args.warmup_hours]
+    if len(settled) < 2:
+        return [f"need two samples after the {args.warmup_hours} h warm-up; run longer or sample more often"]
+    first, last = settled[0], settled[-1]
+    failures = []
+    if first["rss_mb"] is not None and last["rss_mb"] - first["rss_mb"] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {last['rss_mb'] - first['rss_mb']:.1f} MB (bound {args.max_rss_growth_mb} MB)")
+    if last["traced_mb"] - first["traced_mb"] > args.max_traced_growth_mb:
+        failures.append(f"traced memory grew {last['traced_mb'] - first['traced_mb']:.1f} MB "
+                        f"(bound {args.max_traced_growth_mb} MB)")
+    most_callbacks = max(sample["after_callbacks"] for sample in settled)
+    if most_callbacks > args.max_callbacks:
+        failures.append(f"{most_callbacks} root.after callbacks pending (bound {args.max_callbacks})")
+    most_rows = max(sample["log_view_rows"] for sample in settled)
+    if most_rows > args.max_log_view_rows:
+        failures.append(f"the log view held {most_rows} rows (bound {args.max_log_view_rows})")
+    if first["open_fds"] is not None and last["open_fds"] - first["open_fds"] > args.max_fd_growth:
+        failures.append(f"open file descriptors grew from {first['open_fds']} to {last['open_fds']}")
+    return failures
+
+# === Soak Run ===
+
+def prepare_workdir(workdir):
+    """Point the application's files at a fresh workdir, starting from the real settings."""
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    settings_copy = os.path.join(workdir, "settings.json")
+    if os.path.exists(main.SETTINGS_FILE):
+        shutil.copyfile(main.SETTINGS_FILE, settings_copy)
+    main.SETTINGS_FILE = settings_copy
+    main.LOGS_DB = os.path.join(workdir, "logs.db")
+    main.JOURNAL_FILE = os.path.join(workdir, "journal.log")
+    main.EXPORT_DIR = os.path.join(workdir, "exports")
+    main.FULL_EXPORT_FILE = os.path.join(workdir, "logs.xlsx")
+    main.REPORT_FILE = os.path.join(workdir, "logs_report.xlsx")
+    main.METRICS_FILE = os.path.join(workdir, "metrics.json")
+    main.SYNC_STATE_FILE = os.path.join(workdir, "sync_state.json")
+    main.STREAM_STATS_FILE = os.path.join(workdir, "stream_stats.json")
+
+def run_soak(args):
+    prepare_workdir(args.workdir)
+    main.clock = VirtualClock()
+    main.INPUT_POLL_MS = SOAK_INPUT_POLL_MS
+    main.headless_mode = True
+    tracemalloc.start()
+    samples = []
+    baseline = None
+    # The application prints every press; a StringIO would itself grow for the whole run
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        main.load_settings()
+        main.FLEET_SYNC = dict(main.FLEET_SYNC, enabled=False)  # No collector to talk to
+        main.init_db()
+        main.load_interval_stats()
+        main.start_log_writer()
+        resume = main.recover_intervals(main.start_journal())
+        main.initialize_headless()
+        main.start_job_runner()
+        main.start_input_queue()
+        presses = RandomPresses(main.input_keys(), args.min_gap, args.max_gap, args.seed)
+        main.input_backend = presses
+        main.setup_stations(resume)
+        main.start_input_backend()
+        main.show_main_screen()
+        main.metrics_after_id = main.root.after(main.METRICS_WRITE_INTERVAL_MS, main.schedule_metrics_file)
+        main.retention_after_id = main.root.after(main.RETENTION_CHECK_MINUTES * 60 * 1000,
+                                                  main.schedule_retention)
+        main.settings_after_id = main.root.after(main.SETTINGS_POLL_MS, main.poll_settings)
+        main.journal_after_id = main.root.after(main.JOURNAL_HEARTBEAT_MS, main.journal_heartbeat)
+        main.interval_stats_after_id = main.root.after(main.STREAM_STATS_SAVE_MS, main.schedule_interval_stats)
+        visit_log_screen(int(args.visit_minutes * 60 * 1000), 60 * 1000, args.scroll_pages)
+
+        end = args.days * 86400
+        at = 0.0
+        while True:
+            main.root.run_until(at)
+            if baseline is None and at / 3600 >= args.warmup_hours:
+                baseline = take_snapshot()  # Before the sample, so its memory is in every settled one
+            sample = take_sample(at / 3600)
+            samples.append(sample)
+            print(f"{sample['hours']:8.1f} h  rss {sample['rss_mb'] or 0:7.1f} MB  "
+                  f"traced {sample['traced_mb']:6.2f} MB  after {sample['after_callbacks']:3}  "
+                  f"log view {sample['log_view_rows']:5}  fds {sample['open_fds']}  "
+                  f"rows {sample['rows_logged']}", file=sys.stderr)
+            if at >= end:
+                break
+            at = min(end, at + args.sample_hours * 3600)
+        final = take_snapshot()
+        top = top_allocators(final, args.top)
+        growth = top_allocators(final, args.top, baseline) if baseline is not None else []
+        del final, baseline
+        main.shutdown_app()
+    tracemalloc.stop()
+    return {
+        "days": args.days,
+        "presses": presses.presses,
+        "rows_logged": main.logged_intervals.rows_written,
+        "samples": samples,
+        "top_allocators": top,
+        "growth_since_warmup": growth,
+        "failures": check_bounds(samples, args),
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Soak the foam timer on a simulated clock and check its memory.")
+    parser.add_argument("--days", type=float, default=14, help="Simulated days to run")
+    parser.add_argument("--sample-hours", type=float, default=24, help="Simulated hours between samples")
+    parser.add_argument("--warmup-hours", type=float, default=24, help="Growth is measured from the first "
+                                                                       "sample after this many hours")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-gap", type=float, default=30, help="Shortest time between presses, in seconds")
+    parser.add_argument("--max-gap", type=float, default=1200, help="Longest time between presses, in seconds")
+    parser.add_argument("--visit-minutes", type=float, default=60, help="How often the log screen is opened")
+    parser.add_argument("--scroll-pages", type=int, default=2, help="Older pages loaded on each visit")
+    parser.add_argument("--top", type=int, default=5, help="Allocating lines listed at the end")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=MAX_RSS_GROWTH_MB)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=5)
+    parser.add_argument("--max-callbacks", type=int, default=40, help="Pending root.after callbacks")
+    parser.add_argument("--max-log-view-rows", type=int, help="Default: the view's cap plus the pages "
+                                                                 "scrolled in on one visit")
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument("--workdir", default="soak_data", help="Where the soak run's files are kept")
+    parser.add_argument("--output", help="Write the samples and results to this JSON file")
+    args = parser.parse_args()
+    if args.max_log_view_rows is None:
+        args.max_log_view_rows = main.LOG_MAX_SHOWN_ROWS + args.scroll_pages * main.LOG_PREFETCH_ROWS
+
+    result = run_soak(args)
+    if result["top_allocators"]:
+        print("Most memory held at the end:", file=sys.stderr)
+        for line in result["top_allocators"]:
+            print(f"  {line}", file=sys.stderr)
+    if result["growth_since_warmup"]:
+        print("Largest growth since the warm-up:", file=sys.stderr)
+        for line in result["growth_since_warmup"]:
+            print(f"  {line}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"arguments": vars(args), "results": result}, file, indent=2)
+    if result["failures"]:
+        for failure in result["failures"]:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+    print(f"OK: {result['days']} simulated days, {result['presses']} presses, "
+          f"{result['rows_logged']} rows logged, every bound held", file=sys.stderr)
+
+if __name__ == "__main__":
+    main_cli()
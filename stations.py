@@ -0,0 +1,232 @@
+"""Station mode: several presses, each with its own timers, on one Pi."""
+
+import heapq
+import math
+import time
+from datetime import datetime, timedelta
+
+from timer_engine import (TICK_TOLERANCE, JitterRecorder, elapsed_seconds,
+                          next_tick_boundary, remaining_seconds, resumed_seconds)
+
+
+class Station:
+    """One press: its timer buttons, the running countdown and idle tracking.
+
+    A station does no scheduling of its own. The StationScheduler calls
+    tick(now) when the station asked to be woken; tick() handles expiry,
+    redraws via on_change and returns the next time it needs a tick.
+    """
+
+    def __init__(self, station_id, name, durations, texts, pins,
+                 idle_yellow_duration, idle_red_duration):
+        self.station_id = station_id
+        self.name = name
+        self.durations = list(durations)
+        self.texts = list(texts)
+        self.pins = list(pins)
+        self.idle_yellow_duration = idle_yellow_duration
+        self.idle_red_duration = idle_red_duration
+
+        self.on_log = None     # on_log(station, name, start_time, stop_time)
+        self.on_change = None  # on_change(station, now) redraws the station
+
+        self.active_timer = None
+        self.active_text = None  # The running timer's text, kept if the texts are reloaded meanwhile
+        self.origin = None       # Monotonic start of the running timer
+        self.deadline = None
+        self.start_time = None   # Wall-clock start of the running timer
+        self.idle_running = False
+        self.idle_origin = None
+        self.idle_start_time = None
+
+    @classmethod
+    def from_config(cls, station_id, config, durations, texts, idle_yellow_duration, idle_red_duration):
+        """A station from a "stations" entry of settings.json, with the top-level settings as defaults."""
+        return cls(
+            station_id,
+            config.get("name", f"Press {station_id + 1}"),
+            config.get("durations", durations),
+            config.get("texts", texts),
+            config.get("pins", []),
+            config.get("idle_yellow_duration", idle_yellow_duration),
+            config.get("idle_red_duration", idle_red_duration),
+        )
+
+    @property
+    def running(self):
+        return self.active_timer is not None
+
+    def press(self, button_index, now):
+        """Toggle the timer on button_index (0-based)."""
+        if self.running and self.active_timer == button_index:
+            self.stop_timer(now)  # Even if a settings reload removed that timer since it started
+            return
+        if not 0 <= button_index < len(self.durations):
+            print(f"{self.name}: invalid button index {button_index + 1}")
+            return
+        if not self.running:
+            self.start_timer(button_index, now)
+
+    def start_timer(self, button_index, now, start_time=None):
+        """Start a countdown; a past start_time resumes one that began then."""
+        if self.idle_running:
+            self.stop_idle(now)
+        self.active_timer = button_index
+        self.active_text = self.texts[button_index]
+        self.origin = now - resumed_seconds(start_time)
+        self.deadline = self.origin + self.durations[button_index]
+        self.start_time = start_time or datetime.now()
+
+    def stop_timer(self, now, go_idle=True):
+        if self.running:
+            duration = min(now - self.origin, self.deadline - self.origin)
+            stop_time = self.start_time + timedelta(seconds=duration)
+            self._log(self.active_text, self.start_time, stop_time)
+            self.active_timer = self.active_text = None
+            self.origin = self.deadline = self.start_time = None
+            if go_idle:
+                self.start_idle(now)
+
+    def start_idle(self, now, start_time=None):
+        if not self.idle_running:
+            self.idle_running = True
+            self.idle_origin = now - resumed_seconds(start_time)
+            self.idle_start_time = start_time or datetime.now()
+
+    def stop_idle(self, now):
+        if self.idle_running:
+            stop_time = self.idle_start_time + timedelta(seconds=now - self.idle_origin)
+            self._log("Idle", self.idle_start_time, stop_time)
+            self.idle_running = False
+            self.idle_origin = self.idle_start_time = None
+
+    def shutdown(self, now):
+        """Log whatever interval is open, e.g. when the application quits."""
+        self.stop_timer(now, go_idle=False)
+        self.stop_idle(now)
+
+    def tick(self, now):
+        """Advance the station to `now`; returns when it next needs a tick."""
+        if self.running and remaining_seconds(self.deadline, now) == 0:
+            self.stop_timer(now)
+        if self.on_change is not None:
+            self.on_change(self, now)
+        if self.running:
+            return next_tick_boundary(self.origin, now, self.deadline)
+        if self.idle_running:
+            return next_tick_boundary(self.idle_origin, now)
+        return None
+
+    def open_interval(self):
+        """The running countdown or idle period as a journal entry, or None."""
+        if self.running:
+            return {"station": self.station_id, "press": self.name, "state": "running",
+                    "name": self.active_text, "timer": self.active_timer,
+                    "start_ts": self.start_time.timestamp(), "duration": self.deadline - self.origin}
+        if self.idle_running:
+            return {"station": self.station_id, "press": self.name, "state": "idle",
+                    "name": "Idle", "start_ts": self.idle_start_time.timestamp()}
+        return None
+
+    def display(self, now):
+        """Return what the station's tile should show at `now`."""
+        if self.running:
+            minutes, seconds = divmod(remaining_seconds(self.deadline, now), 60)
+            return {
+                "clock": f"{minutes:02}:{seconds:02}",
+                "text": self.active_text,
+                "idle": "",
+                "idle_color": "green",
+                "name": self.active_text,
+                "elapsed": elapsed_seconds(self.origin, now),
+            }
+        idle = ""
+        color = "green"
+        elapsed = 0
+        if self.idle_running:
+            elapsed = elapsed_seconds(self.idle_origin, now)
+            hours, remainder = divmod(elapsed, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            idle = f"{hours:02}:{minutes:02}:{seconds:02}"
+            if elapsed >= self.idle_red_duration:
+                color = "red"
+            elif elapsed >= self.idle_yellow_duration:
+                color = "yellow"
+        return {"clock": "00:00", "text": "Idle", "idle": idle, "idle_color": color,
+                "name": "Idle" if self.idle_running else None, "elapsed": elapsed}
+
+    def _log(self, name, start_time, stop_time):
+        if self.on_log is not None:
+            self.on_log(self, name, start_time, stop_time)
+
+
+class StationScheduler:
+    """Drives every station from one root.after chain and a heap of deadlines.
+
+    Each station asks to be woken at its next second boundary; only the
+    earliest wake-up is ever pending in Tk, and only stations that are due
+    are ticked, so the cost per second follows the number of visible
+    changes rather than the number of timers.
+    """
+
+    def __init__(self, root, clock=time.monotonic, on_lateness=None):
+        self.root = root
+        self.clock = clock
+        self.stations = {}
+        self._heap = []
+        self._generation = {}  # Wake-ups of an older generation are stale
+        self._after_id = None
+        self._after_when = None
+        self._jitter = JitterRecorder(on_record=on_lateness)
+
+    def add(self, station):
+        self.stations[station.station_id] = station
+        self.poke(station)
+
+    def poke(self, station):
+        """Tick a station right away, e.g. after one of its buttons was pressed."""
+        self._wake(station, station.tick(self.clock()))
+        self._arm()
+
+    def shutdown(self):
+        """Stop ticking and close the open interval of every station."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        now = self.clock()
+        for station in self.stations.values():
+            station.shutdown(now)
+
+    def jitter_stats(self):
+        """Return how late wake-ups fired, across all stations."""
+        return self._jitter.stats()
+
+    def _wake(self, station, when):
+        generation = self._generation.get(station.station_id, 0) + 1
+        self._generation[station.station_id] = generation
+        if when is not None:
+            heapq.heappush(self._heap, (when, station.station_id, generation))
+
+    def _arm(self):
+        if not self._heap:
+            return
+        when = self._heap[0][0]
+        if self._after_id is not None:
+            if self._after_when <= when:
+                return
+            self.root.after_cancel(self._after_id)
+        delay_ms = max(0, int(math.ceil((when - self.clock()) * 1000)))
+        self._after_when = when
+        self._after_id = self.root.after(delay_ms, self._run)
+
+    def _run(self):
+        self._after_id = None
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now + TICK_TOLERANCE:
+            when, station_id, generation = heapq.heappop(self._heap)
+            if generation != self._generation.get(station_id):
+                continue
+            self._jitter.record(now - when)
+            station = self.stations[station_id]
+            self._wake(station, station.tick(now))
+        self._arm()
@@ -0,0 +1,136 @@
+"""Optional local HTTP/JSON status API for dashboards.
+
+    GET /status        current state of the press (or of every station)
+    GET /logs/recent   the most recently logged intervals, newest first
+    GET /events        server-sent events: one "state" event per change
+
+Every response is served from bytes serialized when the state changes, so
+any number of polling dashboards never query SQLite or touch the Tk loop.
+Requests are handled on the server's own threads.
+"""
+
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE = 15.0
+
+
+class StatusServer:
+    """Holds the serialized snapshots and serves them over HTTP."""
+
+    def __init__(self, host="127.0.0.1", port=8321, recent_rows=50):
+        self.host = host
+        self.port = port
+        self._changed = threading.Condition()
+        self._version = 0
+        self._status = b"{}"
+        self._recent = deque(maxlen=recent_rows)
+        self._recent_body = b"[]"
+        self._closing = False
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        """Start serving on a background thread."""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), StatusRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.status_server = self
+        self.port = self._httpd.server_address[1]  # The real port when 0 was asked for
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="status-api", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and end open event streams."""
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def publish(self, state):
+        """Replace the status snapshot; returns False if nothing changed."""
+        body = json.dumps(state, sort_keys=True).encode()
+        with self._changed:
+            if body == self._status:
+                return False
+            self._status = body
+            self._version += 1
+            self._changed.notify_all()
+        return True
+
+    def add_log_rows(self, rows):
+        """Add logged intervals (dicts, oldest first) to the recent rows."""
+        with self._changed:
+            self._recent.extendleft(rows)
+            self._recent_body = json.dumps(list(self._recent)).encode()
+
+    def status(self):
+        with self._changed:
+            return self._version, self._status
+
+    def recent_logs(self):
+        with self._changed:
+            return self._recent_body
+
+    def wait_for_change(self, version, timeout):
+        """Wait until the snapshot is newer than `version`; returns (version, body) or None on close."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version or self._closing, timeout)
+            if self._closing:
+                return None
+            return self._version, self._status
+
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FoamTimerStatus/1"
+
+    def do_GET(self):
+        status_server = self.server.status_server
+        path = self.path.split("?", 1)[0]
+        if path == "/status":
+            self._send_json(status_server.status()[1])
+        elif path == "/logs/recent":
+            self._send_json(status_server.recent_logs())
+        elif path == "/events":
+            self._stream_events(status_server)
+        else:
+            self.send_error(404)
+
+    def _send_json(self, body):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, status_server):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        version, body = status_server.status()
+        try:
+            while True:
+                if body is not None:
+                    self.wfile.write(b"event: state\ndata: " + body + b"\n\n")
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                change = status_server.wait_for_change(version, EVENT_KEEPALIVE)
+                if change is None:
+                    return
+                body = change[1] if change[0] != version else None
+                version = change[0]
+        except (BrokenPipeError, ConnectionResetError):
+            return  # The dashboard went away
+
+    def log_message(self, format, *args):
+        pass  # Dashboards poll often; keep the console for the timer's own messages
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Running statistics of each timer's cycles and of the idle gaps, learned as they are logged.
+
+Every logged interval updates, in constant time and memory, the running
+mean and variance of its name (Welford's method) and P-squared estimates
+of its 5th, 50th and 95th percentiles (Jain & Chlamtac), so nothing ever
+has to be read back from the logs table. An interval is unusual once
+ANOMALY_MIN_SAMPLES intervals of its name were seen and it lies both
+beyond the 5th/95th percentile and more than ANOMALY_SIGMAS standard
+deviations from the mean.
+
+The state is saved as compact JSON (a handful of numbers per name):
+
+    {"version": 1, "stats": {"Idle": [count, mean, m2, min, max, [[count, heights, positions], ...]], ...}}
+
+Run `python3 stream_stats.py [stream_stats.json]` to print what was
+learned, or `python3 stream_stats.py --rebuild logs.db` to learn it once
+from the existing logs.
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+
+STATS_VERSION = 1
+STAT_QUANTILES = (0.05, 0.50, 0.95)
+ANOMALY_MIN_SAMPLES = 20
+ANOMALY_SIGMAS = 3.0
+ANOMALY_TEXT = {"long": "longer than usual", "short": "shorter than usual"}
+
+
+class RunningStats:
+    """Count, mean, variance, minimum and maximum, updated one value at a time."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=None, maximum=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2  # Sum of squared differences from the mean
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile from five markers (the P-squared algorithm)."""
+
+    def __init__(self, p, count=0, heights=None, positions=None):
+        self.p = p
+        self.count = count
+        self.heights = list(heights or [])  # The first five values until there are five
+        self.positions = list(positions or [])
+
+    def add(self, value):
+        self.count += 1
+        if self.count <= 5:
+            self.heights.append(value)
+            self.heights.sort()
+            if self.count == 5:
+                self.positions = [1, 2, 3, 4, 5]
+            return
+        q, n = self.heights, self.positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self._desired()
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count < 5:
+            return self.heights[min(self.count - 1, int(self.p * self.count))]
+        return self.heights[2]
+
+    def _desired(self):
+        # The ideal marker positions only depend on how many values were seen
+        p, last = self.p, self.count - 1
+        return (1, 1 + last * p / 2, 1 + last * p, 1 + last * (1 + p) / 2, self.count)
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+
+class IntervalStats:
+    """What the intervals of one name (a timer's text, or Idle) usually last."""
+
+    def __init__(self):
+        self.running = RunningStats()
+        self.quantiles = [P2Quantile(p) for p in STAT_QUANTILES]
+
+    def add(self, seconds):
+        self.running.add(seconds)
+        for quantile in self.quantiles:
+            quantile.add(seconds)
+
+    def limits(self):
+        """(low, high) outside which an interval is unusual, or None while still learning."""
+        if self.running.count < ANOMALY_MIN_SAMPLES:
+            return None
+        spread = ANOMALY_SIGMAS * self.running.stddev
+        low, _, high = (quantile.value() for quantile in self.quantiles)
+        return min(low, self.running.mean - spread), max(high, self.running.mean + spread)
+
+    def classify(self, seconds):
+        """"long", "short" or None for an interval of `seconds`."""
+        limits = self.limits()
+        if limits is None:
+            return None
+        if seconds > limits[1]:
+            return "long"
+        if seconds < limits[0]:
+            return "short"
+        return None
+
+    def summary(self):
+        low, median, high = (quantile.value() for quantile in self.quantiles)
+        return {"count": self.running.count, "mean": self.running.mean, "stddev": self.running.stddev,
+                "min": self.running.minimum, "max": self.running.maximum,
+                "p05": low, "p50": median, "p95": high}
+
+    def state(self):
+        running = self.running
+        return [running.count, running.mean, running.m2, running.minimum, running.maximum,
+                [[quantile.count, quantile.heights, quantile.positions] for quantile in self.quantiles]]
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls()
+        count, mean, m2, minimum, maximum, quantiles = state
+        stats.running = RunningStats(count, mean, m2, minimum, maximum)
+        stats.quantiles = [P2Quantile(p, *quantile) for p, quantile in zip(STAT_QUANTILES, quantiles)]
+        return stats
+
+
+class StreamStats:
+    """IntervalStats for every name that was logged, saved to and loaded from a JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.names = {}
+        self.changed = False
+        self._mtime = None
+
+    def add(self, name, seconds):
+        """Learn one logged interval; returns how unusual it was ("long", "short" or None)."""
+        stats = self.names.get(name)
+        if stats is None:
+            stats = self.names[name] = IntervalStats()
+        # Judged against what was normal before it
+        anomaly = stats.classify(seconds)
+        stats.add(seconds)
+        self.changed = True
+        return anomaly
+
+    def classify(self, name, seconds):
+        """How unusual an interval of `seconds` (also one still running) is for `name`."""
+        stats = self.names.get(name)
+        return stats.classify(seconds) if stats is not None else None
+
+    def limits(self, name):
+        stats = self.names.get(name)
+        return stats.limits() if stats is not None else None
+
+    def median(self, name):
+        stats = self.names.get(name)
+        return stats.quantiles[1].value() if stats is not None else None
+
+    def summaries(self):
+        return {name: stats.summary() for name, stats in sorted(self.names.items())}
+
+    def load(self):
+        """Read the saved state, if there is one; a damaged file starts the learning over."""
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+            self._mtime = os.path.getmtime(self.path)
+            if data.get("version") != STATS_VERSION:
+                raise ValueError(f"unknown version {data.get('version')}")
+            self.names = {name: IntervalStats.from_state(state) for name, state in data["stats"].items()}
+        except FileNotFoundError:
+            self.names = {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Ignoring {self.path}: {e}")  # Optional: Console logging for warnings
+            self.names = {}
+        self.changed = False
+
+    def reload_if_changed(self):
+        """Load the file again if another process saved it since; returns whether it did."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def save(self):
+        """Write the state, replacing the previous file atomically."""
+        data = {"version": STATS_VERSION, "stats": {name: stats.state() for name, stats in self.names.items()}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+        self.changed = False
+
+
+def rebuild(db_path, stats):
+    """Learn every interval in logs.db once, oldest first."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for name, duration_s in conn.execute('SELECT name, duration_s FROM logs WHERE duration_s IS NOT NULL '
+                                             'ORDER BY id'):
+            stats.add(name, duration_s)
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what the timer has learned about its intervals.")
+    parser.add_argument("path", nargs="?", default="stream_stats.json", help="Path to stream_stats.json")
+    parser.add_argument("--rebuild", metavar="LOGS_DB", help="Learn from every row of this logs.db and save")
+    args = parser.parse_args()
+    stats = StreamStats(args.path)
+    if args.rebuild:
+        rebuild(args.rebuild, stats)
+        stats.save()
+    else:
+        stats.load()
+    print(f"{'name':20}{'count':>8}{'mean':>9}{'stddev':>9}{'p05':>9}{'p50':>9}{'p95':>9}")
+    for name, summary in stats.summaries().items():
+        print(f"{name:20}{summary['count']:>8}{summary['mean']:>9.0f}{summary['stddev']:>9.0f}"
+              f"{summary['p05']:>9.0f}{summary['p50']:>9.0f}{summary['p95']:>9.0f}")
+
+if __name__ == '__main__':
+    main()
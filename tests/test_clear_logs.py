@@ -0,0 +1,73 @@
+"""Clear Logs leaves nothing behind that the log view still shows or counts."""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_schema
+import log_query
+import log_stats
+import main
+import retention
+from log_writer import INSERT_LOG_SQL, log_row
+
+
+class ClearLogsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.saved = main.LOGS_DB, main.ARCHIVE_DIR
+        main.LOGS_DB = os.path.join(self.workdir, "logs.db")
+        main.ARCHIVE_DIR = os.path.join(self.workdir, "archive")
+        db_schema.init_db(main.LOGS_DB)
+        rows = []
+        start = datetime(2025, 1, 1, 8)
+        for day in range(120):  # January to April, two rows a day
+            for name in ("A", "Idle"):
+                at = start + timedelta(days=day, minutes=10 * len(rows) % 600)
+                rows.append(log_row(name, at, at + timedelta(minutes=5)))
+        conn = sqlite3.connect(main.LOGS_DB)
+        with conn:
+            conn.executemany(INSERT_LOG_SQL, rows)
+            log_stats.update_rollups(conn, rows)
+        conn.close()
+        # January to March move to the archives
+        retention.archive_old_rows(main.LOGS_DB, main.archive_dir(), retention.month_start(datetime(2025, 4, 1)))
+
+    def tearDown(self):
+        main.LOGS_DB, main.ARCHIVE_DIR = self.saved
+        shutil.rmtree(self.workdir)
+
+    def page_and_count(self, log_filter):
+        conn = sqlite3.connect(main.LOGS_DB, uri=True)
+        try:
+            page = log_query.fetch_page(conn, log_filter, main.archive_dir(), limit=100)
+            return page, log_query.count_rows(conn, log_filter, main.archive_dir())
+        finally:
+            conn.close()
+
+    def test_page_and_count_agree_after_clear(self):
+        self.assertEqual(len(retention.archive_paths(main.archive_dir())), 3)
+        page, count = self.page_and_count(log_query.LogFilter(name="A"))
+        self.assertEqual((len(page), count), (100, 120))
+
+        main.delete_all_logs()
+
+        for log_filter in (log_query.LogFilter(), log_query.LogFilter(name="A")):
+            page, count = self.page_and_count(log_filter)
+            self.assertEqual((page, count), ([], 0))
+        self.assertEqual(main.fetch_log_rows(limit=100), [])
+        self.assertEqual(retention.archive_paths(main.archive_dir()), [])
+        # The archives are set aside, not deleted
+        cleared = [name for name in os.listdir(main.archive_dir()) if name.startswith("cleared_")]
+        self.assertEqual(len(os.listdir(os.path.join(main.archive_dir(), cleared[0]))), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Replaying a journal whose last line was torn by a power cut."""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_schema
+import journal
+import main
+from journal import Journal, read_last_record
+
+
+def heartbeat(alive_ts, open_intervals):
+    return {"alive_ts": alive_ts, "open": open_intervals, "logged": []}
+
+
+class JournalReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "journal.log")
+        self.saved = dict(vars(main))
+        main.JOURNAL_FILE = self.path
+        main.LOGS_DB = os.path.join(self.tmp.name, "logs.db")
+        db_schema.init_db(main.LOGS_DB)
+        now = int(time.time())
+        self.running = {"station": None, "press": None, "state": "running", "name": main.TIMER_TEXTS[1],
+                        "timer": 1, "start_ts": now - 60, "duration": main.TIMER_DURATIONS[1]}
+        idle = {"station": None, "press": None, "state": "idle", "name": "Idle", "start_ts": now - 600}
+        # Heartbeats of the idle period, then the timer started, then a
+        # crash in the middle of writing the next heartbeat
+        lines = [json.dumps(heartbeat(now - 600 + i, [idle])) for i in range(0, 540, 2)]
+        lines.append(json.dumps(heartbeat(now - 60, [self.running])))
+        self.last_line = json.dumps(heartbeat(now - 5, [self.running]))
+        lines.append(self.last_line)
+        with open(self.path, "w") as file:
+            file.write("\n".join(lines) + "\n" + self.last_line[:40])
+
+    def tearDown(self):
+        if main.state_journal is not None:
+            main.state_journal.close()
+        vars(main).update(self.saved)
+        self.tmp.cleanup()
+
+    def test_torn_line_is_skipped(self):
+        self.assertEqual(read_last_record(self.path), json.loads(self.last_line))
+
+    def test_open_compacts_to_the_last_complete_record(self):
+        self.assertGreater(os.path.getsize(self.path), 16 * 1024)
+        log = Journal(self.path, max_bytes=16 * 1024)
+        self.assertEqual(log.open(), json.loads(self.last_line))
+        log.close()
+        with open(self.path) as file:
+            self.assertEqual(file.read(), json.dumps(json.loads(self.last_line), separators=(",", ":")) + "\n")
+
+    def test_recovery_resumes_the_running_timer(self):
+        main.initialize_headless()
+        resume = main.recover_intervals(main.start_journal())
+        self.assertEqual(resume, {None: self.running})
+        main.setup_stations(resume)
+        station = main.stations[0]
+        self.assertTrue(station.running)
+        self.assertEqual(station.active_timer, 1)
+        self.assertAlmostEqual(station.start_time.timestamp(), self.running["start_ts"], places=3)
+        # The countdown carries on from where it was, not from the start
+        remaining = station.deadline - main.clock()
+        self.assertLessEqual(remaining, self.running["duration"] - 59)
+        # A clean stop now records the resumed timer as still open
+        main.stop_journal()
+        record = read_last_record(self.path)
+        self.assertEqual(len(record["open"]), 1)
+        self.assertEqual(record["open"][0]["start_ts"], self.running["start_ts"])
+        with open(self.path) as file:
+            self.assertNotIn(self.last_line[:40] + "{", file.read())  # The torn line did not swallow a record
+
+    def test_expired_timer_is_logged_not_resumed(self):
+        self.running["start_ts"] -= self.running["duration"]
+        with open(self.path, "w") as file:
+            file.write(json.dumps(heartbeat(time.time() - 5, [self.running])) + "\n" + self.last_line[:40])
+        main.start_log_writer()
+        try:
+            self.assertEqual(main.recover_intervals(main.start_journal()), {})
+        finally:
+            main.stop_log_writer()
+        self.assertTrue(journal.already_logged(main.LOGS_DB, self.running))
+
+
+if __name__ == '__main__':
+    unittest.main()
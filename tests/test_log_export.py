@@ -0,0 +1,100 @@
+"""The CSV export's high-water mark surviving interrupted runs."""
+
+import csv
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_schema
+import log_export
+import settings_store
+from log_writer import INSERT_LOG_SQL, log_row
+
+
+class CsvExportRecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "logs.db")
+        self.export_dir = os.path.join(self.tmp.name, "exports")
+        self.state_file = os.path.join(self.export_dir, "export_state.json")
+        db_schema.init_db(self.db_path)
+        self.logged = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def log(self, first_start, count):
+        """Log count back-to-back one-minute rows named "Row <n>" from first_start on."""
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            for i in range(count):
+                start = first_start + timedelta(minutes=i)
+                conn.execute(INSERT_LOG_SQL, log_row(f"Row {self.logged}", start, start + timedelta(minutes=1)))
+                self.logged += 1
+        conn.close()
+
+    def export(self):
+        return log_export.export_logs(self.db_path, self.export_dir, "csv", "month", self.state_file)
+
+    def exported_names(self):
+        """Names in every exported CSV, checking each file starts with one header."""
+        names = []
+        for name in sorted(os.listdir(self.export_dir)):
+            if name.endswith(".csv"):
+                with open(os.path.join(self.export_dir, name), newline="") as file:
+                    rows = list(csv.reader(file))
+                self.assertEqual(rows[0], log_export.EXPORT_COLUMNS)
+                names += [row[0] for row in rows[1:]]
+        return names
+
+    def test_partial_line_left_by_a_crash_is_dropped(self):
+        self.log(datetime(2025, 1, 10, 8, 0), 5)
+        self.assertEqual(self.export(), 5)
+        # A run that died mid-write, before it could record the new size
+        with open(os.path.join(self.export_dir, "logs_2025-01.csv"), "a") as file:
+            file.write("Row 5,2025-01-10 08:05:00,2025-01-1")
+        self.log(datetime(2025, 1, 10, 8, 5), 3)
+        self.assertEqual(self.export(), 3)
+        self.assertEqual(self.exported_names(), [f"Row {i}" for i in range(8)])
+
+    def test_interrupted_run_is_not_exported_twice(self):
+        self.log(datetime(2025, 1, 31, 23, 50), 5)
+        self.assertEqual(self.export(), 5)
+        # Rows for January and a new February partition; the run dies
+        # after writing some of them to both files
+        self.log(datetime(2025, 1, 31, 23, 58), 6)
+        export_row = log_export.export_row
+        written = []
+
+        def failing_export_row(row):
+            if len(written) == 4:
+                raise OSError("power cut")
+            written.append(row)
+            return export_row(row)
+
+        with mock.patch.object(log_export, "export_row", failing_export_row):
+            with self.assertRaises(OSError):
+                self.export()
+        self.assertGreater(len(self.exported_names()), 5)  # Half-exported rows are on disk
+        self.assertEqual(self.export(), 6)
+        self.assertEqual(self.exported_names(), [f"Row {i}" for i in range(11)])
+        self.assertEqual(sorted(name for name in os.listdir(self.export_dir) if name.endswith(".csv")),
+                         ["logs_2025-01.csv", "logs_2025-02.csv"])
+
+    def test_single_workbook_is_refused(self):
+        with self.assertRaises(ValueError):
+            log_export.export_logs(self.db_path, self.export_dir, "xlsx", "none", self.state_file)
+        with self.assertRaises(settings_store.SettingsError):
+            settings_store.validate({"export_format": "xlsx", "export_partition": "none"})
+        settings_store.validate({"export_format": "csv", "export_partition": "none"})
+
+
+if __name__ == '__main__':
+    unittest.main()
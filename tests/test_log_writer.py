@@ -0,0 +1,103 @@
+"""LogWriter keeping and retrying rows while the database is locked."""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_schema
+import log_writer
+from log_writer import LogWriter, log_row
+
+START = datetime(2025, 3, 3, 8, 0, 0)
+
+
+def rows(count):
+    """count back-to-back one-minute rows named "Row 0", "Row 1", ..."""
+    return [log_row(f"Row {i}", START + timedelta(minutes=i), START + timedelta(minutes=i + 1))
+            for i in range(count)]
+
+
+class LockedDatabase:
+    """after_insert hook failing the first `failures` transactions like a locked database."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, conn, rows):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise sqlite3.OperationalError("database is locked")
+
+
+class LogWriterRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "logs.db")
+        db_schema.init_db(self.db_path)
+        self.saved_delays = log_writer.RETRY_MIN_DELAY, log_writer.RETRY_MAX_DELAY
+        log_writer.RETRY_MIN_DELAY, log_writer.RETRY_MAX_DELAY = 0.01, 0.05
+
+    def tearDown(self):
+        log_writer.RETRY_MIN_DELAY, log_writer.RETRY_MAX_DELAY = self.saved_delays
+        self.tmp.cleanup()
+
+    def logged_names(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [name for (name,) in conn.execute("SELECT name FROM logs ORDER BY id")]
+        finally:
+            conn.close()
+
+    def flush_until_written(self, writer, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not writer.flush(timeout=1.0):
+            self.assertLess(time.monotonic(), deadline, "rows were never committed")
+            time.sleep(0.01)
+
+    def test_locked_commits_are_retried_in_order(self):
+        locked = LockedDatabase(failures=3)
+        writer = LogWriter(self.db_path, max_batch=5, max_delay=0.05, after_insert=locked)
+        writer.start()
+        try:
+            for row in rows(12):
+                writer.write(row)
+            self.flush_until_written(writer)
+            self.assertEqual(writer.rows_unwritten(), 0)
+        finally:
+            self.assertEqual(writer.close(), 0)
+        self.assertGreater(locked.calls, locked.failures)
+        # Every row exactly once, in the order it was written
+        self.assertEqual(self.logged_names(), [f"Row {i}" for i in range(12)])
+        self.assertEqual(writer.commit_stats()["rows"], 12)
+
+    def test_flush_reports_rows_still_pending(self):
+        writer = LogWriter(self.db_path, max_batch=5, max_delay=0.05, after_insert=LockedDatabase(failures=1))
+        writer.start()
+        try:
+            writer.write(rows(1)[0])
+            self.assertFalse(writer.flush(timeout=1.0))
+            self.assertEqual(writer.rows_unwritten(), 1)
+            self.flush_until_written(writer)
+        finally:
+            writer.close()
+        self.assertEqual(self.logged_names(), ["Row 0"])
+
+    def test_close_counts_rows_that_never_committed(self):
+        writer = LogWriter(self.db_path, max_batch=5, max_delay=0.05, after_insert=LockedDatabase(failures=1000))
+        writer.start()
+        for row in rows(3):
+            writer.write(row)
+        self.assertEqual(writer.close(), 3)
+        self.assertEqual(self.logged_names(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""Upgrading a logs.db written by the original main.py, and what retention may archive."""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_schema
+import log_stats
+import main
+import retention
+from log_writer import INSERT_LOG_SQL, log_row
+
+# The table as the original main.py created it (schema version 1)
+BASELINE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        start_time TEXT,
+        stop_time TEXT,
+        duration TEXT
+    )
+'''
+
+
+class MigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.workdir, "logs.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def baseline_db(self, rows):
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute(BASELINE_SCHEMA)
+            conn.executemany('INSERT INTO logs (name, start_time, stop_time, duration) VALUES (?, ?, ?, ?)', rows)
+        conn.close()
+
+    def test_baseline_db_is_migrated_to_v4(self):
+        start = datetime(2025, 1, 6, 8, 0, 0)
+        rows = []
+        for i in range(50):
+            at = start + timedelta(minutes=10 * i)
+            rows.append(("First Timer", at.strftime(db_schema.TIME_FORMAT),
+                         (at + timedelta(minutes=5)).strftime(db_schema.TIME_FORMAT), "0:05:00"))
+        rows.append(("Idle", "2025-01-07 08:00:00", "2025-01-08 08:00:05", "1 day, 0:00:05"))
+        rows.append(("Idle", "not a time", "", ""))  # Kept, but never counted
+        self.baseline_db(rows)
+
+        db_schema.init_db(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], db_schema.SCHEMA_VERSION)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0], 52)
+            first = conn.execute("SELECT start_ts, stop_ts, duration_s, press FROM logs WHERE id = 1").fetchone()
+            self.assertEqual(first, (int(start.timestamp()), int(start.timestamp()) + 300, 300, None))
+            self.assertEqual(conn.execute("SELECT duration_s FROM logs WHERE id = 51").fetchone()[0], 86405)
+            self.assertEqual(conn.execute("SELECT start_ts, duration_s FROM logs WHERE id = 52").fetchone(),
+                             (None, None))
+            # The rollups count the migrated rows
+            self.assertEqual(log_stats.cycle_count(conn, name="First Timer"), 50)
+            self.assertEqual(log_stats.cycle_count(conn), 51)
+            # Startup never rewrote the file; the retention job switches it over
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+        finally:
+            conn.close()
+        self.assertTrue(retention.enable_incremental_vacuum(self.db_path))
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0], 52)
+        finally:
+            conn.close()
+
+    def test_v2_db_gets_rollups(self):
+        db_schema.init_db(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            start = datetime(2025, 1, 6, 8, 0, 0)
+            conn.executemany(INSERT_LOG_SQL, [log_row("A", start + timedelta(hours=i),
+                                                      start + timedelta(hours=i, minutes=5)) for i in range(3)])
+            conn.execute("DROP TABLE rollup_hourly")
+            conn.execute("DROP TABLE rollup_daily")
+            conn.execute("PRAGMA user_version = 2")
+        conn.close()
+
+        db_schema.init_db(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], db_schema.SCHEMA_VERSION)
+            self.assertEqual(log_stats.cycle_count(conn, name="A"), 3)
+        finally:
+            conn.close()
+
+    def test_new_db_uses_incremental_vacuum(self):
+        db_schema.init_db(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        finally:
+            conn.close()
+        self.assertFalse(retention.enable_incremental_vacuum(self.db_path))
+
+
+class RetentionLimitTest(unittest.TestCase):
+    """Rows are only archived once both the export and the fleet sync have them."""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.saved = dict(vars(main))
+        main.LOGS_DB = os.path.join(self.workdir, "logs.db")
+        main.ARCHIVE_DIR = os.path.join(self.workdir, "archive")
+        main.EXPORT_DIR = os.path.join(self.workdir, "exports")
+        main.SYNC_STATE_FILE = os.path.join(self.workdir, "sync_state.json")
+        main.EXPORT_INTERVAL_HOURS, main.EXPORT_INTERVAL_MINUTES = 1, 0
+        main.FLEET_SYNC = {"enabled": True}
+        db_schema.init_db(main.LOGS_DB)
+        # One row a day through January and February
+        start = datetime(2025, 1, 1, 8, 0, 0)
+        conn = sqlite3.connect(main.LOGS_DB)
+        with conn:
+            conn.executemany(INSERT_LOG_SQL, [log_row("A", start + timedelta(days=day),
+                                                      start + timedelta(days=day, minutes=5)) for day in range(59)])
+        conn.close()
+        os.makedirs(main.EXPORT_DIR)
+
+    def tearDown(self):
+        vars(main).update(self.saved)
+        shutil.rmtree(self.workdir)
+
+    def set_marks(self, exported_id, synced_id):
+        with open(os.path.join(main.EXPORT_DIR, "export_state.json"), "w") as file:
+            json.dump({"last_id": exported_id, "files": {}}, file)
+        with open(main.SYNC_STATE_FILE, "w") as file:
+            json.dump({"last_id": synced_id}, file)
+
+    def archive(self):
+        cutoff = retention.month_start(datetime(2025, 3, 1))  # Everything is old enough
+        return retention.archive_old_rows(main.LOGS_DB, main.archive_dir(), cutoff, main.archivable_max_id())
+
+    def remaining_ids(self):
+        conn = sqlite3.connect(main.LOGS_DB)
+        try:
+            return [row_id for (row_id,) in conn.execute("SELECT id FROM logs ORDER BY id")]
+        finally:
+            conn.close()
+
+    def test_limited_by_the_lower_mark(self):
+        self.set_marks(exported_id=59, synced_id=20)
+        self.assertEqual(main.archivable_max_id(), 20)
+        self.set_marks(exported_id=40, synced_id=59)
+        self.assertEqual(main.archivable_max_id(), 40)
+        self.set_marks(exported_id=59, synced_id=59)
+        main.FLEET_SYNC = {"enabled": False}
+        main.EXPORT_INTERVAL_HOURS = 0
+        self.assertIsNone(main.archivable_max_id())
+
+    def test_unsynced_month_stays_whole(self):
+        # January is exported but only partly synced: nothing can move yet
+        self.set_marks(exported_id=59, synced_id=20)
+        self.assertEqual(self.archive(), 0)
+        self.assertEqual(self.remaining_ids(), list(range(1, 60)))
+        # January synced, February only partly exported: January moves
+        self.set_marks(exported_id=45, synced_id=59)
+        self.assertEqual(self.archive(), 31)
+        self.assertEqual(self.remaining_ids(), list(range(32, 60)))
+        self.assertEqual([retention.archive_month(path) for path in retention.archive_paths(main.archive_dir())],
+                         ["2025-01"])
+        # Both caught up: February follows
+        self.set_marks(exported_id=59, synced_id=59)
+        self.assertEqual(self.archive(), 28)
+        self.assertEqual(self.remaining_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""The single timer, run as a Station on main.py's headless loop."""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import timing_common
+from headless import VirtualClock
+
+
+class SingleTimerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = dict(vars(main))
+        main.SETTINGS_FILE = os.path.join(self.tmp.name, "settings.json")
+        main.LOGS_DB = os.path.join(self.tmp.name, "logs.db")
+        main.clock = VirtualClock()
+        main.logged_intervals = timing_common.LoggedIntervals()
+        self.output = io.StringIO()
+        with contextlib.redirect_stdout(self.output):
+            main.load_settings()
+            main.init_db()
+            main.start_log_writer()
+            main.initialize_headless()
+            main.setup_stations()
+        self.station = main.stations[0]
+
+    def tearDown(self):
+        with contextlib.redirect_stdout(self.output):
+            main.stop_log_writer()
+        vars(main).update(self.saved)
+        self.tmp.cleanup()
+
+    def run_until(self, seconds):
+        with contextlib.redirect_stdout(self.output):
+            main.root.run_until(seconds)
+
+    def press(self, timer_index):
+        with contextlib.redirect_stdout(self.output):
+            main.button_callback(timer_index)
+
+    def test_reload_keeps_the_running_countdown(self):
+        self.press(2)
+        self.run_until(10)
+        main.settings_store.update(durations=[60, 120, 180, 240], texts=["A", "B", "C", "D"])
+        self.run_until(20)
+        press = main.status_snapshot()["presses"][0]
+        self.assertEqual(press["timer"], "Second Timer")
+        self.assertEqual(press["ends_ts"] - press["start_ts"], 600)
+        self.press(1)  # Ignored while another timer runs
+        self.assertEqual(self.station.active_timer, 1)
+        self.press(2)
+        self.press(2)
+        self.run_until(30)
+        self.assertEqual(self.station.active_text, "B")
+        self.run_until(30 + 120)
+        self.assertFalse(self.station.running)  # Ran out at the reloaded duration
+        self.assertTrue(self.station.idle_running)
+        self.assertEqual(main.timer_label.cget("text"), "00:00")
+
+    def test_other_screens_pause_the_idle_timer(self):
+        self.run_until(5)
+        with contextlib.redirect_stdout(self.output):
+            main.show_log_page()
+        self.assertFalse(self.station.idle_running)
+        self.assertEqual(main.logged_intervals.rows_written, 1)  # The idle period so far
+        self.run_until(65)
+        with contextlib.redirect_stdout(self.output):
+            main.show_main_screen()
+        self.assertTrue(self.station.idle_running)
+        self.assertEqual(main.open_intervals()[0]["state"], "idle")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""The status API answered over a real socket on localhost."""
+
+import json
+import os
+import socket
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from status_api import StatusServer
+
+RUNNING = {"screen": "idle", "presses": [{"name": None, "state": "running", "timer": "First Timer",
+                                          "start_ts": 1000.0, "ends_ts": 1300.0}]}
+IDLE = {"screen": "idle", "presses": [{"name": None, "state": "idle", "timer": None,
+                                       "start_ts": 1300.0, "ends_ts": None}]}
+
+
+class StatusServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StatusServer("127.0.0.1", 0)
+        self.server.start()
+        self.url = f"http://127.0.0.1:{self.server.port}"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], "application/json")
+            return json.loads(response.read())
+
+    def test_status(self):
+        self.assertEqual(self.get_json("/status"), {})
+        self.assertTrue(self.server.publish(RUNNING))
+        self.assertFalse(self.server.publish(RUNNING))  # Unchanged
+        self.assertEqual(self.get_json("/status"), RUNNING)
+
+    def test_recent_logs_newest_first(self):
+        rows = [{"name": "Idle", "start_ts": 900, "stop_ts": 1000, "duration_s": 100, "press": None},
+                {"name": "First Timer", "start_ts": 1000, "stop_ts": 1300, "duration_s": 300, "press": None}]
+        self.server.add_log_rows(rows)
+        self.assertEqual(self.get_json("/logs/recent"), rows[::-1])
+
+    def test_unknown_path(self):
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(self.url + "/nothing", timeout=5)
+        self.assertEqual(raised.exception.code, 404)
+
+    def test_event_after_publish(self):
+        self.server.publish(RUNNING)
+        with socket.create_connection(("127.0.0.1", self.server.port), timeout=5) as sock:
+            sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            stream = sock.makefile("rb")
+            self.assertIn(b" 200 ", stream.readline())
+            while stream.readline() not in (b"\r\n", b""):
+                pass  # Headers
+            self.assertEqual(read_event(stream), ("state", RUNNING))  # The current state on connecting
+            self.server.publish(IDLE)
+            self.assertEqual(read_event(stream), ("state", IDLE))
+
+
+def read_event(stream):
+    """(event, data) of the next server-sent event."""
+    event = data = None
+    while True:
+        line = stream.readline().rstrip(b"\n")
+        if not line:
+            return event, data
+        field, _, value = line.decode().partition(": ")
+        if field == "event":
+            event = value
+        elif field == "data":
+            data = json.loads(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
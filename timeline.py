@@ -0,0 +1,394 @@
+"""Timeline of run versus idle time per press, drawn at the zoom level's resolution.
+
+The time axis is cut into tiles TILE_PX pixels wide. What a tile holds
+depends on how many seconds a pixel stands for (spp):
+
+    spp <= RAW_MAX_SPP       the timer runs themselves, fetched from logs
+    spp <  ROLLUP_MIN_SPP    per pixel column: runs, busy seconds and longest run (GROUP BY over logs)
+    spp >= ROLLUP_MIN_SPP    the same, summed from rollup_hourly
+
+so a month is drawn from a few hundred rollup rows instead of thousands of
+intervals. A run is counted in the column it started in; busy time beyond
+a column's width carries into the next columns. Tiles are kept in an LRU
+cache, panning moves the tiles already on the canvas and only draws the
+ones that come into view, and newly logged rows only drop the tiles they
+fall in. Archived months (see retention.py) are read like logs.db.
+"""
+
+import math
+import os
+import time
+from datetime import datetime
+
+import db_schema
+import log_query
+import retention
+from log_query import LogFilter, QueryCache
+
+TILE_PX = 256
+ZOOM_LEVELS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 28800)  # Seconds per pixel
+RAW_MAX_SPP = 30
+ROLLUP_MIN_SPP = 900  # Each divides or is a multiple of an hour, so rollup hours fall on whole columns
+TILE_CACHE_TILES = 128
+SHADES = 8  # Busy fractions are drawn in this many shades, so equal neighbours merge into one rectangle
+
+LABEL_PX = 120  # Lane names left of the plot
+AXIS_PX = 30    # Time labels above it
+LANE_GAP_PX = 6
+TICK_MIN_PX = 90
+TICK_STEPS = (60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400)
+
+IDLE_COLOR = (40, 40, 40)
+RUN_COLOR = (0, 200, 0)
+RUN_COLORS = ("#00c800", "#1e90ff", "#ffa500", "#da70d6", "#00ced1", "#ffd700")  # By timer number
+OPEN_COLOR = "#66ff66"
+
+_RAW_SQL = '''
+    SELECT COALESCE(press, ''), name, start_ts, stop_ts FROM {table}
+    WHERE name != 'Idle' AND start_ts >= ? AND start_ts < ? AND stop_ts > ?
+'''
+_GROUPED_SQL = '''
+    SELECT COALESCE(press, ''), (start_ts - ?) / ?, COUNT(*), SUM(duration_s), MAX(duration_s) FROM {table}
+    WHERE name != 'Idle' AND start_ts >= ? AND start_ts < ? AND duration_s IS NOT NULL
+    GROUP BY 1, 2
+'''
+_ROLLUP_SQL = '''
+    SELECT press, (hour_ts - ?) / ?, SUM(count), SUM(total_s), MAX(max_s) FROM rollup_hourly
+    WHERE name != 'Idle' AND hour_ts >= ? AND hour_ts < ?
+    GROUP BY 1, 2
+'''
+
+
+def level_for(seconds, width):
+    """The closest zoom level that fits `seconds` into `width` pixels."""
+    for spp in ZOOM_LEVELS:
+        if spp * width >= seconds:
+            return spp
+    return ZOOM_LEVELS[-1]
+
+def tile_span(spp):
+    return spp * TILE_PX
+
+def shade(fraction):
+    """The step, 0 to SHADES, a busy fraction is drawn in."""
+    return min(SHADES, math.ceil(fraction * SHADES))
+
+def _hex(rgb):
+    return "#" + "".join(f"{round(value):02x}" for value in rgb)
+
+# From the idle colour (0) to the run colour (SHADES)
+SHADE_COLORS = tuple(_hex(idle + (run - idle) * step / SHADES for idle, run in zip(IDLE_COLOR, RUN_COLOR))
+                     for step in range(SHADES + 1))
+
+
+class TimelineData:
+    """Tiles of the logs at each zoom level, computed on first use and kept in an LRU.
+
+    Every tile maps a lane (the press, "" for the single timer) to either
+    [(x0, x1, name)] runs or [(x, busy_fraction, runs, busy_s, longest_s)]
+    columns, x in pixels from the tile's left edge.
+    """
+
+    def __init__(self, db_connect, archive_dir, max_run_s, max_tiles=TILE_CACHE_TILES):
+        self.db_connect = db_connect  # Returns a connection opened with uri=True
+        self.archive_dir = archive_dir
+        self.max_run_s = max_run_s    # How far before a tile a run that reaches into it can start
+        self.cache = QueryCache(max_tiles)  # (spp, tile index) -> tile
+
+    def tiles(self, spp, indexes):
+        """The tiles `indexes` at zoom level spp, from the cache or the database."""
+        conn = None
+        try:
+            result = {}
+            for index in indexes:
+                def compute():
+                    nonlocal conn
+                    if conn is None:
+                        conn = self.db_connect()
+                    return self._compute(conn, spp, index)
+                result[index] = self.cache.get((spp, index), compute)
+            return result
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def cached(self, spp, index):
+        return (spp, index) in self.cache
+
+    def invalidate(self, start_ts, stop_ts):
+        """Drop every tile that rows logged for [start_ts, stop_ts) may change."""
+        # The rollup hour of a run and the busy time it carries forward reach past the run itself
+        start_ts -= 3600
+        stop_ts += 3600
+        for spp, index in self.cache.keys():
+            if index * tile_span(spp) < stop_ts and (index + 1) * tile_span(spp) > start_ts:
+                self.cache.discard((spp, index))
+
+    def clear(self):
+        self.cache.clear()
+
+    # === Computing Tiles ===
+
+    def _compute(self, conn, spp, index):
+        start_ts = index * tile_span(spp)
+        end_ts = start_ts + tile_span(spp)
+        if spp <= RAW_MAX_SPP:
+            return self._raw_tile(conn, spp, start_ts, end_ts)
+        # Whole hours before the tile, so runs that started there carry into it and rollup hours stay aligned
+        lookback = math.ceil(self.max_run_s / 3600) * 3600
+        origin = start_ts - lookback
+        if spp >= ROLLUP_MIN_SPP:
+            rows = conn.execute(_ROLLUP_SQL, (origin, spp, origin, end_ts)).fetchall()
+            bucket_s = max(spp, 3600)
+        else:
+            rows = self._query(conn, _GROUPED_SQL, (origin, spp, origin, end_ts), origin, end_ts)
+            bucket_s = spp
+        return _spread_columns(rows, spp, lookback // spp, bucket_s)
+
+    def _raw_tile(self, conn, spp, start_ts, end_ts):
+        rows = self._query(conn, _RAW_SQL, (start_ts - self.max_run_s, end_ts, start_ts),
+                           start_ts - self.max_run_s, end_ts)
+        lanes = {}
+        for press, name, run_start, run_stop in sorted(rows, key=lambda row: row[2]):
+            x0 = max(0.0, (run_start - start_ts) / spp)
+            x1 = min(float(TILE_PX), (run_stop - start_ts) / spp)
+            lanes.setdefault(press, []).append((x0, x1, name))
+        return lanes
+
+    def _query(self, conn, sql, params, start_ts, end_ts):
+        """Run a query on logs and on the archives of the months it reaches into."""
+        rows = conn.execute(sql.format(table="logs"), params).fetchall()
+        if not os.path.isdir(self.archive_dir):
+            return rows
+        for path in log_query.archives_in_range(self.archive_dir, LogFilter(start_ts=start_ts, end_ts=end_ts)):
+            conn.execute("ATTACH DATABASE ? AS archive", (retention.read_only_uri(path),))
+            try:
+                rows += conn.execute(sql.format(table="archive.logs"), params).fetchall()
+            finally:
+                conn.execute("DETACH DATABASE archive")
+        return rows
+
+def _spread_columns(rows, spp, offset, bucket_s):
+    """Turn (press, bucket, runs, busy_s, longest_s) rows into each lane's columns.
+
+    Buckets are numbered by their first column, counted from `offset`
+    columns before the tile; a bucket wider than a column (a rollup hour)
+    is shared evenly by its columns.
+    What is busier than a column can hold carries into the following ones.
+    """
+    per_bucket = max(1, bucket_s // spp)
+    lanes = {}
+    for press, bucket, runs, busy_s, longest_s in rows:
+        columns = lanes.setdefault(press, {})
+        first = bucket - offset
+        for column in range(first, first + per_bucket):
+            entry = columns.setdefault(column, [0, 0.0, 0])
+            entry[1] += busy_s / per_bucket
+        entry = columns[first]
+        entry[0] += runs
+        entry[2] = max(entry[2], longest_s)
+    tiles = {}
+    for press, columns in lanes.items():
+        shown = []
+        carry = 0.0
+        column = min(columns)
+        while column < TILE_PX and (column <= max(columns) or carry > 0):
+            runs, busy_s, longest_s = columns.get(column, (0, 0.0, 0))
+            busy = carry + busy_s
+            drawn = min(busy, spp)
+            carry = busy - drawn
+            if column >= 0 and (drawn > 0 or runs):
+                shown.append((column, drawn / spp, runs, busy_s, longest_s))
+            column += 1
+        tiles[press] = shown
+    return tiles
+
+
+class TimelineView:
+    """Draws TimelineData on a Tk Canvas: one lane per press, time running left to right."""
+
+    def __init__(self, canvas, data, lanes, colors=None, open_intervals=None, lane_height=None):
+        self.canvas = canvas
+        self.data = data
+        self.lanes = list(lanes)          # [(press, title)]; press is "" for the single timer
+        self.colors = colors or {}        # Timer text -> fill colour of its runs
+        self.open_intervals = open_intervals  # Returns the running timers as journal entries
+        self.lane_height = lane_height
+        self.spp = ZOOM_LEVELS[0]
+        self.view_start = 0
+        self._drawn = set()               # Tile indexes on the canvas
+
+    # === Navigation ===
+
+    def show(self, seconds, end_ts=None):
+        """Show the `seconds` up to end_ts (now) at the level that fits them."""
+        self.spp = level_for(seconds, self.plot_width())
+        end_ts = time.time() if end_ts is None else end_ts
+        self.view_start = int(end_ts - self.plot_width() * self.spp) // self.spp * self.spp
+        self.redraw()
+
+    def pan(self, dx):
+        """Scroll by dx pixels; positive shows earlier times. Tiles already drawn are only moved."""
+        dx = int(dx)
+        if not dx:
+            return
+        self.view_start -= dx * self.spp
+        self.canvas.move("tile", dx, 0)
+        self._draw_tiles()
+
+    def zoom(self, steps, x=None):
+        """Zoom in (steps < 0) or out by whole levels, keeping the time under x in place."""
+        level = ZOOM_LEVELS.index(self.spp)
+        new_level = min(len(ZOOM_LEVELS) - 1, max(0, level + steps))
+        if new_level == level:
+            return
+        x = self.plot_width() / 2 if x is None else max(0, x - LABEL_PX)
+        anchor = self.view_start + x * self.spp
+        self.spp = ZOOM_LEVELS[new_level]
+        self.view_start = int(anchor - x * self.spp) // self.spp * self.spp
+        self.redraw()
+
+    def refresh(self):
+        """Redraw the tiles that were invalidated and the running timers, e.g. after rows were logged."""
+        for index in list(self._drawn):
+            if not self.data.cached(self.spp, index):
+                self.canvas.delete(f"tile{index}")
+                self._drawn.discard(index)
+        self._draw_tiles()
+
+    def redraw(self):
+        self.canvas.delete("all")
+        self._drawn.clear()
+        for lane_index, (_, title) in enumerate(self.lanes):
+            y0, y1 = self._lane_y(lane_index)
+            self.canvas.create_rectangle(LABEL_PX, y0, LABEL_PX + self.plot_width(), y1,
+                                         fill=SHADE_COLORS[0], width=0)
+            self.canvas.create_text(LABEL_PX - 10, (y0 + y1) / 2, text=title, anchor="e",
+                                    fill="white", font=("Helvetica", 14), tags="lane_name")
+        self._draw_tiles()
+
+    # === Drawing ===
+
+    def plot_width(self):
+        return max(TILE_PX, self.canvas.winfo_width() - LABEL_PX)
+
+    def _lane_y(self, lane_index):
+        height = self.lane_height or max(20, (self.canvas.winfo_height() - AXIS_PX) // max(1, len(self.lanes)))
+        y0 = AXIS_PX + lane_index * height + LANE_GAP_PX / 2
+        return y0, y0 + height - LANE_GAP_PX
+
+    def _tile_x(self, index):
+        return LABEL_PX + (index * tile_span(self.spp) - self.view_start) / self.spp
+
+    def _draw_tiles(self):
+        """Draw the tiles that came into view, forget those that left it, and redo the overlays."""
+        first = self.view_start // tile_span(self.spp)
+        last = (self.view_start + self.plot_width() * self.spp) // tile_span(self.spp)
+        visible = set(range(first, last + 1))
+        for index in self._drawn - visible:
+            self.canvas.delete(f"tile{index}")
+        self._drawn &= visible
+        missing = sorted(visible - self._drawn)
+        for index, tile in self.data.tiles(self.spp, missing).items():
+            self._draw_tile(index, tile)
+            self._drawn.add(index)
+        self._draw_axis()
+        self._draw_open_intervals()
+
+    def _draw_tile(self, index, tile):
+        x_left = self._tile_x(index)
+        tags = ("tile", f"tile{index}")
+        for lane_index, (press, _) in enumerate(self.lanes):
+            items = tile.get(press)
+            if not items:
+                continue
+            y0, y1 = self._lane_y(lane_index)
+            if self.spp <= RAW_MAX_SPP:
+                for x0, x1, name in items:
+                    self.canvas.create_rectangle(x_left + x0, y0, x_left + max(x1, x0 + 1), y1,
+                                                 fill=self.colors.get(name, RUN_COLORS[0]), width=0, tags=tags)
+                continue
+            # Neighbouring columns of the same shade become one rectangle
+            spans = []  # [x0, x1, step]
+            for x, fraction, *_ in items:
+                step = shade(fraction)
+                if not step:
+                    continue
+                if spans and spans[-1][1] == x and spans[-1][2] == step:
+                    spans[-1][1] = x + 1
+                else:
+                    spans.append([x, x + 1, step])
+            for x0, x1, step in spans:
+                self.canvas.create_rectangle(x_left + x0, y0, x_left + x1, y1,
+                                             fill=SHADE_COLORS[step], width=0, tags=tags)
+
+    def _draw_axis(self):
+        """Time labels and grid lines, spaced at least TICK_MIN_PX apart, on local time."""
+        self.canvas.delete("axis")
+        step = next((step for step in TICK_STEPS if step / self.spp >= TICK_MIN_PX), TICK_STEPS[-1])
+        utc_offset = time.localtime(self.view_start).tm_gmtoff
+        end_ts = self.view_start + self.plot_width() * self.spp
+        tick = -((-(self.view_start + utc_offset)) // step) * step - utc_offset
+        bottom = self._lane_y(len(self.lanes) - 1)[1] if self.lanes else AXIS_PX
+        label_format = "%H:%M" if step < 86400 else "%a %d %b"
+        while tick < end_ts:
+            x = LABEL_PX + (tick - self.view_start) / self.spp
+            moment = datetime.fromtimestamp(tick)
+            text = moment.strftime("%a %d %b" if moment.hour == 0 and moment.minute == 0 else label_format)
+            self.canvas.create_line(x, AXIS_PX - 5, x, bottom, fill="#555555", tags="axis")
+            self.canvas.create_text(x + 3, AXIS_PX - 8, text=text, anchor="sw", fill="white",
+                                    font=("Helvetica", 12), tags="axis")
+            tick += step
+        now = time.time()
+        if self.view_start <= now < end_ts:
+            x = LABEL_PX + (now - self.view_start) / self.spp
+            self.canvas.create_line(x, AXIS_PX - 5, x, bottom, fill="red", width=2, tags="axis")
+        # Hide whatever was panned under the lane names
+        self.canvas.create_rectangle(0, 0, LABEL_PX - 1, bottom, fill="black", width=0, tags=("axis", "mask"))
+        self.canvas.tag_raise("axis")
+        self.canvas.tag_raise("lane_name")
+
+    def _draw_open_intervals(self):
+        """The running timers, which are only logged once they stop."""
+        self.canvas.delete("open")
+        if self.open_intervals is None:
+            return
+        now = time.time()
+        lane_indexes = {press: index for index, (press, _) in enumerate(self.lanes)}
+        for entry in self.open_intervals():
+            lane_index = lane_indexes.get(entry["press"] or "")
+            if entry["state"] != "running" or lane_index is None:
+                continue
+            y0, y1 = self._lane_y(lane_index)
+            x0 = max(LABEL_PX, LABEL_PX + (entry["start_ts"] - self.view_start) / self.spp)
+            x1 = LABEL_PX + (now - self.view_start) / self.spp
+            if x1 > LABEL_PX:
+                self.canvas.create_rectangle(x0, y0, max(x1, x0 + 1), y1, fill=OPEN_COLOR, width=0,
+                                             stipple="gray50", tags="open")
+
+    # === Details ===
+
+    def describe(self, x, y):
+        """What the pixel column under (x, y) holds, for the line under the timeline."""
+        if x < LABEL_PX:
+            return ""
+        lane_index = next((index for index in range(len(self.lanes))
+                           if self._lane_y(index)[0] <= y <= self._lane_y(index)[1]), None)
+        if lane_index is None:
+            return ""
+        press, title = self.lanes[lane_index]
+        t = self.view_start + (x - LABEL_PX) * self.spp
+        index = int(t // tile_span(self.spp))
+        tile = self.data.tiles(self.spp, [index])[index]
+        offset = (t - index * tile_span(self.spp)) / self.spp
+        start = datetime.fromtimestamp(t).strftime(db_schema.TIME_FORMAT)
+        if self.spp <= RAW_MAX_SPP:
+            for x0, x1, name in tile.get(press, []):
+                if x0 <= offset < max(x1, x0 + 1):
+                    return f"{title}, {start}: {name} ({db_schema.format_duration((x1 - x0) * self.spp)} shown)"
+            return f"{title}, {start}: idle"
+        for column, fraction, runs, busy_s, longest_s in tile.get(press, []):
+            if column == int(offset):
+                return (f"{title}, {start} + {db_schema.format_duration(self.spp)}: {fraction:.0%} running, "
+                        f"{runs} runs started, longest {db_schema.format_duration(longest_s)}")
+        return f"{title}, {start} + {db_schema.format_duration(self.spp)}: idle"
@@ -0,0 +1,65 @@
+"""Drift-free tick arithmetic for the countdown and idle timers (scheduled by stations.StationScheduler)."""
+
+import math
+from collections import deque
+from datetime import datetime
+
+# A tick that fires up to this early still counts as the boundary it was
+# scheduled for (Tk rounds after() delays to whole milliseconds).
+TICK_TOLERANCE = 0.005
+
+# Number of recent tick lateness samples kept for inspection
+JITTER_HISTORY = 600
+
+
+def next_tick_boundary(origin, now, deadline=None):
+    """Return the first whole second after origin that is later than now."""
+    boundary = origin + math.floor(now - origin + TICK_TOLERANCE) + 1
+    if deadline is not None:
+        boundary = min(boundary, deadline)
+    return boundary
+
+def remaining_seconds(deadline, now):
+    """Whole seconds left until deadline, as shown on a countdown."""
+    return max(0, int(math.ceil(deadline - now - TICK_TOLERANCE)))
+
+def elapsed_seconds(origin, now):
+    """Whole seconds since origin, as shown on a count-up display."""
+    return int(math.floor(now - origin + TICK_TOLERANCE))
+
+def resumed_seconds(start_time):
+    """Seconds an interval resumed from a wall-clock start_time has run (0 for a new one)."""
+    if start_time is None:
+        return 0.0
+    return max(0.0, (datetime.now() - start_time).total_seconds())
+
+
+class JitterRecorder:
+    """Keeps running totals and recent samples of how late ticks fired."""
+
+    def __init__(self, history=JITTER_HISTORY, on_record=None):
+        self.on_record = on_record  # on_record(lateness), e.g. a metrics recorder
+        self._recent = deque(maxlen=history)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def record(self, lateness):
+        lateness = max(0.0, lateness)
+        self._recent.append(lateness)
+        self._count += 1
+        self._total += lateness
+        self._max = max(self._max, lateness)
+        if self.on_record is not None:
+            self.on_record(lateness)
+
+    def stats(self):
+        """Return tick lateness (in seconds) measured so far."""
+        count = self._count
+        return {
+            "ticks": count,
+            "last": self._recent[-1] if self._recent else 0.0,
+            "avg": self._total / count if count else 0.0,
+            "max": self._max,
+            "recent": list(self._recent),
+        }
@@ -0,0 +1,202 @@
+"""What main.py and timing_daemon.py share to run the timers.
+
+Either process can run the buttons and timers, never both at once (see
+journal.py). They find the same files, read the same pins, build the same
+Station objects from settings.json and write the same journal records and
+status API snapshots, so each one picks up where the other left off. Only
+the standard library and the small timing modules are imported here.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from stations import Station
+
+
+def resource_path(relative_path):
+    """ Get absolute path to resource, works for dev and PyInstaller """
+    try:
+        # When running in a PyInstaller bundle, _MEIPASS is set
+        base_path = sys._MEIPASS
+    except AttributeError:
+        # In development mode, use the current directory
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+# === Configuration ===
+
+# File paths for storing persistent data
+SETTINGS_FILE = resource_path("settings.json")
+LOGS_DB = resource_path("logs.db")  # Using SQLite database
+
+# Journal of the open intervals, replayed on startup after a crash or power cut
+JOURNAL_FILE = resource_path("journal.log")
+
+# What each timer's cycles and the idle gaps usually last (see stream_stats.py)
+STREAM_STATS_FILE = resource_path("stream_stats.json")
+
+# timing_daemon.py publishes its state on this socket; `main.py --daemon` shows it
+DAEMON_SOCKET = resource_path("timing.sock")
+
+# GPIO Pin Definitions
+BUTTON_PINS = {
+    1: 17,  # Timer 1
+    2: 27,  # Timer 2
+    3: 22,  # Timer 3
+    4: 23   # Timer 4
+}
+
+# Debounce time in seconds
+DEBOUNCE_TIME = 0.3  # 300 milliseconds
+
+# How often the event loop drains queued button presses
+INPUT_POLL_MS = 10
+
+# Log writer batching: commit after this many rows or this many seconds
+LOG_COMMIT_BATCH_SIZE = 50
+LOG_COMMIT_INTERVAL = 2.0
+
+JOURNAL_HEARTBEAT_MS = 30 * 1000  # Bounds how much idle time a crash can lose
+SETTINGS_POLL_MS = 5000  # How often to check settings.json for edits made by other programs
+METRICS_WRITE_INTERVAL_MS = 60 * 1000
+STREAM_STATS_SAVE_MS = 60 * 1000
+STATUS_API_RECENT_ROWS = 50
+
+# Timer settings used until settings.json has its own
+TIMER_DURATIONS = [5 * 60, 10 * 60, 15 * 60, 20 * 60]  # 5, 10, 15, 20 minutes
+TIMER_TEXTS = ["First Timer", "Second Timer", "Third Timer", "Fourth Timer"]
+IDLE_YELLOW_DURATION = 5 * 60  # 5 minutes
+IDLE_RED_DURATION = 10 * 60    # 10 minutes
+
+# === Stations ===
+
+def create_stations(stations_config, durations, texts, idle_yellow_duration, idle_red_duration):
+    """One Station per "stations" entry, or a single nameless one (station id None) for the single timer."""
+    if not stations_config:
+        return [Station(None, None, durations, texts, BUTTON_PINS.values(), idle_yellow_duration, idle_red_duration)]
+    return [Station.from_config(station_id, config, durations, texts, idle_yellow_duration, idle_red_duration)
+            for station_id, config in enumerate(stations_config)]
+
+def start_stations(stations, resume, now):
+    """Continue each station's interval from the journal (resume is keyed on station id), or start it idle."""
+    for station in stations:
+        entry = resume.get(station.station_id)
+        if entry is not None and entry["state"] == "running":
+            station.start_timer(entry["timer"], now, start_time=datetime.fromtimestamp(entry["start_ts"]))
+        elif entry is not None:
+            station.start_idle(now, start_time=datetime.fromtimestamp(entry["start_ts"]))
+        else:
+            station.start_idle(now)
+
+def configure_single_timer(station, values):
+    """Give the single timer reloaded settings; a running countdown keeps its text and duration."""
+    station.durations = list(values["durations"])
+    station.texts = list(values["texts"])
+    station.idle_yellow_duration = values["idle_yellow_duration"]
+    station.idle_red_duration = values["idle_red_duration"]
+
+def input_pins(stations_config):
+    """Map each GPIO pin to the button key pushed onto the input queue."""
+    if stations_config:
+        return {pin: (station_id, button_index + 1)
+                for station_id, config in enumerate(stations_config)
+                for button_index, pin in enumerate(config.get("pins", []))}
+    return {pin: timer_index for timer_index, pin in BUTTON_PINS.items()}
+
+def pressed_station(stations, key):
+    """The station and 0-based button of a debounced press, or None if it fits no station.
+
+    key is a timer number (1-4) for the single timer, or (station id, button).
+    """
+    station_id, button = key if isinstance(key, tuple) else (0, key)
+    if not 0 <= station_id < len(stations):
+        print(f"Invalid station: {station_id + 1}")
+        return None
+    station = stations[station_id]
+    # The running timer's button stops it, even if a settings reload removed that timer since
+    if not 1 <= button <= len(station.durations) and station.active_timer != button - 1:
+        print(f"Invalid timer index: {button}")
+        return None
+    if station.name is None:
+        print(f"Button {button} pressed")  # Debugging statement
+    else:
+        print(f"{station.name} button {button} pressed")  # Debugging statement
+    return station, button - 1
+
+# === Journal ===
+
+class LoggedIntervals:
+    """Logged intervals, numbered in log writer order, kept in the journal until committed.
+
+    Rows whose commit failed stay until a retry commits them, so recovery
+    writes them on the next start if no retry ever did.
+    """
+
+    def __init__(self):
+        self.rows_written = 0
+        self._uncommitted = []  # [(row number, interval)]
+
+    def add(self, name, start_ts, stop_ts, press):
+        self.rows_written += 1
+        self._uncommitted.append((self.rows_written, {"press": press, "name": name,
+                                                      "start_ts": start_ts, "stop_ts": stop_ts}))
+
+    def uncommitted(self, rows_committed):
+        """The intervals after the first rows_committed rows; the others are forgotten."""
+        self._uncommitted = [(number, interval) for number, interval in self._uncommitted
+                             if number > rows_committed]
+        return [interval for number, interval in self._uncommitted]
+
+
+def open_intervals(stations):
+    """The running countdowns and idle periods, as journal entries."""
+    return [interval for interval in map(Station.open_interval, stations) if interval is not None]
+
+def journal_record(stations, logged, rows_committed):
+    """The intervals open right now, and those logged but not yet committed."""
+    return {"alive_ts": time.time(), "open": open_intervals(stations), "logged": logged.uncommitted(rows_committed)}
+
+def can_resume(entry, stations_config, durations):
+    """Whether an interval from the journal fits the configured timers."""
+    if entry["station"] is None:
+        timer_durations = durations if not stations_config else []
+    elif entry["station"] < len(stations_config):
+        timer_durations = stations_config[entry["station"]].get("durations", durations)
+    else:
+        return False
+    return entry["state"] == "idle" or entry["timer"] < len(timer_durations)
+
+# === Status API ===
+
+def status_log_row(name, start_ts, stop_ts, duration_s, press):
+    return {"name": name, "start_ts": start_ts, "stop_ts": stop_ts, "duration_s": duration_s, "press": press}
+
+def recent_status_rows(db_path, limit=STATUS_API_RECENT_ROWS):
+    """The newest logged rows, oldest first, to seed the status API with."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute('SELECT name, start_ts, stop_ts, duration_s, press FROM logs '
+                            'ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [status_log_row(*row) for row in reversed(rows)]
+
+def status_presses(stations):
+    """Every station's state in the status API's format (see status_api.py)."""
+    presses = []
+    for station in stations:
+        interval = station.open_interval()
+        if interval is None:
+            presses.append({"name": station.name, "state": "stopped", "timer": None,
+                            "start_ts": None, "ends_ts": None})
+        elif interval["state"] == "running":
+            presses.append({"name": station.name, "state": "running", "timer": interval["name"],
+                            "start_ts": interval["start_ts"],
+                            "ends_ts": interval["start_ts"] + interval["duration"]})
+        else:
+            presses.append({"name": station.name, "state": "idle", "timer": None,
+                            "start_ts": interval["start_ts"], "ends_ts": None})
+    return presses
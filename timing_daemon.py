@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""The timers without the screen, in a small process of their own.
+
+timing_daemon.py runs what main.py otherwise runs on its Tk loop: the
+buttons, the countdowns and idle timers of every press, logging to logs.db
+and the journal. It publishes the state on a Unix socket, and
+`main.py --daemon` only shows it, so a slow redraw or export, or a GUI that
+hangs or is restarted, can no longer delay a tick or lose a log row. Only
+the standard library and the small timing modules are imported here.
+
+A client of the socket gets the current state right away, then one JSON
+line per change, and an empty line every few seconds while nothing changes:
+
+    {"version": 3, "presses": [{"station": null, "press": null, "state": "running",
+                                "name": "First Timer", "timer": 0, "start_ts": 1700000000.0,
+                                "duration": 300, "idle_yellow": 300, "idle_red": 600}]}
+
+Run `python3 timing_daemon.py [--input gpio|script]`. How late its ticks
+fire is written to daemon_metrics.json every minute and printed on exit.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+
+import db_schema
+import log_stats
+from headless import HeadlessRoot
+from input_backends import GpioInput, ScriptedInput
+from input_events import InputQueue
+from journal import Journal, JournalLocked, already_logged, recover_record
+from log_writer import LogWriter, log_row
+from metrics import Metrics
+from settings_store import SettingsStore
+from stations import StationScheduler
+from stream_stats import ANOMALY_TEXT, StreamStats
+import timing_common
+# The files, pins and batching are shared with main.py, which runs the same timers on its Tk loop
+from timing_common import (resource_path, SETTINGS_FILE, LOGS_DB, JOURNAL_FILE, STREAM_STATS_FILE, DAEMON_SOCKET,
+                           BUTTON_PINS, DEBOUNCE_TIME, INPUT_POLL_MS, LOG_COMMIT_BATCH_SIZE, LOG_COMMIT_INTERVAL,
+                           JOURNAL_HEARTBEAT_MS, SETTINGS_POLL_MS, METRICS_WRITE_INTERVAL_MS, STREAM_STATS_SAVE_MS,
+                           STATUS_API_RECENT_ROWS)
+
+# === Configuration ===
+
+DAEMON_METRICS_FILE = resource_path("daemon_metrics.json")
+
+KEEPALIVE_SECONDS = 5.0   # Empty line sent to idle clients
+SEND_TIMEOUT = 10.0       # A client that takes no data for this long (a hung GUI) is dropped
+RECONNECT_SECONDS = 1.0
+
+# Used until main.py has written settings.json; the daemon never writes it
+DEFAULT_SETTINGS = {
+    "durations": timing_common.TIMER_DURATIONS,
+    "texts": timing_common.TIMER_TEXTS,
+    "idle_yellow_duration": timing_common.IDLE_YELLOW_DURATION,
+    "idle_red_duration": timing_common.IDLE_RED_DURATION,
+    "status_api": {"enabled": False, "host": "127.0.0.1", "port": 8321},
+    "stations": [],
+}
+
+# === State Socket ===
+
+def daemon_running(path):
+    """Whether a timing daemon is accepting connections on the socket at `path`."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+class StatePublisher:
+    """Sends the latest state to every client of a Unix socket, each on its own thread.
+
+    publish() only swaps the serialized line under a lock, so a client that
+    stops reading holds up nothing but its own thread.
+    """
+
+    def __init__(self, path, keepalive=KEEPALIVE_SECONDS):
+        self.path = path
+        self.keepalive = keepalive
+        self._changed = threading.Condition()
+        self._version = 0
+        self._body = None
+        self._line = None
+        self._closing = False
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Start serving; refuses to take over the socket of a running daemon."""
+        if daemon_running(self.path):
+            raise RuntimeError(f"A timing daemon is already running on {self.path}")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a daemon that did not stop cleanly
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, StateRequestHandler)
+        self._server.daemon_threads = True
+        self._server.publisher = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="state-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def publish(self, state):
+        """Send a new state to the clients; returns False if nothing changed."""
+        body = json.dumps(state, sort_keys=True)
+        with self._changed:
+            if body == self._body:
+                return False
+            self._body = body
+            self._version += 1
+            self._line = json.dumps({"version": self._version, **state}, sort_keys=True).encode() + b"\n"
+            self._changed.notify_all()
+        return True
+
+    def current(self):
+        with self._changed:
+            return self._version, self._line
+
+    def wait_for_change(self, version, timeout):
+        """Wait until the state is newer than `version`; returns (version, line) or None on close."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version or self._closing, timeout)
+            if self._closing:
+                return None
+            return self._version, self._line
+
+
+class StateRequestHandler(socketserver.StreamRequestHandler):
+    timeout = SEND_TIMEOUT
+
+    def handle(self):
+        publisher = self.server.publisher
+        version, line = publisher.current()
+        try:
+            while True:
+                self.wfile.write(line or b"\n")
+                change = publisher.wait_for_change(version, publisher.keepalive)
+                if change is None:
+                    return
+                line = change[1] if change[0] != version else None
+                version = change[0]
+        except OSError:
+            return  # The client went away or stopped reading
+
+
+class StateClient:
+    """Follows the daemon's state from another process (main.py --daemon).
+
+    A background thread reads the socket and keeps only the newest state
+    for take(); when the daemon stops or restarts it reconnects every
+    RECONNECT_SECONDS, with `connected` telling which is the case.
+    """
+
+    def __init__(self, path, reconnect=RECONNECT_SECONDS, timeout=3 * KEEPALIVE_SECONDS):
+        self.path = path
+        self.reconnect = reconnect
+        self.timeout = timeout
+        self.connected = False
+        self._lock = threading.Lock()
+        self._state = None
+        self._stopping = threading.Event()
+        self._socket = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="state-client", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Wakes the reading thread
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(self.timeout)
+            self._thread = None
+
+    def take(self):
+        """The newest state received since the last call, or None."""
+        with self._lock:
+            state, self._state = self._state, None
+            return state
+
+    def _run(self):
+        while not self._stopping.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+                self._socket = sock
+                self._follow(sock)
+            except (OSError, ValueError):
+                pass  # Not running yet, stopped, or restarting
+            finally:
+                self._socket = None
+                self.connected = False
+                sock.close()
+            self._stopping.wait(self.reconnect)
+
+    def _follow(self, sock):
+        with sock.makefile("rb") as lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+                state = json.loads(line)
+                with self._lock:
+                    self._state = state
+                self.connected = True
+
+# === Daemon ===
+
+class TimingDaemon:
+    """Runs every press's timers on a display-less event loop."""
+
+    def __init__(self, settings_path=SETTINGS_FILE, db_path=LOGS_DB, journal_path=JOURNAL_FILE,
+                 socket_path=DAEMON_SOCKET, metrics_path=DAEMON_METRICS_FILE, stats_path=STREAM_STATS_FILE,
+                 clock=time.monotonic):
+        self.db_path = db_path
+        self.metrics_path = metrics_path
+        self.clock = clock
+        self.root = HeadlessRoot(clock=clock, sleep=getattr(clock, "sleep", time.sleep))
+        self.metrics = Metrics()
+        self.interval_stats = StreamStats(stats_path)
+        self.settings = SettingsStore(settings_path, DEFAULT_SETTINGS, read_only=True, timer_count=len(BUTTON_PINS))
+        self.journal = Journal(journal_path)
+        self.publisher = StatePublisher(socket_path)
+        self.station_mode = False
+        self.stations = []
+        self.scheduler = None
+        self.log_writer = None
+        self.status_server = None
+        self.input_queue = None
+        self.input_backend = None
+        self.logged = timing_common.LoggedIntervals()
+        self._change_pending = False
+
+    def start(self, input_kind="gpio", script=None, repeat=False):
+        """Recover what the last run left open, then start timing and publishing."""
+        self.publisher.start()  # First, so a second daemon stops before touching the journal
+        try:
+            last_record = self.journal.open()  # Locked while main.py runs the timers itself
+        except JournalLocked:
+            self.publisher.stop()
+            raise
+        self.settings.load()
+        values = self.settings.snapshot()
+        self.settings.subscribe(self.apply_settings)
+        db_schema.init_db(self.db_path)
+        self.interval_stats.load()
+        self.log_writer = LogWriter(self.db_path, max_batch=LOG_COMMIT_BATCH_SIZE, max_delay=LOG_COMMIT_INTERVAL,
+                                    after_insert=log_stats.update_rollups,
+                                    on_commit=self.metrics.recorder("db_commit"))
+        self.log_writer.start()
+
+        self.scheduler = StationScheduler(self.root, clock=self.clock,
+                                          on_lateness=self.metrics.recorder("tick_lateness"))
+        self.station_mode = bool(values["stations"])
+        self.stations = timing_common.create_stations(values["stations"], values["durations"], values["texts"],
+                                                      values["idle_yellow_duration"], values["idle_red_duration"])
+        resume = recover_record(last_record, time.time(), self.log_recovered,
+                                lambda interval: already_logged(self.db_path, interval),
+                                lambda entry: timing_common.can_resume(entry, values["stations"], values["durations"]))
+        timing_common.start_stations(self.stations, resume, self.clock())
+        for station in self.stations:
+            station.on_log = self.log_station_change
+            self.scheduler.add(station)
+
+        self.input_queue = InputQueue(self.press, poll_ms=INPUT_POLL_MS, debounce=DEBOUNCE_TIME, clock=self.clock,
+                                      on_latency=self.metrics.recorder("press_to_state"))
+        self.input_queue.start(self.root)
+        if input_kind == "gpio":
+            self.input_backend = GpioInput(timing_common.input_pins(values["stations"]))
+        else:
+            self.input_backend = ScriptedInput.from_file(script, repeat=repeat)
+        self.input_backend.start(self.root, self.input_queue.push)
+        self.start_status_api(values["status_api"])
+        self.state_changed()
+        self._every(JOURNAL_HEARTBEAT_MS, self.journal_heartbeat)
+        self._every(SETTINGS_POLL_MS, self.poll_settings)
+        self._every(METRICS_WRITE_INTERVAL_MS, self.write_metrics_file)
+        self._every(STREAM_STATS_SAVE_MS, self.save_interval_stats)
+
+    def run(self):
+        self.root.mainloop()
+
+    def shutdown(self):
+        """Log the open intervals, stop the background work and leave the event loop."""
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        if self.input_queue is not None:
+            self.input_queue.stop()
+        if self.input_backend is not None:
+            self.input_backend.stop()
+        self.publisher.stop()
+        if self.status_server is not None:
+            self.status_server.stop()
+        if self.log_writer is not None:
+            unwritten = self.log_writer.close()
+            if unwritten:
+                print(f"Log writer: {unwritten} rows could not be written to {self.db_path}")
+            stats = self.log_writer.commit_stats()
+            print(f"Log writer: {stats['rows']} rows in {stats['commits']} commits, "
+                  f"avg {stats['avg_latency'] * 1000:.1f} ms, max {stats['max_latency'] * 1000:.1f} ms")
+            self.journal.close(self.journal_record())  # Everything was logged above
+        self.report_jitter()
+        self.write_metrics_file()
+        self.save_interval_stats()
+        self.root.destroy()
+
+    def _every(self, ms, func):
+        def run():
+            func()
+            self.root.after(ms, run)
+        self.root.after(ms, run)
+
+    # === Presses ===
+
+    def press(self, key):
+        """Handle a debounced press: a timer number, or (station id, button) in station mode."""
+        pressed = timing_common.pressed_station(self.stations, key)
+        if pressed is None:
+            return
+        station, button_index = pressed
+        station.press(button_index, self.scheduler.clock())
+        self.scheduler.poke(station)
+        self.state_changed()
+
+    # === Logging ===
+
+    def log_station_change(self, station, name, start_time, stop_time):
+        self.log(name, start_time, stop_time, station.name)
+
+    def log_recovered(self, name, start_ts, stop_ts, press):
+        self.log(name, datetime.fromtimestamp(start_ts), datetime.fromtimestamp(stop_ts), press)
+
+    def log(self, name, start_time, stop_time, press):
+        row = log_row(name, start_time, stop_time, press)
+        start_ts, stop_ts, duration = row[4:7]
+        kind = self.interval_stats.add(name, duration)
+        if kind is not None:
+            print(f"Unusual interval{f' on {press}' if press else ''}: {name} {ANOMALY_TEXT[kind]}: "
+                  f"{db_schema.format_duration(duration)}")
+        self.log_writer.write(row)
+        self.logged.add(name, start_ts, stop_ts, press)
+        if self.status_server is not None:
+            self.status_server.add_log_rows([timing_common.status_log_row(name, start_ts, stop_ts, duration, press)])
+        self.state_changed()
+
+    # === State ===
+
+    def state_changed(self):
+        """Journal and publish the new state once the current callback has finished."""
+        if not self._change_pending:
+            self._change_pending = True
+            self.root.after_idle(self._record_state_change)
+
+    def _record_state_change(self):
+        self._change_pending = False
+        self.journal.append(self.journal_record())
+        self.publisher.publish(self.state())
+        if self.status_server is not None:
+            self.status_server.publish(self.status_snapshot())
+
+    def journal_record(self):
+        """The intervals open right now, and those logged but not yet committed."""
+        return timing_common.journal_record(self.stations, self.logged, self.log_writer.rows_committed())
+
+    def journal_heartbeat(self):
+        self.journal.append(self.journal_record())
+
+    def state(self):
+        """What the GUI shows: every press's open interval and idle colour thresholds."""
+        presses = []
+        for station in self.stations:
+            press = station.open_interval() or {"station": station.station_id, "press": station.name,
+                                                "state": "stopped"}
+            press.update(idle_yellow=station.idle_yellow_duration, idle_red=station.idle_red_duration)
+            presses.append(press)
+        return {"presses": presses}
+
+    def status_snapshot(self):
+        """The state in the status API's format (see status_api.py)."""
+        return {"presses": timing_common.status_presses(self.stations)}
+
+    def start_status_api(self, config):
+        """Serve the status API from the daemon, so dashboards keep working without the GUI."""
+        if not config.get("enabled"):
+            return
+        from status_api import StatusServer  # http.server alone would double the daemon's import time
+
+        self.status_server = StatusServer(config.get("host", "127.0.0.1"), config.get("port", 8321),
+                                          recent_rows=STATUS_API_RECENT_ROWS)
+        self.status_server.add_log_rows(timing_common.recent_status_rows(self.db_path, STATUS_API_RECENT_ROWS))
+        try:
+            self.status_server.start()
+        except OSError as e:
+            print(f"Status API not started: {e}")  # Optional: Console logging for warnings
+            self.status_server = None
+            return
+        print(f"Status API on http://{self.status_server.host}:{self.status_server.port}/status")
+
+    # === Settings ===
+
+    def poll_settings(self):
+        changed = self.settings.poll()
+        if changed:
+            print(f"Reloaded {self.settings.path}: {', '.join(sorted(changed))} changed")
+
+    def apply_settings(self, values, changed):
+        """Settings subscriber: the single timer takes new durations, texts and thresholds right away."""
+        restart_keys = changed & {"stations", "status_api"}
+        if restart_keys:
+            print(f"Changes to {', '.join(sorted(restart_keys))} take effect after a restart.")
+        if not self.station_mode:
+            timing_common.configure_single_timer(self.stations[0], values)
+            self.scheduler.poke(self.stations[0])
+            self.state_changed()
+
+    # === Metrics ===
+
+    def write_metrics_file(self):
+        try:
+            self.metrics.write(self.metrics_path)
+        except OSError as e:
+            print(f"Failed to write {self.metrics_path}: {e}")  # Optional: Console logging for warnings
+
+    def save_interval_stats(self):
+        if not self.interval_stats.changed:
+            return
+        try:
+            self.interval_stats.save()
+        except OSError as e:
+            print(f"Failed to write {self.interval_stats.path}: {e}")  # Optional: Console logging for warnings
+
+    def report_jitter(self):
+        """Print how late the ticks and presses were handled, measured inside the daemon."""
+        stats = self.scheduler.jitter_stats() if self.scheduler is not None else {"ticks": 0}
+        if stats["ticks"]:
+            print(f"Daemon tick lateness: {stats['ticks']} ticks, "
+                  f"avg {stats['avg'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms")
+        if self.input_queue is not None:
+            presses = self.input_queue.latency_stats()
+            if presses["presses"]:
+                print(f"Press-to-state latency: {presses['presses']} presses, "
+                      f"median {presses['median'] * 1000:.1f} ms, max {presses['max'] * 1000:.1f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the foam press timers without the screen.")
+    parser.add_argument("--input", choices=("gpio", "script"), default="gpio",
+                        help="Where button presses come from (default: GPIO pins)")
+    parser.add_argument("--script", help="Press script for --input script (lines of '<seconds> <button>')")
+    parser.add_argument("--repeat", action="store_true", help="Replay the press script forever")
+    parser.add_argument("--socket", default=DAEMON_SOCKET, help="Unix socket the state is published on")
+    args = parser.parse_args()
+    if args.input == "script" and not args.script:
+        parser.error("--input script needs --script FILE")
+    return args
+
+def main():
+    args = parse_args()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # systemd's stop ends the run like Ctrl-C
+    daemon = TimingDaemon(socket_path=args.socket)
+    try:
+        daemon.start(args.input, args.script, args.repeat)
+        print(f"Timing daemon publishing on {args.socket}")
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.shutdown()
+    except RuntimeError as e:
+        sys.exit(str(e))  # Already running, or main.py is running the timers
+
+if __name__ == '__main__':
+    main()